@@ -1,11 +1,49 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from app.deep_search import deep_search
-import uvicorn
-import os
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from contextlib import asynccontextmanager
+from utils.environment import configure_logging, load_environment
+# .env must be in os.environ before the modules below build their stores and clients
+load_environment()
+configure_logging()
+from app.deep_search import (
+    config, deep_search, deep_search_stream, deep_search_delta, create_session, warm_up_session, extraction_pool,
+    entity_index, tor_pool
+)
+from app.search_jobs import job_manager, JobQueueFull
+from app.watchlist import watchlist
+from app.target_type import target_classifier
+from utils.metrics import registry
+from utils.response_shaping import decode_cursor, dumps, page_info, result_pages, shape_response, shape_results
+import asyncio
+from typing import List, Optional
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled session per worker process, reused by every search
+    app.state.session = create_session()
+    warm_up = asyncio.create_task(warm_up_session(app.state.session)) if config.prewarm_upstreams else None
+    await job_manager.start(app.state.session)
+    await watchlist.start(app.state.session)
+    await tor_pool.start()
+    yield
+    await watchlist.stop()
+    await job_manager.stop()
+    if warm_up is not None:
+        warm_up.cancel()
+    await tor_pool.close()
+    await app.state.session.close()
+    extraction_pool.shutdown()
+
+class FastJSONResponse(JSONResponse):
+    """JSON rendered with orjson when it is installed."""
 
-app = FastAPI(title="EchoForge API")
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+app = FastAPI(title="EchoForge API", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # Configure CORS
 app.add_middleware(
@@ -15,6 +53,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# NDJSON streams stay uncompressed so events are not held back in the gzip buffer
+app.add_middleware(GZipMiddleware, minimum_size=1024, exclude_content_types=("application/x-ndjson",))
 
 class SearchRequest(BaseModel):
     target: str
@@ -23,6 +63,53 @@ class SearchRequest(BaseModel):
     deep_search: bool = False
     dark_web: bool = False
     social_media: bool = True
+    merge_dorks: bool = False  # Combine site-only dorks into OR queries to save quota
+    compact: bool = False  # Drop pagemap, empty entity kinds and the duplicated top_results
+    fields: Optional[List[str]] = None  # Keep only these keys of every result
+    page_size: Optional[int] = Field(None, ge=1, le=1000)  # Return the first page and a cursor to the rest
+    timings: bool = False  # Add a per-stage timing breakdown to metadata
+
+class JobRequest(SearchRequest):
+    priority: int = 0  # Higher runs first
+
+class WatchRequest(BaseModel):
+    target: str
+    target_type: str = "person"
+    max_results: int = 20
+    deep_search: bool = False
+    dark_web: bool = False
+    social_media: bool = True
+    interval_hours: float = 24.0
+
+class TargetTypesRequest(BaseModel):
+    targets: List[str] = Field(..., min_length=1, max_length=200)
+
+def search_params(request: SearchRequest) -> dict:
+    return {
+        'target': request.target,
+        'target_type': request.target_type,
+        'max_results_per_dork': request.max_results,
+        'deep_search_enabled': request.deep_search,
+        'dark_web_enabled': request.dark_web,
+        'social_media_enabled': request.social_media,
+        'merge_dorks': request.merge_dorks,
+        'include_timings': request.timings
+    }
+
+async def shaped(response: dict, compact: bool, fields: Optional[List[str]], page_size: Optional[int]) -> JSONResponse:
+    """
+    Search response after projection and pagination, returned as a response
+    object so FastAPI's jsonable_encoder pass is skipped.
+    """
+    if page_size:
+        response = await result_pages.first_page(response, page_size)
+        response['results'] = shape_results(response['results'], compact, fields)
+    else:
+        response = shape_response(response, compact, fields)
+    return FastJSONResponse(response)
+
+def field_list(fields: Optional[str]) -> Optional[List[str]]:
+    return [field.strip() for field in fields.split(',') if field.strip()] if fields else None
 
 @app.post("/api/search")
 async def search(request: SearchRequest):
@@ -33,11 +120,190 @@ async def search(request: SearchRequest):
             max_results_per_dork=request.max_results,
             deep_search_enabled=request.deep_search,
             dark_web_enabled=request.dark_web,
-            social_media_enabled=request.social_media
+            social_media_enabled=request.social_media,
+            merge_dorks=request.merge_dorks,
+            session=app.state.session,
+            include_timings=request.timings
         )
-        return results
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return await shaped(results, request.compact, request.fields, request.page_size)
+
+@app.get("/api/search/page")
+async def search_page(cursor: str, limit: int = Query(50, ge=1, le=1000), compact: bool = False,
+                      fields: Optional[str] = None):
+    """Next page of a paged search; fields is comma-separated."""
+    try:
+        search_id, offset = decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    page = await result_pages.page(search_id, offset, limit)
+    if page is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired search")
+    results, total = page
+    return FastJSONResponse({
+        'results': shape_results(results, compact, field_list(fields)),
+        'page': page_info(search_id, offset, limit, total)
+    })
+
+@app.post("/api/search/stream")
+async def search_stream(request: SearchRequest):
+    """Stream search events as newline-delimited JSON while dorks complete."""
+    events = deep_search_stream(
+        target=request.target,
+        target_type=request.target_type,
+        max_results_per_dork=request.max_results,
+        deep_search_enabled=request.deep_search,
+        dark_web_enabled=request.dark_web,
+        social_media_enabled=request.social_media,
+        merge_dorks=request.merge_dorks,
+        session=app.state.session,
+        include_timings=request.timings
+    )
+    # Pull the first event here so validation errors still map to a 500
+    try:
+        first_event = await events.__anext__()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    def line(event: dict) -> bytes:
+        if event.get('event') == 'dork':
+            event['results'] = shape_results(event['results'], request.compact, request.fields)
+        elif event.get('event') == 'complete':
+            event = shape_response(event, request.compact, request.fields)
+        return dumps(event) + b"\n"
+    
+    async def ndjson():
+        yield line(first_event)
+        try:
+            async for event in events:
+                yield line(event)
+        except Exception as e:
+            yield dumps({'event': 'error', 'detail': str(e)}) + b"\n"
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+@app.post("/api/jobs", status_code=202)
+async def submit_job(request: JobRequest):
+    try:
+        job = await job_manager.submit(search_params(request), priority=request.priority)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=f"Search queue is full: {e}")
+    return job.summary()
+
+@app.get("/api/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return job.summary()
+
+@app.get("/api/jobs/{job_id}/result")
+async def job_result(job_id: str, compact: bool = False, fields: Optional[str] = None,
+                     page_size: Optional[int] = Query(None, ge=1, le=1000)):
+    job = await job_manager.get(job_id, with_result=True)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    if job.status == 'failed':
+        raise HTTPException(status_code=500, detail=job.error)
+    if job.status != 'completed':
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return await shaped(job.result, compact, field_list(fields), page_size)
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    job = await job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return job.summary()
+
+@app.get("/api/target-type")
+async def target_type(target: str):
+    """Detect whether target is a person, email, phone or other; the LLM is only asked when rules can't tell."""
+    detected, source = await target_classifier.classify(target)
+    return {'target': target, 'target_type': detected, 'source': source, 'stats': target_classifier.stats()}
+
+@app.post("/api/target-types")
+async def target_types(request: TargetTypesRequest):
+    """Detect the type of many targets at once; those the rules can't settle share batched LLM prompts."""
+    verdicts = await target_classifier.classify_many(request.targets)
+    return {
+        'results': [
+            {'target': target, 'target_type': detected, 'source': source}
+            for target, (detected, source) in zip(request.targets, verdicts)
+        ],
+        'stats': target_classifier.stats()
+    }
+
+@app.post("/api/search/delta")
+async def search_delta(request: SearchRequest):
+    """Return only what changed since the target's last search."""
+    try:
+        return await deep_search_delta(
+            target=request.target,
+            target_type=request.target_type,
+            max_results_per_dork=request.max_results,
+            deep_search_enabled=request.deep_search,
+            dark_web_enabled=request.dark_web,
+            social_media_enabled=request.social_media,
+            session=app.state.session
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/watchlist", status_code=201)
+async def watch_target(request: WatchRequest):
+    if request.target_type not in ('person', 'email', 'phone'):
+        raise HTTPException(status_code=422, detail=f"Invalid target_type '{request.target_type}'")
+    params = {
+        'max_results_per_dork': request.max_results,
+        'deep_search_enabled': request.deep_search,
+        'dark_web_enabled': request.dark_web,
+        'social_media_enabled': request.social_media
+    }
+    return await asyncio.to_thread(
+        watchlist.store.add, request.target, request.target_type, params, request.interval_hours * 3600
+    )
+
+@app.get("/api/watchlist")
+async def list_watchlist():
+    return {'entries': await asyncio.to_thread(watchlist.store.entries), 'stats': watchlist.stats()}
+
+@app.get("/api/watchlist/{entry_id}")
+async def watchlist_entry(entry_id: int):
+    entry = await asyncio.to_thread(watchlist.store.get, entry_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Unknown watchlist entry")
+    return entry
+
+@app.delete("/api/watchlist/{entry_id}")
+async def unwatch_target(entry_id: int):
+    if not await asyncio.to_thread(watchlist.store.remove, entry_id):
+        raise HTTPException(status_code=404, detail="Unknown watchlist entry")
+    return {'id': entry_id, 'removed': True}
+
+@app.get("/api/entities/lookup")
+async def entity_lookup(value: str, kind: Optional[str] = None, limit: int = Query(100, ge=1, le=1000)):
+    """Past targets an email, phone, URL or handle was found for. kind: email, phone, url, handle:<platform>."""
+    matches = await asyncio.to_thread(entity_index.lookup, value, kind, limit)
+    return {'value': value, 'kind': kind, 'matches': matches}
+
+@app.get("/api/entities/prefix")
+async def entity_prefix(q: str, kind: Optional[str] = None, limit: int = Query(50, ge=1, le=500)):
+    return {'prefix': q, 'kind': kind, 'values': await asyncio.to_thread(entity_index.prefix, q, kind, limit)}
+
+@app.get("/api/entities/related")
+async def entity_related(target: str, target_type: Optional[str] = None, limit: int = Query(50, ge=1, le=500)):
+    """Other past targets sharing at least one entity with target."""
+    related = await asyncio.to_thread(entity_index.related, target, target_type, limit)
+    return {'target': target, 'related': related}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of search, stage, upstream, cache and quota metrics."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 if __name__ == "__main__":
+    import uvicorn
+    
     uvicorn.run("api:app", host="0.0.0.0", port=8000, reload=True)
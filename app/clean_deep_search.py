@@ -1,13 +1,197 @@
-from utils.gemini_llm import call_gemini
-from lib.prompts import DEEP_SEARCH_CLEANING_PROMPT
+import asyncio
 import json
+import logging
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from lib.prompts import DEEP_SEARCH_CLEANING_PROMPT
+from utils.llm_client import LLMError, llm_client
 
+logger = logging.getLogger(__name__)
 
+# Result fields the cleaning prompt actually uses; pagemap, scores and meta are dropped
+RESULT_FIELDS = ('title', 'link', 'snippet', 'displayLink')
+CHUNK_TOKENS = 6000  # Input budget per map prompt, excluding the instructions
+MAX_OUTPUT_TOKENS = 2048
+JSON_FENCE = re.compile(r'^```(?:json)?\s*|\s*```$', re.I)
 
-def clean_deep_search(deep_search_results):
-    FULL_PROMPT = f"{DEEP_SEARCH_CLEANING_PROMPT}\n\n{deep_search_results}"
-    cleaned_data = call_gemini(FULL_PROMPT)
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English/JSON; no tokenizer dependency
+    return len(text) // 4 + 1
+
+
+def compact_results(search: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Ranked results reduced to the fields the cleaning prompt needs."""
+    results = search.get('all_results') or search.get('top_results') or []
+    compact = []
+    for result in results:
+        item = {field: result[field] for field in RESULT_FIELDS if result.get(field)}
+        entities = result.get('entities') or {}
+        kept = {kind: values for kind, values in entities.items() if values}
+        if kept:
+            item['entities'] = kept
+        compact.append(item)
+    return compact
+
+
+def chunk_results(compact: List[Dict[str, Any]], budget: int) -> List[List[Dict[str, Any]]]:
+    """Greedy packing in rank order; a single oversized result gets a chunk of its own."""
+    chunks: List[List[Dict[str, Any]]] = []
+    current: List[Dict[str, Any]] = []
+    used = 0
+    for item in compact:
+        tokens = estimate_tokens(json.dumps(item, ensure_ascii=False))
+        if current and used + tokens > budget:
+            chunks.append(current)
+            current, used = [], 0
+        current.append(item)
+        used += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def parse_json_reply(text: str) -> Optional[Dict[str, Any]]:
     try:
-        return json.loads(cleaned_data)
+        parsed = json.loads(JSON_FENCE.sub('', text.strip()))
     except json.JSONDecodeError:
-        return {"error": "Failed to parse JSON", "raw_output": cleaned_data}
\ No newline at end of file
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+def _as_list(value: Any) -> List[Any]:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _union(target: List[Any], values: Any):
+    """Append values not seen yet (case-insensitive for strings), keeping first-seen order."""
+    seen = {json.dumps(v, sort_keys=True).lower() for v in target}
+    for value in _as_list(values):
+        key = json.dumps(value, sort_keys=True).lower()
+        if value not in (None, '') and key not in seen:
+            seen.add(key)
+            target.append(value)
+
+
+def merge_partials(partials: List[Dict[str, Any]], target: str, target_type: str) -> Dict[str, Any]:
+    """
+    Deterministic reduce over the per-chunk JSONs, in chunk (rank) order:
+    scalar details keep the first value seen, lists are unioned, timeline
+    events are deduplicated and sorted by date.
+    """
+    primary: Dict[str, Any] = {}
+    profiles: Dict[str, List[Any]] = {}
+    associated = {'emails': [], 'phones': [], 'persons': []}
+    contacts = {'emails': [], 'phones': []}
+    timeline: List[Dict[str, Any]] = []
+    notes: List[str] = []
+
+    for partial in partials:
+        for key, value in (partial.get('primary_details') or {}).items():
+            if value not in (None, '', []) and key not in primary:
+                primary[key] = value
+        for platform, value in (partial.get('profiles_mentions') or {}).items():
+            _union(profiles.setdefault(platform, []), value)
+        for kind, values in (partial.get('associated_entities') or {}).items():
+            _union(associated.setdefault(kind, []), values)
+        for kind, values in (partial.get('contacts') or {}).items():
+            _union(contacts.setdefault(kind, []), values)
+        _union(timeline, [event for event in _as_list(partial.get('timeline_events')) if isinstance(event, dict)])
+        _union(notes, partial.get('notes'))
+
+    timeline.sort(key=lambda event: (str(event.get('date') or ''), str(event.get('event') or '')))
+    profiles = {platform: values[0] if len(values) == 1 else values for platform, values in profiles.items() if values}
+    return {
+        'target_type': target_type,
+        'target_value': target,
+        'primary_details': primary or None,
+        'profiles_mentions': profiles or None,
+        'associated_entities': {kind: values or None for kind, values in associated.items()},
+        'timeline_events': timeline or None,
+        'contacts': {kind: values or None for kind, values in contacts.items()},
+        'notes': ' '.join(notes) or None
+    }
+
+
+async def _map_chunk(index: int, chunk: List[Dict[str, Any]], header: str) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+    prompt = f"{DEEP_SEARCH_CLEANING_PROMPT}{header}\n{json.dumps(chunk, ensure_ascii=False)}"
+    started = time.perf_counter()
+    try:
+        reply = await llm_client.generate(prompt, max_output_tokens=MAX_OUTPUT_TOKENS)
+    except LLMError as e:
+        logger.error(f"Cleaning chunk {index} failed: {e}")
+        reply, error = '', str(e)
+    else:
+        error = None
+    parsed = parse_json_reply(reply) if reply else None
+    if reply and parsed is None:
+        error = 'Failed to parse JSON'
+    return parsed, {
+        'chunk': index,
+        'results': len(chunk),
+        'prompt_tokens': estimate_tokens(prompt),
+        'output_tokens': estimate_tokens(reply) if reply else 0,
+        'ms': round((time.perf_counter() - started) * 1000, 1),
+        'error': error
+    }
+
+
+async def clean_results(search: Union[Dict[str, Any], str], chunk_tokens: int = CHUNK_TOKENS) -> Dict[str, Any]:
+    """
+    Map-reduce cleaning of a deep_search response.
+
+    Results are compacted and packed into chunks of about chunk_tokens; each
+    chunk is cleaned by the LLM concurrently (the client caps concurrency and
+    caches replies) and the partial JSONs are merged in code. The merged
+    JSON carries a 'pipeline' entry with per-stage latency and estimated
+    token counts.
+    """
+    started = time.perf_counter()
+    if isinstance(search, str):
+        search = json.loads(search)
+    metadata = search.get('metadata', {})
+    target, target_type = metadata.get('target', ''), metadata.get('target_type', '')
+
+    compact = compact_results(search)
+    chunks = chunk_results(compact, chunk_tokens)
+    compacted = time.perf_counter()
+
+    header = f"\n\nTARGET: {target} (type: {target_type})\nRESULTS (JSON, ranked):"
+    mapped = await asyncio.gather(*(_map_chunk(i, chunk, header) for i, chunk in enumerate(chunks)))
+    mapped_at = time.perf_counter()
+
+    partials = [partial for partial, _ in mapped if partial is not None]
+    cleaned = merge_partials(partials, target, target_type)
+    finished = time.perf_counter()
+
+    chunk_stats = [stats for _, stats in mapped]
+    cleaned['pipeline'] = {
+        'results': len(compact),
+        'chunks': len(chunks),
+        'failed_chunks': sum(1 for stats in chunk_stats if stats['error']),
+        'estimated_tokens': {
+            'input_before_compaction': estimate_tokens(json.dumps(search, ensure_ascii=False, default=str)),
+            'prompt': sum(stats['prompt_tokens'] for stats in chunk_stats),
+            'output': sum(stats['output_tokens'] for stats in chunk_stats)
+        },
+        'ms': {
+            'compact': round((compacted - started) * 1000, 1),
+            'map': round((mapped_at - compacted) * 1000, 1),
+            'reduce': round((finished - mapped_at) * 1000, 1),
+            'total': round((finished - started) * 1000, 1)
+        },
+        'map_chunks': chunk_stats,
+        'llm': llm_client.stats()
+    }
+    if not partials and chunks:
+        cleaned['error'] = 'No chunk produced valid JSON'
+    return cleaned
+
+
+def clean_deep_search(deep_search_results):
+    """Blocking wrapper around clean_results for scripts outside an event loop."""
+    return asyncio.run(clean_results(deep_search_results))
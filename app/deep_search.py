@@ -1,32 +1,47 @@
+from __future__ import annotations
+
 import asyncio
-import aiohttp
 import json
 import logging
 import os
 import re
 import hashlib
 import random
-from typing import Dict, Any, List, Set, Optional, Tuple
+from typing import Dict, Any, List, Set, Optional, Tuple, AsyncIterator, Awaitable, TYPE_CHECKING
 from datetime import datetime, timedelta
 from collections import defaultdict
-from dotenv import load_dotenv
-from bs4 import BeautifulSoup
-from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
 from urllib.parse import urlparse, quote_plus
-from dataclasses import dataclass, asdict
-import phonenumbers
-from email_validator import validate_email, EmailNotValidError
-from lib.dork_generator import DorkGenerator
+from dataclasses import dataclass, asdict, field
+from contextvars import ContextVar
+from contextlib import aclosing, asynccontextmanager
+from functools import wraps
+import inspect
+from lib.dork_generator import DorkGenerator, matches_site
+from lib.dork_planner import DorkPlanner, DorkYieldStore
+from utils.entity_extractor import EntityExtractor
+from utils.extraction_pool import ExtractionPool, LoopLagMonitor
+from utils.html_parser import parse_page, parse_ahmia_results
 from utils.remove_result_dedup import ResultDeduplicator
-load_dotenv()
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - [%(name)s] - %(message)s'
-)
+from utils.result_scorer import BatchScorer, IncrementalRanker, top_k_indices
+from utils.search_cache import create_cache
+from utils.search_snapshots import SnapshotStore, snapshot_fields
+from utils.entity_index import EntityIndex
+from utils.rate_limiter import HostRateLimiter
+from utils.single_flight import SingleFlight
+from utils.tor_pool import CircuitPool
+from utils.environment import load_environment
+from utils.metrics import SearchTimings, record_stage, registry, search_timings, timed
+
+if TYPE_CHECKING:
+    import aiohttp  # Imported on first use; ~170 ms of startup for callers that never open a session
+
 logger = logging.getLogger(__name__)
 
 # ==================== Configuration ====================
+CSE_URL = 'https://www.googleapis.com/customsearch/v1'
+AHMIA_URL = 'https://ahmia.fi/search/'
+
 @dataclass
 class SearchConfig:
     max_results_per_dork: int = 20
@@ -36,17 +51,69 @@ class SearchConfig:
     request_timeout: int = 30
     retry_attempts: int = 3
     retry_delay: float = 4.0
-    request_delay: float = 2.0  # Minimum delay between API requests
+    # Per-host token buckets: sustained requests/second and burst size
+    rate_limit_hosts: Dict[str, Dict[str, float]] = field(default_factory=lambda: {
+        'www.googleapis.com': {'rate': 1.5, 'burst': 5},
+        'ahmia.fi': {'rate': 0.5, 'burst': 2}
+    })
+    rate_limit_default: Dict[str, float] = field(default_factory=lambda: {'rate': 2.0, 'burst': 4})
+    rate_limit_min_rate: float = 0.1  # AIMD floor after repeated 429s
+    rate_limit_increase: float = 0.1  # Additive increase per successful call
+    rate_limit_decrease_factor: float = 0.5  # Multiplicative decrease on 429
+    rate_limit_idle_ttl: float = 300.0  # Buckets of unconfigured hosts idle this long are dropped
+    rate_limit_max_hosts: int = 1024  # Unconfigured hosts with a bucket at once, least recently used dropped first
     cache_ttl: int = 3600  # 1 hour
+    cache_backend: str = 'sqlite'  # 'sqlite' (shared across workers) or 'memory'
+    cache_path: str = ''  # Defaults to .echoforge/search_cache.sqlite3
+    cache_max_entries: int = 10000
+    cache_max_bytes: int = 256 * 1024 * 1024
+    cache_memory_entries: int = 256  # Hot in-process LRU in front of the disk cache
     enable_fallback_browse: bool = True
     enable_entity_extraction: bool = True
     enable_deduplication: bool = True
+    dedup_similarity_threshold: float = 0.7  # Snippet word-set Jaccard treated as a duplicate, 0 disables
     min_snippet_length: int = 50
+    pagination_mode: str = 'concurrent'  # 'concurrent' fans out pages after the first, 'sequential' walks them
+    extraction_workers: int = 0  # Process pool size, 0 uses utils.workers.get_thread_count()
+    extraction_inline_threshold: int = 4  # Batches smaller than this are extracted on the loop
+    extraction_batch_size: int = 16  # Texts per pool task
+    html_offload_threshold: int = 200_000  # Pages at least this many characters are parsed on the pool
+    browse_max_bytes: int = 1_000_000  # Stop reading browsed HTML pages after this many bytes
+    browse_text_max_bytes: int = 16_384  # Plain-text pages only need enough for 2000 characters
+    connector_limit: int = 100  # Total pooled connections per session
+    connector_limit_per_host: int = 20
+    dns_cache_ttl: int = 300
+    keepalive_timeout: float = 60.0
+    prewarm_upstreams: bool = True  # Open connections to CSE and Ahmia when the API starts
+    job_workers: int = 4  # Searches the job queue runs at once
+    job_queue_limit: int = 100  # Queued jobs beyond this are rejected
+    job_result_ttl: int = 3600  # Seconds finished jobs and their results are kept
+    enable_dork_planner: bool = True  # Order and budget dorks by their historical yield
+    planner_quota_share: float = 0.5  # Share of the remaining daily quota one search may plan
+    merge_max_sites: int = 10  # site: filters per merged OR query (CSE ignores words past 32)
+    enable_snapshots: bool = True  # Keep each target's last run for delta searches
+    enable_entity_index: bool = True  # Index every search's entities for cross-target pivots
+    delta_max_pages: int = 3  # Pages a delta search reads per dork before giving up on known links
+    watchlist_check_interval: int = 300  # Seconds between watchlist scans for due targets
+    watchlist_quota_share: float = 0.5  # Share of the remaining quota one watchlist scan may spend
+    watchlist_concurrency: int = 2  # Watched targets refreshed at once
+    watchlist_retry_delay: int = 300  # First retry of a failed refresh; doubles per failure, up to the interval
+    watchlist_lease: int = 3600  # Seconds a worker's claim on a refresh holds before another worker may retry it
+    # Upstream endpoints; point them at a local stand-in (benchmarks/fake_upstream.py) for offline runs
+    cse_url: str = field(default_factory=lambda: os.getenv('ECHOFORGE_CSE_URL', CSE_URL))
+    ahmia_url: str = field(default_factory=lambda: os.getenv('ECHOFORGE_AHMIA_URL', AHMIA_URL))
+    # Tor SOCKS proxy (e.g. socks5://127.0.0.1:9050) for Ahmia and .onion pages; empty sends them direct
+    tor_proxy: str = field(default_factory=lambda: os.getenv('ECHOFORGE_TOR_PROXY', ''))
+    tor_circuits: int = 4  # Isolated circuits dark web requests are spread over
+    tor_slow_seconds: float = 8.0  # A circuit slower than this on average is rotated
+    tor_max_failures: int = 3  # Consecutive failures before a circuit is rotated
+    tor_health_url: str = 'https://check.torproject.org/api/ip'
+    tor_health_interval: int = 300  # Seconds between circuit health checks in the API, 0 disables
     
 config = SearchConfig()
 
-# Global lock for API rate limiting
-api_rate_limit_lock = asyncio.Lock()
+# Google CSE only serves results up to start=91 (100 results)
+CSE_MAX_START = 91
 
 # ==================== Quota & Rate Limiting ====================
 class QuotaManager:
@@ -76,96 +143,229 @@ class QuotaManager:
 
 quota_manager = QuotaManager(config.quota_limit)
 
+rate_limiter = HostRateLimiter(
+    config.rate_limit_hosts,
+    config.rate_limit_default,
+    min_rate=config.rate_limit_min_rate,
+    increase=config.rate_limit_increase,
+    decrease_factor=config.rate_limit_decrease_factor,
+    idle_ttl=config.rate_limit_idle_ttl,
+    max_hosts=config.rate_limit_max_hosts
+)
+
+# Dark web traffic goes over isolated Tor circuits when a proxy is configured
+tor_pool = CircuitPool(
+    config.tor_proxy,
+    size=config.tor_circuits,
+    slow_seconds=config.tor_slow_seconds,
+    max_failures=config.tor_max_failures,
+    health_url=config.tor_health_url,
+    health_interval=config.tor_health_interval
+)
+
+def is_onion(url: str) -> bool:
+    return (urlparse(url).hostname or '').endswith('.onion')
+
+@asynccontextmanager
+async def routed_get(session: aiohttp.ClientSession, url: str, dark_web: bool, **kwargs):
+    """GET dark web traffic over a Tor circuit when a proxy is configured, the rest over the shared session."""
+    if dark_web and tor_pool.enabled:
+        async with tor_pool.get(url, **kwargs) as resp:
+            yield resp
+    else:
+        async with session.get(url, **kwargs) as resp:
+            yield resp
+
 # ==================== Cache System ====================
-class SimpleCache:
-    def __init__(self):
-        self.cache: Dict[str, Tuple[Any, float]] = {}
-        self.lock = asyncio.Lock()
-    
-    async def get(self, key: str) -> Optional[Any]:
-        async with self.lock:
-            if key in self.cache:
-                data, timestamp = self.cache[key]
-                if time.time() - timestamp < config.cache_ttl:
-                    logger.info(f"Cache hit: {key[:50]}...")
-                    return data
-                else:
-                    del self.cache[key]
-        return None
-    
-    async def set(self, key: str, value: Any):
-        async with self.lock:
-            self.cache[key] = (value, time.time())
-    
-    async def clear_expired(self):
-        async with self.lock:
-            current_time = time.time()
-            expired = [k for k, (_, t) in self.cache.items() if current_time - t >= config.cache_ttl]
-            for k in expired:
-                del self.cache[k]
+cache = create_cache(
+    config.cache_backend,
+    config.cache_ttl,
+    path=config.cache_path,
+    max_entries=config.cache_max_entries,
+    max_bytes=config.cache_max_bytes,
+    memory_entries=config.cache_memory_entries
+)
 
-cache = SimpleCache()
+# Coalesces concurrent fetches of the same (query, start, num) page
+search_flight = SingleFlight()
+
+# ==================== Dork Planning ====================
+dork_planner = DorkPlanner(DorkYieldStore(), quota_share=config.planner_quota_share)
+
+# ==================== Snapshots ====================
+snapshot_store = SnapshotStore()
+
+# ==================== Entity Index ====================
+entity_index = EntityIndex()
 
 # ==================== Entity Extraction ====================
-class EntityExtractor:
-    @staticmethod
-    def extract_emails(text: str) -> Set[str]:
-        pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        emails = set(re.findall(pattern, text))
-        valid_emails = set()
-        for email in emails:
-            try:
-                valid = validate_email(email, check_deliverability=False)
-                valid_emails.add(valid.email)
-            except EmailNotValidError:
-                pass
-        return valid_emails
+extraction_pool = ExtractionPool(
+    config.extraction_workers,
+    inline_threshold=config.extraction_inline_threshold,
+    batch_size=config.extraction_batch_size
+)
+loop_monitor = LoopLagMonitor()
+
+# ==================== Metrics ====================
+searches_in_flight = registry.gauge('echoforge_searches_in_flight', 'Searches currently running.', ['mode'])
+searches_total = registry.counter('echoforge_searches_total', 'Finished searches by outcome.', ['mode', 'outcome'])
+search_seconds = registry.histogram('echoforge_search_duration_seconds', 'Wall time of whole searches.', ['mode'])
+upstream_responses = registry.counter(
+    'echoforge_upstream_responses_total', 'Upstream HTTP responses; status is "error" when none came back.',
+    ['host', 'status']
+)
+cse_fetch_seconds = registry.histogram(
+    'echoforge_cse_fetch_duration_seconds', 'CSE calls from first attempt to response or failure, retries included.',
+    ['outcome']
+)
+quota_requests = registry.counter('echoforge_quota_requests_total', 'CSE calls asked of the daily quota.', ['outcome'])
+registry.callback('echoforge_quota_used', 'CSE calls used in the current quota day.', lambda: {(): quota_manager.used})
+registry.callback('echoforge_quota_remaining', 'CSE calls left today.', lambda: {(): quota_manager.get_remaining()})
+registry.callback(
+    'echoforge_cache_lookups_total', 'Search cache lookups.',
+    lambda: {('hit',): cache.stats()['hits'], ('miss',): cache.stats()['misses']}, ['result'], kind='counter'
+)
+registry.callback('echoforge_cache_hit_ratio', 'Search cache hits over lookups.', lambda: {(): cache.stats()['hit_ratio']})
+registry.callback(
+    'echoforge_coalesced_requests_total', 'CSE page fetches served by an identical in-flight call.',
+    lambda: {(): search_flight.stats()['coalesced']}, kind='counter'
+)
+
+def metric_host(url_or_host: str) -> str:
+    """Host label for metrics: configured upstreams by name, every scraped site as 'other'."""
+    return rate_limiter.host_of(url_or_host) if rate_limiter.is_configured(url_or_host) else 'other'
+
+def rate_limit_rates() -> Dict[Tuple[str, ...], float]:
+    rates = {(host,): bucket.rate for host, bucket in rate_limiter.buckets.items()}
+    if rate_limiter.other_buckets:
+        rates[('other',)] = min(bucket.rate for bucket in rate_limiter.other_buckets.values())  # Most throttled
+    return rates
+
+def rate_limit_throttled() -> Dict[Tuple[str, ...], float]:
+    throttled = {(host,): bucket.throttled for host, bucket in rate_limiter.buckets.items()}
+    throttled[('other',)] = rate_limiter.evicted_throttled + sum(
+        bucket.throttled for bucket in rate_limiter.other_buckets.values()
+    )
+    return throttled
+
+registry.callback(
+    'echoforge_rate_limit_rate',
+    'Current token bucket rate per configured upstream host, requests/s; "other" is the lowest among the rest.',
+    rate_limit_rates, ['host']
+)
+registry.callback(
+    'echoforge_rate_limit_throttled_total', '429 responses that lowered a host rate.',
+    rate_limit_throttled, ['host'], kind='counter'
+)
+registry.callback(
+    'echoforge_tor_circuit_latency_seconds', 'Average response latency per Tor circuit.',
+    lambda: {(str(index),): stats['latency_ms'] / 1000
+             for index, stats in tor_pool.stats()['circuits'].items() if stats['latency_ms'] is not None},
+    ['circuit']
+)
+registry.callback('echoforge_tor_circuit_rotations_total', 'Tor circuits replaced for being slow or failing.',
+                  lambda: {(): tor_pool.rotations}, kind='counter')
+registry.callback('echoforge_event_loop_lag_max_seconds', 'Worst event loop lag seen.',
+                  lambda: {(): loop_monitor.stats()['max_ms'] / 1000})
+
+def tracked_search(mode: str):
+    """Count a search function's runs as in flight, then by outcome and duration."""
+    def finish(started: float, outcome: str):
+        searches_in_flight.dec(mode=mode)
+        searches_total.inc(mode=mode, outcome=outcome)
+        search_seconds.observe(time.perf_counter() - started, mode=mode)
     
-    @staticmethod
-    def extract_phone_numbers(text: str) -> Set[str]:
-        phones = set()
-        for match in phonenumbers.PhoneNumberMatcher(text, None):
-            phones.add(phonenumbers.format_number(match.number, phonenumbers.PhoneNumberFormat.E164))
-        return phones
+    def decorator(func):
+        if inspect.isasyncgenfunction(func):
+            @wraps(func)
+            async def stream_wrapper(*args, **kwargs):
+                searches_in_flight.inc(mode=mode)
+                started, outcome = time.perf_counter(), 'error'
+                try:
+                    # Closing the wrapper closes the search's generator right away, not at GC
+                    async with aclosing(func(*args, **kwargs)) as events:
+                        async for event in events:
+                            yield event
+                    outcome = 'ok'
+                except (GeneratorExit, asyncio.CancelledError):
+                    outcome = 'cancelled'
+                    raise
+                finally:
+                    finish(started, outcome)
+            return stream_wrapper
+        
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            searches_in_flight.inc(mode=mode)
+            started, outcome = time.perf_counter(), 'error'
+            try:
+                result = await func(*args, **kwargs)
+                outcome = 'ok'
+                return result
+            except asyncio.CancelledError:
+                outcome = 'cancelled'
+                raise
+            finally:
+                finish(started, outcome)
+        return wrapper
+    return decorator
+
+async def wait_for_rate_limit(url: str):
+    with timed('rate_limit_wait'):
+        await rate_limiter.acquire(url)
+
+def observe_upstream(url: str, status: Optional[int]):
+    """Feed a response status to the host's rate limiter and the status counters."""
+    rate_limiter.observe(url, status)
+    upstream_responses.inc(host=metric_host(url), status=status if status is not None else 'error')
+
+# ==================== Advanced Web Scraping ====================
+class BrowseStats:
+    """Byte accounting for the pages browsed during one search."""
     
-    @staticmethod
-    def extract_urls(text: str) -> Set[str]:
-        pattern = r'https?://(?:www\.)?[-a-zA-Z0-9@:%._\+~#=]{1,256}\.[a-zA-Z0-9()]{1,6}\b(?:[-a-zA-Z0-9()@:%_\+.~#?&/=]*)'
-        return set(re.findall(pattern, text))
+    def __init__(self):
+        self.pages_read = 0
+        self.pages_truncated = 0
+        self.pages_skipped = 0
+        self.bytes_read = 0
+        self.bytes_saved = 0  # From Content-Length, so only counted for uncompressed responses that send it
     
-    @staticmethod
-    def extract_social_handles(text: str) -> Dict[str, Set[str]]:
-        handles = {
-            'twitter': set(re.findall(r'@([A-Za-z0-9_]{1,15})', text)),
-            'linkedin': set(re.findall(r'linkedin\.com/in/([A-Za-z0-9-]+)', text)),
-            'github': set(re.findall(r'github\.com/([A-Za-z0-9-]+)', text)),
-            'instagram': set(re.findall(r'instagram\.com/([A-Za-z0-9_.]+)', text))
-        }
-        return {k: v for k, v in handles.items() if v}
+    def record_read(self, size: int, content_length: Optional[int], truncated: bool):
+        self.pages_read += 1
+        self.bytes_read += size
+        if truncated:
+            self.pages_truncated += 1
+            if content_length:
+                self.bytes_saved += max(0, content_length - size)
     
-    @staticmethod
-    def extract_dates(text: str) -> Set[str]:
-        patterns = [
-            r'\b\d{4}-\d{2}-\d{2}\b',  # YYYY-MM-DD
-            r'\b\d{2}/\d{2}/\d{4}\b',  # MM/DD/YYYY
-            r'\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]* \d{1,2},? \d{4}\b'
-        ]
-        dates = set()
-        for pattern in patterns:
-            dates.update(re.findall(pattern, text, re.IGNORECASE))
-        return dates
+    def record_skip(self, content_length: Optional[int]):
+        self.pages_skipped += 1
+        self.bytes_saved += content_length or 0
     
-    @staticmethod
-    def extract_all(text: str) -> Dict[str, Any]:
+    def to_dict(self) -> Dict[str, int]:
         return {
-            'emails': list(EntityExtractor.extract_emails(text)),
-            'phones': list(EntityExtractor.extract_phone_numbers(text)),
-            'urls': list(EntityExtractor.extract_urls(text)),
-            'social_handles': {k: list(v) for k, v in EntityExtractor.extract_social_handles(text).items()},
-            'dates': list(EntityExtractor.extract_dates(text))
+            'pages_read': self.pages_read,
+            'pages_truncated': self.pages_truncated,
+            'pages_skipped': self.pages_skipped,
+            'bytes_read': self.bytes_read,
+            'bytes_saved': self.bytes_saved
         }
 
-# ==================== Advanced Web Scraping ====================
+# Stats of the search running in the current task, set per search; dork tasks inherit it
+browse_stats: ContextVar[Optional[BrowseStats]] = ContextVar('browse_stats', default=None)
+
+def browse_stats_dict() -> Optional[Dict[str, int]]:
+    stats = browse_stats.get()
+    return stats.to_dict() if stats is not None else None
+
+def body_length(resp: aiohttp.ClientResponse) -> Optional[int]:
+    """Content-Length when it measures the body itself; for encoded responses it counts compressed bytes."""
+    if resp.headers.get('Content-Encoding', 'identity').lower() != 'identity':
+        return None
+    return resp.content_length
+# CSE calls that spent quota in the current search, by query; cached and coalesced pages cost nothing
+quota_calls: ContextVar[Optional[Dict[str, int]]] = ContextVar('quota_calls', default=None)
+
 class WebScraper:
     def __init__(self):
         self.headers = {
@@ -179,106 +379,131 @@ class WebScraper:
         }
     
     async def extract_structured_data(self, html: str, url: str) -> Dict[str, Any]:
-        soup = BeautifulSoup(html, 'html.parser')
-        
-        # Extract meta information
-        meta_data = {}
-        for meta in soup.find_all('meta'):
-            name = meta.get('name') or meta.get('property')
-            content = meta.get('content')
-            if name and content:
-                meta_data[name] = content
-        
-        # Extract main content
-        content_selectors = [
-            ('article', {}),
-            ('div', {'class': re.compile(r'content|main|article|post', re.I)}),
-            ('div', {'id': re.compile(r'content|main|article|post', re.I)}),
-        ]
-        
-        main_content = ''
-        for tag, attrs in content_selectors:
-            element = soup.find(tag, attrs)
-            if element:
-                main_content = element.get_text(separator=' ', strip=True)
+        # Large pages are parsed on the worker pool so they don't block other searches
+        if len(html) >= config.html_offload_threshold:
+            return await extraction_pool.run(parse_page, html, url)
+        return parse_page(html, url)
+    
+    async def read_capped(self, resp: aiohttp.ClientResponse, max_bytes: int) -> Tuple[str, bool]:
+        """Stream the body until max_bytes, returning the decoded text and whether it was cut."""
+        chunks = []
+        size = 0
+        truncated = False
+        async for chunk in resp.content.iter_chunked(16384):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= max_bytes:
+                # Stop reading; the connection is closed instead of draining the rest
+                truncated = True
                 break
-        
-        if not main_content:
-            main_content = soup.get_text(separator=' ', strip=True)
-        
+        body = b''.join(chunks)[:max_bytes]
+        stats = browse_stats.get()
+        if stats is not None:
+            stats.record_read(len(body), body_length(resp), truncated)
+        return body.decode(resp.charset or 'utf-8', errors='replace'), truncated
+    
+    async def handle_html(self, resp: aiohttp.ClientResponse, url: str) -> Dict[str, Any]:
+        html, truncated = await self.read_capped(resp, config.browse_max_bytes)
+        structured_data = await self.extract_structured_data(html, url)
+        structured_data['truncated'] = truncated
+        return structured_data
+    
+    async def handle_text(self, resp: aiohttp.ClientResponse, url: str) -> Dict[str, Any]:
+        # Only the first 2000 characters are kept, so stop reading shortly after
+        text, truncated = await self.read_capped(resp, config.browse_text_max_bytes)
         return {
             'url': url,
-            'title': soup.title.string if soup.title else '',
-            'meta': meta_data,
-            'content': main_content[:2000],  # Limit content size
-            'links': [a.get('href') for a in soup.find_all('a', href=True)][:50]
+            'title': '',
+            'meta': {},
+            'content': text.strip()[:2000],
+            'links': [],
+            'truncated': truncated
         }
     
+    # Content types we know how to read; anything else is skipped unread
+    content_handlers = {
+        'text/html': handle_html,
+        'application/xhtml+xml': handle_html,
+        'text/plain': handle_text
+    }
+    
     async def browse_url(self, session: aiohttp.ClientSession, url: str, target: str) -> Dict[str, Any]:
+        onion = is_onion(url)
+        if onion and not tor_pool.enabled:
+            return {'error': 'Onion address needs a Tor proxy (ECHOFORGE_TOR_PROXY)', 'url': url}
         try:
-            async with session.get(url, headers=self.headers, timeout=aiohttp.ClientTimeout(total=config.request_timeout)) as resp:
+            await wait_for_rate_limit(url)
+            async with routed_get(
+                session, url, onion, headers=self.headers, timeout=client_timeout(config.request_timeout)
+            ) as resp:
+                observe_upstream(url, resp.status)
                 if resp.status == 200:
-                    html = await resp.text()
-                    structured_data = await self.extract_structured_data(html, url)
+                    # aiohttp reports a missing Content-Type as octet-stream; servers that omit it mostly send HTML
+                    content_type = resp.content_type if 'Content-Type' in resp.headers else 'text/html'
+                    handler = self.content_handlers.get(content_type)
+                    if handler is None:
+                        stats = browse_stats.get()
+                        if stats is not None:
+                            stats.record_skip(body_length(resp))
+                        return {'error': f'Skipped content type {resp.content_type}', 'url': url}
+                    
+                    structured_data = await handler(self, resp, url)
                     
                     # Extract entities if enabled
                     if config.enable_entity_extraction:
-                        entities = EntityExtractor.extract_all(structured_data['content'])
+                        with timed('entity_extraction'):
+                            entities = await extraction_pool.extract(structured_data['content'])
                         structured_data['entities'] = entities
                     
                     return structured_data
                 else:
                     return {'error': f'Status {resp.status}', 'url': url}
         except asyncio.TimeoutError:
+            observe_upstream(url, None)
             return {'error': 'Timeout', 'url': url}
         except Exception as e:
+            observe_upstream(url, None)
             return {'error': str(e), 'url': url}
 
 # ==================== Ahmia Search ====================
 class AhmiaSearcher:
-    BASE_URL = "https://ahmia.fi/search/"
+    BASE_URL = AHMIA_URL  # Default only; requests go to config.ahmia_url
     
     @staticmethod
     async def search(session: aiohttp.ClientSession, query: str, max_results: int = 10) -> List[Dict[str, Any]]:
         try:
             params = {'q': query}
-            async with session.get(AhmiaSearcher.BASE_URL, params=params, timeout=15) as resp:
+            await wait_for_rate_limit(config.ahmia_url)
+            async with routed_get(session, config.ahmia_url, True, params=params, timeout=client_timeout(15)) as resp:
+                observe_upstream(config.ahmia_url, resp.status)
                 if resp.status == 200:
                     html = await resp.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-                    results = []
                     
                     # Ahmia results structure usually is <li class="result">
-                    for result in soup.select('li.result'):
-                        if len(results) >= max_results:
-                            break
-                            
-                        link_tag = result.find('a')
-                        if not link_tag:
-                            continue
-                            
-                        url = link_tag.get('href')
-                        title = link_tag.get_text(strip=True)
-                        snippet_tag = result.find('p')
-                        snippet = snippet_tag.get_text(strip=True) if snippet_tag else ""
-                        
-                        results.append({
-                            'title': title,
-                            'link': url,
-                            'snippet': snippet,
+                    if len(html) >= config.html_offload_threshold:
+                        parsed = await extraction_pool.run(parse_ahmia_results, html, max_results)
+                    else:
+                        parsed = parse_ahmia_results(html, max_results)
+                    
+                    return [
+                        {
+                            **result,
                             'displayLink': 'ahmia.fi (Onion)',
                             'source': 'dark_web_ahmia',
                             'relevance_score': 0  # Will be calculated later
-                        })
-                    return results
+                        }
+                        for result in parsed
+                    ]
         except Exception as e:
             logger.error(f"Ahmia search failed: {e}")
+            observe_upstream(config.ahmia_url, None)
             return []
         return []
 
 async def execute_ahmia_search(session: aiohttp.ClientSession, target: str, max_results: int) -> Dict[str, Any]:
     """Execute Ahmia search and format as dork result."""
-    results = await AhmiaSearcher.search(session, target, max_results)
+    with timed('ahmia'):
+        results = await AhmiaSearcher.search(session, target, max_results)
     return {
         'dork_name': 'ahmia_dark_web',
         'query': target,
@@ -290,44 +515,56 @@ async def execute_ahmia_search(session: aiohttp.ClientSession, target: str, max_
 # ==================== Result Scoring & Ranking ====================
 class ResultScorer:
     @staticmethod
-    def calculate_relevance_score(result: Dict[str, Any], target: str) -> float:
-        score = 0.0
-        target_lower = target.lower()
-        
-        # Title matching
-        title = result.get('title', '').lower()
-        if target_lower in title:
-            score += 3.0
-        
-        # Snippet matching
-        snippet = result.get('snippet', '').lower()
-        target_count = snippet.count(target_lower)
-        score += min(target_count * 0.5, 2.0)
+    def rank_results(results: List[Dict[str, Any]], target: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Score results as one batch; with a limit only the top results are selected and sorted."""
+        scores = BatchScorer(target, config.min_snippet_length).score_batch(results)
+        for result, score in zip(results, scores):
+            result['relevance_score'] = score
         
-        # Domain authority (simple heuristic)
-        domain = result.get('displayLink', '').lower()
-        authoritative_domains = ['linkedin.com', 'github.com', 'wikipedia.org', 'reuters.com', 'nytimes.com']
-        if any(auth_domain in domain for auth_domain in authoritative_domains):
-            score += 2.0
-        
-        # Snippet length (prefer substantial content)
-        snippet_length = len(snippet)
-        if snippet_length >= config.min_snippet_length:
-            score += 1.0
-        
-        # Has extracted entities
-        if result.get('entities') and any(result['entities'].values()):
-            score += 1.5
-        
-        return score
+        return [results[i] for i in top_k_indices(scores, len(results) if limit is None else limit)]
+
+# ==================== HTTP Session ====================
+def client_timeout(total: float) -> aiohttp.ClientTimeout:
+    import aiohttp
     
-    @staticmethod
-    def rank_results(results: List[Dict[str, Any]], target: str) -> List[Dict[str, Any]]:
-        for result in results:
-            result['relevance_score'] = ResultScorer.calculate_relevance_score(result, target)
-        
-        ranked = sorted(results, key=lambda x: x.get('relevance_score', 0), reverse=True)
-        return ranked
+    return aiohttp.ClientTimeout(total=total)
+
+def create_session() -> aiohttp.ClientSession:
+    """Build a ClientSession with a pooled, keep-alive connector."""
+    import aiohttp
+    
+    connector = aiohttp.TCPConnector(
+        limit=config.connector_limit,
+        limit_per_host=config.connector_limit_per_host,
+        ttl_dns_cache=config.dns_cache_ttl,
+        keepalive_timeout=config.keepalive_timeout
+    )
+    return aiohttp.ClientSession(connector=connector)
+
+async def warm_up_session(session: aiohttp.ClientSession, urls: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Resolve DNS and open TLS connections to the known upstreams ahead of the first search."""
+    urls = urls or [config.cse_url, config.ahmia_url]
+    
+    async def touch(url: str):
+        try:
+            async with session.head(url, timeout=client_timeout(5)) as resp:
+                return resp.status
+        except Exception as e:
+            return f'error: {e}'
+    
+    statuses = await asyncio.gather(*[touch(url) for url in urls])
+    warmed = dict(zip(urls, statuses))
+    logger.info(f"Warmed up upstream connections: {warmed}")
+    return warmed
+
+@asynccontextmanager
+async def session_scope(session: Optional[aiohttp.ClientSession] = None):
+    """Use the injected session, or own a temporary one for standalone calls."""
+    if session is not None:
+        yield session
+        return
+    async with create_session() as own_session:
+        yield own_session
 
 # ==================== Retry Logic ====================
 async def retry_async(func, *args, **kwargs):
@@ -350,7 +587,7 @@ async def fetch_search_results(
     start: int = 1,
     num: int = 10
 ) -> Dict[str, Any]:
-    """Fetch results from Google Custom Search API with retry logic."""
+    """Fetch results from Google Custom Search API with caching and request coalescing."""
     cache_key = f"search_{hashlib.md5(f'{query}_{start}_{num}'.encode()).hexdigest()}"
     
     # Check cache
@@ -358,11 +595,37 @@ async def fetch_search_results(
     if cached:
         return cached
     
+    # Identical in-flight requests share a single upstream call
+    return await search_flight.do(
+        cache_key,
+        lambda: _fetch_uncached(session, api_key, cx_id, query, start, num, cache_key)
+    )
+
+async def _fetch_uncached(
+    session: aiohttp.ClientSession,
+    api_key: str,
+    cx_id: str,
+    query: str,
+    start: int,
+    num: int,
+    cache_key: str
+) -> Dict[str, Any]:
+    """Call the Custom Search API with retry logic and cache the cleaned page."""
+    url = config.cse_url
+    
+    # Wait for a rate-limit token before spending quota, so speculative
+    # pages cancelled while queued cost nothing
+    await wait_for_rate_limit(url)
+    
     # Check quota
     if not await quota_manager.acquire():
+        quota_requests.inc(outcome='denied')
         return {'error': 'Quota exhausted'}
+    quota_requests.inc(outcome='granted')
+    calls = quota_calls.get()
+    if calls is not None:
+        calls[query] = calls.get(query, 0) + 1
     
-    url = 'https://www.googleapis.com/customsearch/v1'
     params = {
         'key': api_key,
         'cx': cx_id,
@@ -371,73 +634,93 @@ async def fetch_search_results(
         'start': start
     }
     
+    attempts = 0
+    
+    async def send_request():
+        nonlocal attempts
+        # Retries wait for a fresh token from the host bucket
+        if attempts:
+            await wait_for_rate_limit(url)
+        attempts += 1
+        return await session.get(url, params=params, timeout=client_timeout(config.request_timeout))
+    
+    started = time.perf_counter()
+    outcome = 'error'  # No response came back
     try:
-        async with api_rate_limit_lock:
-            # Enforce rate limiting delay
-            await asyncio.sleep(config.request_delay)
-            
-            result = await retry_async(
-                lambda: session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=config.request_timeout))
-            )
+        try:
+            result = await retry_async(send_request)
+            async with result as resp:
+                status = resp.status
+                observe_upstream(url, status)
+                if status == 200:
+                    outcome = 'invalid_body'
+                    data = await resp.json()
+                    outcome = 'ok'
+                else:
+                    outcome = 'throttled' if status == 429 else 'http_error'
+        finally:
+            seconds = time.perf_counter() - started
+            record_stage('cse_fetch', seconds)
+            cse_fetch_seconds.observe(seconds, outcome=outcome)
         
-        async with result as resp:
-            if resp.status == 200:
-                data = await resp.json()
-                items = data.get('items', [])
-                
-                cleaned = []
-                for item in items:
-                    snippet = item.get('snippet', '')
-                    cleaned_item = {
-                        'title': item.get('title', '').strip(),
-                        'link': item.get('link', ''),
-                        'snippet': snippet.strip(),
-                        'displayLink': item.get('displayLink', ''),
-                        'pagemap': item.get('pagemap', {})
-                    }
-                    
-                    # Extract entities from snippet
-                    if config.enable_entity_extraction:
-                        cleaned_item['entities'] = EntityExtractor.extract_all(snippet)
-                    
-                    cleaned.append(cleaned_item)
-                
-                result_data = {
-                    'results': cleaned,
-                    'totalResults': data.get('searchInformation', {}).get('totalResults', 0),
-                    'searchTime': data.get('searchInformation', {}).get('searchTime', 0)
-                }
-                
-                # Cache results
-                await cache.set(cache_key, result_data)
-                
-                return result_data
-            elif resp.status == 429:
-                logger.error("Rate limited by API")
-                return {'error': 'Rate limited'}
-            else:
-                return {'error': f'Status {resp.status}'}
+        if status == 200:
+            items = data.get('items', [])
+            
+            cleaned = []
+            for item in items:
+                snippet = item.get('snippet', '')
+                cleaned.append({
+                    'title': item.get('title', '').strip(),
+                    'link': item.get('link', ''),
+                    'snippet': snippet.strip(),
+                    'displayLink': item.get('displayLink', ''),
+                    'pagemap': item.get('pagemap', {})
+                })
+            
+            # Extract entities from all snippets of the page in one batch
+            if config.enable_entity_extraction:
+                with timed('entity_extraction'):
+                    entities = await extraction_pool.extract_many([item.get('snippet', '') for item in items])
+                for cleaned_item, item_entities in zip(cleaned, entities):
+                    cleaned_item['entities'] = item_entities
+            
+            result_data = {
+                'results': cleaned,
+                'totalResults': data.get('searchInformation', {}).get('totalResults', 0),
+                'searchTime': data.get('searchInformation', {}).get('searchTime', 0)
+            }
+            
+            # Cache results
+            await cache.set(cache_key, result_data)
+            
+            return result_data
+        elif status == 429:
+            logger.error("Rate limited by API")
+            return {'error': 'Rate limited'}
+        else:
+            return {'error': f'Status {status}'}
                 
     except Exception as e:
         logger.error(f"Search error for '{query}': {e}")
+        if outcome == 'error':
+            observe_upstream(url, None)
         return {'error': str(e)}
 
-async def execute_single_dork(
+async def paginate_sequential(
     session: aiohttp.ClientSession,
     api_key: str,
     cx_id: str,
-    target: str,
     dork_name: str,
     query: str,
     max_results: int
-) -> Dict[str, Any]:
-    """Execute a single dork with pagination."""
+) -> Tuple[List[Dict[str, Any]], int, int]:
+    """Fetch result pages one after another until a page comes back empty."""
     all_results = []
     total_results = 0
     pages_fetched = 0
     start = 1
     
-    while len(all_results) < max_results and start <= 91:  # Google CSE limit
+    while len(all_results) < max_results and start <= CSE_MAX_START:
         page_result = await fetch_search_results(
             session, api_key, cx_id, query, start, min(10, max_results - len(all_results))
         )
@@ -457,16 +740,96 @@ async def execute_single_dork(
         
         pages_fetched += 1
         start += 10
-        
-        # Rate limiting between pages
-        await asyncio.sleep(0.5)
+    
+    return all_results, total_results, pages_fetched
+
+async def paginate_concurrent(
+    session: aiohttp.ClientSession,
+    api_key: str,
+    cx_id: str,
+    dork_name: str,
+    query: str,
+    max_results: int
+) -> Tuple[List[Dict[str, Any]], int, int]:
+    """
+    Fetch the first page, then fan out the remaining pages concurrently.
+    
+    The fan-out is sized from the first page's totalResults and the remaining
+    quota; pages are consumed in order and everything after a short or failed
+    page is cancelled.
+    """
+    first_num = min(10, max_results)
+    first_page = await fetch_search_results(session, api_key, cx_id, query, 1, first_num)
+    
+    if 'error' in first_page:
+        logger.error(f"Dork '{dork_name}' failed: {first_page['error']}")
+        return [], 0, 0
+    
+    all_results = list(first_page.get('results', []))
+    total_results = int(first_page.get('totalResults', 0))
+    if not all_results:
+        return [], total_results, 0
+    if len(all_results) < first_num:
+        return all_results, total_results, 1
+    
+    wanted = min(max_results, total_results, CSE_MAX_START + 9)
+    starts = list(range(11, wanted + 1, 10))[:quota_manager.get_remaining()]
+    tasks = [
+        asyncio.ensure_future(fetch_search_results(
+            session, api_key, cx_id, query, start, min(10, max_results - (start - 1))
+        ))
+        for start in starts
+    ]
+    
+    pages_fetched = 1
+    try:
+        for start, task in zip(starts, tasks):
+            page_result = await task
+            if 'error' in page_result:
+                logger.error(f"Dork '{dork_name}' failed at start={start}: {page_result['error']}")
+                break
+            
+            results = page_result.get('results', [])
+            all_results.extend(results)
+            if results:
+                pages_fetched += 1
+            if len(results) < min(10, max_results - (start - 1)):
+                break
+    finally:
+        pending = [task for task in tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+    
+    return all_results, total_results, pages_fetched
+
+async def execute_single_dork(
+    session: aiohttp.ClientSession,
+    api_key: str,
+    cx_id: str,
+    target: str,
+    dork_name: str,
+    query: str,
+    max_results: int
+) -> Dict[str, Any]:
+    """Execute a single dork with pagination."""
+    if config.pagination_mode == 'concurrent':
+        all_results, total_results, pages_fetched = await paginate_concurrent(
+            session, api_key, cx_id, dork_name, query, max_results
+        )
+    else:
+        all_results, total_results, pages_fetched = await paginate_sequential(
+            session, api_key, cx_id, dork_name, query, max_results
+        )
     
     # Fallback browsing for low-yield dorks
     if config.enable_fallback_browse and len(all_results) > 0 and len(all_results) < 5:
         scraper = WebScraper()
         top_url = all_results[0]['link']
         logger.info(f"Fallback browse for '{dork_name}': {top_url}")
-        browse_result = await scraper.browse_url(session, top_url, target)
+        with timed('fallback_browse'):
+            browse_result = await scraper.browse_url(session, top_url, target)
         if 'error' not in browse_result:
             all_results.append({
                 'title': browse_result.get('title', 'Scraped Content'),
@@ -483,10 +846,310 @@ async def execute_single_dork(
         'query': query,
         'total_results': total_results,
         'pages_fetched': pages_fetched,
+        'quota_calls': (quota_calls.get() or {}).get(query, 0),
         'results': all_results[:max_results]
     }
 
+async def execute_merged_dork(
+    session: aiohttp.ClientSession,
+    api_key: str,
+    cx_id: str,
+    target: str,
+    query: str,
+    members: Dict[str, List[str]],
+    dorks: Dict[str, str],
+    max_results: int
+) -> List[Dict[str, Any]]:
+    """
+    Run one OR query standing in for several site-only dorks and split its
+    results back into one dork result per member, by the site each link is on.
+    Results on none of the members' sites are kept under an entry of their own.
+    """
+    merged = await execute_single_dork(session, api_key, cx_id, target, 'merged', query, max_results)
+    
+    unassigned_name = f"merged_unassigned:{'+'.join(members)}"
+    assigned: Dict[str, List[Dict[str, Any]]] = {dork_name: [] for dork_name in members}
+    assigned[unassigned_name] = []
+    for result in merged['results']:
+        url = result.get('link') or result.get('displayLink') or ''
+        owner = next((name for name, sites in members.items() if any(matches_site(url, site) for site in sites)), None)
+        assigned[owner or unassigned_name].append(result)
+    if not assigned[unassigned_name]:
+        del assigned[unassigned_name]
+    
+    # Calls are shared out by the results each dork received, for the planner's yield history
+    total = len(merged['results'])
+    
+    def share(calls: float, results: List[Dict[str, Any]]) -> float:
+        return round(calls * (len(results) / total if total else 1 / len(members)), 2)
+    
+    return [
+        {
+            'dork_name': dork_name,
+            'query': dorks.get(dork_name, query),
+            'total_results': merged['total_results'],
+            'pages_fetched': share(merged['pages_fetched'], results),
+            'quota_calls': share(merged['quota_calls'], results),
+            'results': results,
+            'merged_query': query
+        }
+        for dork_name, results in assigned.items()
+    ]
+
+def dork_results(result: Any) -> List[Dict[str, Any]]:
+    """A dork task returns one dork result, or a list of them for a merged query."""
+    return result if isinstance(result, list) else [result]
+
+# ==================== Result Aggregation ====================
+class SearchAccumulator:
+    """
+    Folds dork results into deduplicated, ranked results and entity aggregates.
+    
+    Results are deduplicated, scored and aggregated as each dork is added, so
+    the same state backs both the batch response and the streaming endpoint.
+    """
+    
+    def __init__(self, target: str, enable_dedup: bool = True, enable_ranking: bool = True):
+        self.target = target
+        self.enable_ranking = enable_ranking
+        self.deduplicator = (
+            ResultDeduplicator(config.dedup_similarity_threshold)
+            if enable_dedup and config.enable_deduplication else None
+        )
+        self.dork_summary: Dict[str, Dict[str, Any]] = {}
+        self.results: List[Dict[str, Any]] = []
+        self.ranker = IncrementalRanker(BatchScorer(target, config.min_snippet_length)) if enable_ranking else None
+        self.raw_count = 0
+        self.new_counts: Dict[str, int] = {}  # Unique results each dork contributed
+        self.quota_calls: Dict[str, float] = {}  # CSE calls each dork spent quota on
+        self.dork_links: Dict[str, List[str]] = {}  # Ranked links of each dork, before dedup
+        self.raw_results: Dict[str, Dict[str, Any]] = {}  # Every result by link, before dedup
+        self.entities = {
+            'emails': set(),
+            'phones': set(),
+            'urls': set(),
+            'social_handles': defaultdict(set),
+            'dates': set()
+        }
+    
+    def add(self, dork_result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Add one dork's output and return the results that were new."""
+        self.dork_summary[dork_result['dork_name']] = {
+            'query': dork_result['query'],
+            'total_results': dork_result['total_results'],
+            'pages_fetched': dork_result['pages_fetched'],
+            'results_count': len(dork_result['results'])
+        }
+        if 'merged_query' in dork_result:
+            self.dork_summary[dork_result['dork_name']]['merged_query'] = dork_result['merged_query']
+        self.raw_count += len(dork_result['results'])
+        self.dork_links[dork_result['dork_name']] = [r['link'] for r in dork_result['results'] if r.get('link')]
+        for result in dork_result['results']:
+            if result.get('link'):
+                self.raw_results.setdefault(result['link'], result)
+        
+        with timed('dedup'):
+            if self.deduplicator:
+                new_results = [result for result in dork_result['results'] if not self.deduplicator.is_duplicate(result)]
+            else:
+                new_results = list(dork_result['results'])
+        self.results.extend(new_results)
+        with timed('aggregation'):
+            for result in new_results:
+                self._aggregate(result.get('entities', {}))
+        if self.ranker is not None:
+            with timed('ranking'):
+                self.ranker.add_batch(new_results)
+        self.new_counts[dork_result['dork_name']] = len(new_results)
+        self.quota_calls[dork_result['dork_name']] = dork_result.get('quota_calls', 0)
+        return new_results
+    
+    def yield_observations(self, planned: Dict[str, int]) -> Dict[str, Tuple[float, float]]:
+        """
+        (quota calls, new unique results) per planned dork, for the dork
+        planner's history. Only pages that spent quota count: results are
+        scaled to the share of the dork's pages that did, and dorks served
+        entirely from the cache are left out.
+        """
+        observations = {}
+        for name in planned:
+            calls = self.quota_calls.get(name, 0)
+            if name not in self.dork_summary or calls <= 0:
+                continue
+            pages = max(self.dork_summary[name]['pages_fetched'], calls)
+            observations[name] = (calls, self.new_counts.get(name, 0) * calls / pages)
+        return observations
+    
+    async def persist(self, target_type: str):
+        """Save the target's snapshot and index its entities once the search is done."""
+        # Both work on everything fetched, not just what survived dedup
+        fetched = list(self.raw_results.values())
+        with timed('persist'):
+            await self._persist(target_type, fetched)
+    
+    async def _persist(self, target_type: str, fetched: List[Dict[str, Any]]):
+        if config.enable_snapshots:
+            await snapshot_store.save(self.target, target_type, self.dork_links, fetched)
+        if config.enable_entity_index:
+            await entity_index.record(self.target, target_type, fetched)
+    
+    def _aggregate(self, entities: Dict[str, Any]):
+        self.entities['emails'].update(entities.get('emails', []))
+        self.entities['phones'].update(entities.get('phones', []))
+        self.entities['urls'].update(entities.get('urls', []))
+        for platform, handles in entities.get('social_handles', {}).items():
+            self.entities['social_handles'][platform].update(handles)
+        self.entities['dates'].update(entities.get('dates', []))
+    
+    def ranked_results(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        if self.ranker is None:
+            return self.results[:limit]
+        return self.ranker.top(limit)
+    
+    def aggregated_entities(self) -> Dict[str, Any]:
+        # Convert sets to lists for JSON serialization
+        return {
+            'emails': sorted(self.entities['emails']),
+            'phones': sorted(self.entities['phones']),
+            'urls': sorted(self.entities['urls'])[:50],  # Limit URLs
+            'social_handles': {k: sorted(v) for k, v in self.entities['social_handles'].items()},
+            'dates': sorted(self.entities['dates'])
+        }
+    
+    def build_response(self, target_type: str, dorks_executed: int, start_time: float,
+                       plan: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        if self.deduplicator:
+            logger.info(f"Deduplicated: {self.raw_count} -> {len(self.results)}")
+        with timed('ranking'):
+            all_results = self.ranked_results()
+        with timed('aggregation'):
+            aggregated = self.aggregated_entities()
+        execution_time = time.time() - start_time
+        
+        response = {
+            'metadata': {
+                'target': self.target,
+                'target_type': target_type,
+                'timestamp': datetime.now().isoformat(),
+                'execution_time': round(execution_time, 2),
+                'total_results': len(all_results),
+                'dorks_executed': dorks_executed,
+                'quota_used': quota_manager.used,
+                'quota_remaining': quota_manager.get_remaining(),
+                'cache': cache.stats(),
+                'rate_limits': rate_limiter.stats(),
+                'coalescing': search_flight.stats(),
+                'extraction': {**extraction_pool.stats(), 'loop_lag': loop_monitor.stats()},
+                'browse': browse_stats_dict(),
+                'dedup': self.deduplicator.stats() if self.deduplicator else None
+            },
+            'dork_summary': self.dork_summary,
+            'aggregated_entities': aggregated,
+            'top_results': all_results[:50],  # Return top 50 results
+            'all_results': all_results  # Full results list
+        }
+        if plan is not None:
+            response['plan'] = plan
+        timings = search_timings.get()
+        if timings is not None:
+            response['metadata']['timings'] = timings.to_dict()
+        return response
+
 # ==================== Main Deep Search ====================
+def prepare_search(
+    target: str,
+    target_type: str,
+    deep_search_enabled: bool,
+    dark_web_enabled: bool,
+    social_media_enabled: bool
+) -> Tuple[str, str, Dict[str, str]]:
+    """Validate the request and credentials, then generate the dork queries."""
+    # Validate target type
+    valid_types = ['person', 'email', 'phone']
+    if target_type not in valid_types:
+        raise ValueError(f"Invalid target_type '{target_type}'. Must be one of: {valid_types}")
+    
+    # Validate environment variables
+    load_environment()
+    api_key = os.getenv("GOOGLE_API_KEY")
+    cx_id = os.getenv("GOOGLE_CX_ID")
+    if not api_key or not cx_id:
+        raise ValueError("Missing GOOGLE_API_KEY or GOOGLE_CX_ID environment variables")
+    
+    logger.info(f"Starting deep search: target='{target}', type='{target_type}'")
+    
+    # Generate dorks
+    options = {
+        'deep_search': deep_search_enabled,
+        'dark_web': dark_web_enabled,
+        'social_media': social_media_enabled
+    }
+    with timed('dork_generation'):
+        dorks = DorkGenerator.generate_dorks(target, target_type, options)
+    logger.info(f"Generated {len(dorks)} dork queries")
+    return api_key, cx_id, dorks
+
+async def plan_dorks(
+    dorks: Dict[str, str],
+    target_type: str,
+    max_results_per_dork: int
+) -> Tuple[Dict[str, int], Optional[List[Dict[str, Any]]]]:
+    """Return the result budget of each dork to run, in run order, and the plan behind it."""
+    if not config.enable_dork_planner:
+        return {dork_name: max_results_per_dork for dork_name in dorks}, None
+    
+    with timed('dork_planning'):
+        plan = await dork_planner.plan(dorks, target_type, max_results_per_dork, quota_manager.get_remaining())
+    budgets = {
+        entry['dork_name']: min(max_results_per_dork, entry['pages'] * 10)
+        for entry in plan if entry['pages'] > 0
+    }
+    skipped = [entry['dork_name'] for entry in plan if entry['pages'] == 0]
+    logger.info(f"Planned {sum(e['pages'] for e in plan)} pages over {len(budgets)} dorks, skipped: {skipped}")
+    return budgets, plan
+
+def build_dork_tasks(
+    session: aiohttp.ClientSession,
+    api_key: str,
+    cx_id: str,
+    target: str,
+    dorks: Dict[str, str],
+    budgets: Dict[str, int],
+    max_results_per_dork: int,
+    dark_web_enabled: bool,
+    merge_dorks: bool = False
+) -> List[Awaitable[Any]]:
+    merged_groups = {}
+    if merge_dorks:
+        planned = {dork_name: dorks[dork_name] for dork_name in budgets}
+        merged_groups = DorkGenerator.merge_site_dorks(planned, config.merge_max_sites)
+    member_of = {dork_name: query for query, members in merged_groups.items() for dork_name in members}
+    
+    tasks = []
+    for dork_name, max_results in budgets.items():
+        if dork_name not in member_of:
+            tasks.append(execute_single_dork(
+                session, api_key, cx_id, target, dork_name, dorks[dork_name], max_results
+            ))
+            continue
+        query = member_of[dork_name]
+        members = merged_groups.pop(query, None)
+        if members is None:
+            continue  # Group already scheduled by an earlier member
+        # Budgeted like its largest member: the saving is the calls the other members would have made
+        max_results = max(budgets[name] for name in members)
+        tasks.append(execute_merged_dork(
+            session, api_key, cx_id, target, query, members, dorks, max_results
+        ))
+    if member_of:
+        logger.info(f"Merged {len(member_of)} site dorks into {len(set(member_of.values()))} OR queries")
+    
+    # Add Dark Web specific search if enabled
+    if dark_web_enabled:
+        tasks.append(execute_ahmia_search(session, target, max_results_per_dork))
+    return tasks
+
+@tracked_search('batch')
 async def deep_search(
     target: str,
     target_type: str = 'person',
@@ -495,7 +1158,10 @@ async def deep_search(
     enable_ranking: bool = True,
     deep_search_enabled: bool = False,
     dark_web_enabled: bool = False,
-    social_media_enabled: bool = True
+    social_media_enabled: bool = True,
+    merge_dorks: bool = False,
+    session: Optional[aiohttp.ClientSession] = None,
+    include_timings: bool = False
 ) -> Dict[str, Any]:
     """
     Advanced OSINT deep search with comprehensive features.
@@ -509,120 +1175,354 @@ async def deep_search(
         deep_search_enabled: Enable deep search mode
         dark_web_enabled: Enable dark web dorks
         social_media_enabled: Enable social media dorks
+        merge_dorks: Run dorks that differ only in site: filters as merged OR queries (fewer
+            CSE calls, but the members share one query's results, so fewer results too)
+        session: Shared ClientSession to reuse; a temporary one is created if omitted
+        include_timings: Add a per-stage timing breakdown to metadata['timings']
     
     Returns:
         Comprehensive search results with metadata
     """
-    # Validate target type
-    valid_types = ['person', 'email', 'phone']
-    if target_type not in valid_types:
-        raise ValueError(f"Invalid target_type '{target_type}'. Must be one of: {valid_types}")
+    start_time = time.time()
+    loop_monitor.ensure_running()
+    browse_stats.set(BrowseStats())
+    quota_calls.set({})
+    search_timings.set(SearchTimings() if include_timings else None)
+    api_key, cx_id, dorks = prepare_search(
+        target, target_type, deep_search_enabled, dark_web_enabled, social_media_enabled
+    )
+    budgets, plan = await plan_dorks(dorks, target_type, max_results_per_dork)
     
+    # Execute all dorks concurrently
+    async with session_scope(session) as session:
+        tasks = build_dork_tasks(
+            session, api_key, cx_id, target, dorks, budgets, max_results_per_dork, dark_web_enabled, merge_dorks
+        )
+        task_results = await asyncio.gather(*tasks, return_exceptions=True)
+    
+    # Process results in dork order
+    accumulator = SearchAccumulator(target, enable_dedup, enable_ranking)
+    for result in task_results:
+        if isinstance(result, Exception):
+            logger.error(f"Dork execution exception: {result}")
+            continue
+        for dork_result in dork_results(result):
+            accumulator.add(dork_result)
+    
+    if plan is not None:
+        await dork_planner.record(target_type, accumulator.yield_observations(budgets))
+    await accumulator.persist(target_type)
+    return accumulator.build_response(target_type, len(budgets), start_time, plan)
+
+@tracked_search('stream')
+async def deep_search_stream(
+    target: str,
+    target_type: str = 'person',
+    max_results_per_dork: int = 50,
+    enable_dedup: bool = True,
+    enable_ranking: bool = True,
+    deep_search_enabled: bool = False,
+    dark_web_enabled: bool = False,
+    social_media_enabled: bool = True,
+    merge_dorks: bool = False,
+    top_k: int = 10,
+    session: Optional[aiohttp.ClientSession] = None,
+    include_all_results: bool = False,
+    include_timings: bool = False
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streaming variant of deep_search that yields events as dorks complete.
+    
+    Events, in order:
+        start: the dork names about to run
+        dork: one per completed dork, with its new unique results, the current
+            top_k ranking and the running entity aggregate
+        dork_error: a dork raised instead of returning results
+        complete: the deep_search response; all_results is left out unless
+            include_all_results is set, since every result was already streamed;
+            metadata['timings'] holds the per-stage breakdown if include_timings is set
+    """
     start_time = time.time()
+    loop_monitor.ensure_running()
+    browse_stats.set(BrowseStats())
+    quota_calls.set({})
+    search_timings.set(SearchTimings() if include_timings else None)
+    api_key, cx_id, dorks = prepare_search(
+        target, target_type, deep_search_enabled, dark_web_enabled, social_media_enabled
+    )
+    budgets, plan = await plan_dorks(dorks, target_type, max_results_per_dork)
+    accumulator = SearchAccumulator(target, enable_dedup, enable_ranking)
     
-    # Validate environment variables
-    api_key = os.getenv("GOOGLE_API_KEY")
-    cx_id = os.getenv("GOOGLE_CX_ID")
-    if not api_key or not cx_id:
-        raise ValueError("Missing GOOGLE_API_KEY or GOOGLE_CX_ID environment variables")
+    async with session_scope(session) as session:
+        tasks = [
+            asyncio.ensure_future(task)
+            for task in build_dork_tasks(
+                session, api_key, cx_id, target, dorks, budgets, max_results_per_dork, dark_web_enabled, merge_dorks
+            )
+        ]
+        yield {
+            'event': 'start', 'target': target, 'target_type': target_type,
+            'dorks': list(budgets), 'plan': plan, 'total': len(tasks)
+        }
+        
+        try:
+            for completed, next_done in enumerate(asyncio.as_completed(tasks), 1):
+                progress = {'completed': completed, 'total': len(tasks)}
+                try:
+                    result = await next_done
+                except Exception as e:
+                    logger.error(f"Dork execution exception: {e}")
+                    yield {'event': 'dork_error', 'error': str(e), 'progress': progress}
+                    continue
+                
+                for dork_result in dork_results(result):
+                    new_results = accumulator.add(dork_result)
+                    yield {
+                        'event': 'dork',
+                        'dork_name': dork_result['dork_name'],
+                        'summary': accumulator.dork_summary[dork_result['dork_name']],
+                        'results': new_results,
+                        'top_results': [
+                            {'link': r.get('link'), 'title': r.get('title'), 'relevance_score': r.get('relevance_score', 0)}
+                            for r in accumulator.ranked_results(top_k)
+                        ],
+                        'aggregated_entities': accumulator.aggregated_entities(),
+                        'progress': progress
+                    }
+        finally:
+            # The consumer may stop early (client disconnect); don't leak dork tasks
+            pending = [task for task in tasks if not task.done()]
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
     
-    logger.info(f"Starting deep search: target='{target}', type='{target_type}'")
+    if plan is not None:
+        await dork_planner.record(target_type, accumulator.yield_observations(budgets))
+    await accumulator.persist(target_type)
+    response = accumulator.build_response(target_type, len(budgets), start_time, plan)
+    if not include_all_results:
+        response.pop('all_results')
+    yield {'event': 'complete', **response}
+
+# ==================== Delta Search ====================
+async def paginate_until_known(
+    session: aiohttp.ClientSession,
+    api_key: str,
+    cx_id: str,
+    dork_name: str,
+    query: str,
+    known: Set[str],
+    max_results: int
+) -> Tuple[List[Dict[str, Any]], int, int, bool]:
+    """
+    Fetch pages in order until one contains a link that is already known.
     
-    # Generate dorks
-    options = {
-        'deep_search': deep_search_enabled,
-        'dark_web': dark_web_enabled,
-        'social_media': social_media_enabled
+    The last value tells whether the dork ran out of results, in which case
+    the fetched pages are its whole current ranking.
+    """
+    all_results = []
+    total_results = 0
+    pages_fetched = 0
+    start = 1
+    
+    while len(all_results) < max_results and start <= CSE_MAX_START:
+        num = min(10, max_results - len(all_results))
+        page_result = await fetch_search_results(session, api_key, cx_id, query, start, num)
+        
+        if 'error' in page_result:
+            logger.error(f"Dork '{dork_name}' failed: {page_result['error']}")
+            return all_results, total_results, pages_fetched, False
+        
+        results = page_result.get('results', [])
+        if pages_fetched == 0:
+            total_results = int(page_result.get('totalResults', 0))
+        pages_fetched += 1
+        all_results.extend(results)
+        
+        if len(results) < num:
+            return all_results, total_results, pages_fetched, True
+        if any(result.get('link') in known for result in results):
+            break
+        start += 10
+    
+    return all_results, total_results, pages_fetched, False
+
+async def execute_delta_dork(
+    session: aiohttp.ClientSession,
+    api_key: str,
+    cx_id: str,
+    dork_name: str,
+    query: str,
+    known: Set[str],
+    max_results: int
+) -> Dict[str, Any]:
+    all_results, total_results, pages_fetched, exhausted = await paginate_until_known(
+        session, api_key, cx_id, dork_name, query, known, max_results
+    )
+    return {
+        'dork_name': dork_name,
+        'query': query,
+        'total_results': total_results,
+        'pages_fetched': pages_fetched,
+        'results': all_results,
+        'exhausted': exhausted
     }
-    dorks = DorkGenerator.generate_dorks(target, target_type, options)
-    logger.info(f"Generated {len(dorks)} dork queries")
+
+def splice_ranking(previous: List[str], fresh: List[str], exhausted: bool) -> Tuple[List[str], List[str]]:
+    """
+    Put a dork's freshly fetched links in front of the unrefreshed tail of
+    its previous ranking. Returns the new ranking and the previous links that
+    should have shown up in the fetched range but did not.
+    """
+    fresh_set = set(fresh)
+    if exhausted:
+        covered = len(previous)
+    else:
+        # Everything ranked above the deepest link seen again was re-checked
+        covered = max((i + 1 for i, link in enumerate(previous) if link in fresh_set), default=0)
+    dropped = [link for link in previous[:covered] if link not in fresh_set]
+    return fresh + [link for link in previous[covered:] if link not in fresh_set], dropped
+
+def entity_delta(before: List[Dict[str, Any]], after: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Entities that only appear after (added) or only before (removed)."""
+    old, new = SearchAccumulator(''), SearchAccumulator('')
+    for result in before:
+        old._aggregate(result.get('entities', {}))
+    for result in after:
+        new._aggregate(result.get('entities', {}))
     
-    # Execute all dorks concurrently
-    async with aiohttp.ClientSession() as session:
+    def difference(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+        platforms = set(a['social_handles']) | set(b['social_handles'])
+        return {
+            'emails': sorted(a['emails'] - b['emails']),
+            'phones': sorted(a['phones'] - b['phones']),
+            'urls': sorted(a['urls'] - b['urls']),
+            'social_handles': {
+                platform: sorted(a['social_handles'][platform] - b['social_handles'][platform])
+                for platform in sorted(platforms)
+                if a['social_handles'][platform] - b['social_handles'][platform]
+            },
+            'dates': sorted(a['dates'] - b['dates'])
+        }
+    return {'added': difference(new.entities, old.entities), 'removed': difference(old.entities, new.entities)}
+
+@tracked_search('delta')
+async def deep_search_delta(
+    target: str,
+    target_type: str = 'person',
+    max_results_per_dork: int = 50,
+    deep_search_enabled: bool = False,
+    dark_web_enabled: bool = False,
+    social_media_enabled: bool = True,
+    session: Optional[aiohttp.ClientSession] = None
+) -> Dict[str, Any]:
+    """
+    Re-run a search against the target's last snapshot and return only what changed.
+    
+    Each dork reads pages until it reaches a link the snapshot already knows,
+    at most delta_max_pages, so an unchanged target costs about one call per
+    dork. Without a snapshot a full deep_search runs and becomes the baseline.
+    
+    Returns:
+        added / removed results, added / removed entities and a per-dork summary
+    """
+    start_time = time.time()
+    api_key, cx_id, dorks = prepare_search(
+        target, target_type, deep_search_enabled, dark_web_enabled, social_media_enabled
+    )
+    snapshot = await snapshot_store.load(target, target_type)
+    if snapshot is None:
+        logger.info(f"No snapshot for '{target}', running a full baseline search")
+        # The untracked function: this search is already counted as a delta search
+        response = await deep_search.__wrapped__(
+            target, target_type, max_results_per_dork,
+            deep_search_enabled=deep_search_enabled,
+            dark_web_enabled=dark_web_enabled,
+            social_media_enabled=social_media_enabled,
+            session=session
+        )
+        return {
+            'metadata': {**response['metadata'], 'mode': 'delta', 'baseline': True, 'previous_run': None},
+            'added': response['all_results'],
+            'removed': [],
+            'entities': entity_delta([], response['all_results']),
+            'dork_summary': response['dork_summary']
+        }
+    
+    loop_monitor.ensure_running()
+    browse_stats.set(BrowseStats())
+    previous = snapshot['results']
+    known = set(previous) | {link for links in snapshot['dorks'].values() for link in links}
+    max_results = min(max_results_per_dork, config.delta_max_pages * 10)
+    
+    async with session_scope(session) as session:
         tasks = [
-            execute_single_dork(
-                session, api_key, cx_id, target, dork_name, query, max_results_per_dork
-            )
+            execute_delta_dork(session, api_key, cx_id, dork_name, query, known, max_results)
             for dork_name, query in dorks.items()
         ]
-        
-        # Add Dark Web specific search if enabled
         if dark_web_enabled:
             tasks.append(execute_ahmia_search(session, target, max_results_per_dork))
-        
-        dork_results = await asyncio.gather(*tasks, return_exceptions=True)
-    
-    # Process results
-    processed_results = {}
-    all_results = []
+        task_results = await asyncio.gather(*tasks, return_exceptions=True)
     
-    for result in dork_results:
+    rankings = dict(snapshot['dorks'])
+    fresh: Dict[str, Dict[str, Any]] = {}
+    dropped: Set[str] = set()
+    dork_summary = {}
+    for result in task_results:
         if isinstance(result, Exception):
             logger.error(f"Dork execution exception: {result}")
             continue
-        
         dork_name = result['dork_name']
-        processed_results[dork_name] = {
+        links = [r['link'] for r in result['results'] if r.get('link')]
+        rankings[dork_name], dork_dropped = splice_ranking(
+            snapshot['dorks'].get(dork_name, []), links, result.get('exhausted', True)
+        )
+        dropped.update(dork_dropped)
+        for r in result['results']:
+            if r.get('link'):
+                fresh.setdefault(r['link'], r)
+        dork_summary[dork_name] = {
             'query': result['query'],
             'total_results': result['total_results'],
             'pages_fetched': result['pages_fetched'],
-            'results_count': len(result['results'])
+            'results_count': len(result['results']),
+            'new': sum(1 for link in links if link not in known),
+            'dropped': len(dork_dropped)
         }
-        all_results.extend(result['results'])
-    
-    # Deduplication
-    if enable_dedup and config.enable_deduplication:
-        deduplicator = ResultDeduplicator()
-        all_results = deduplicator.deduplicate(all_results)
-    
-    # Ranking
-    if enable_ranking:
-        all_results = ResultScorer.rank_results(all_results, target)
-    
-    # Aggregate entities
-    aggregated_entities = {
-        'emails': set(),
-        'phones': set(),
-        'urls': set(),
-        'social_handles': defaultdict(set),
-        'dates': set()
-    }
     
-    for result in all_results:
-        entities = result.get('entities', {})
-        aggregated_entities['emails'].update(entities.get('emails', []))
-        aggregated_entities['phones'].update(entities.get('phones', []))
-        aggregated_entities['urls'].update(entities.get('urls', []))
-        for platform, handles in entities.get('social_handles', {}).items():
-            aggregated_entities['social_handles'][platform].update(handles)
-        aggregated_entities['dates'].update(entities.get('dates', []))
-    
-    # Convert sets to lists for JSON serialization
-    aggregated_entities = {
-        'emails': sorted(list(aggregated_entities['emails'])),
-        'phones': sorted(list(aggregated_entities['phones'])),
-        'urls': sorted(list(aggregated_entities['urls']))[:50],  # Limit URLs
-        'social_handles': {k: sorted(list(v)) for k, v in aggregated_entities['social_handles'].items()},
-        'dates': sorted(list(aggregated_entities['dates']))
-    }
+    still_ranked = {link for links in rankings.values() for link in links}
+    removed = [previous.get(link, {'link': link}) for link in sorted(dropped - still_ranked)]
+    added = ResultScorer.rank_results([r for link, r in fresh.items() if link not in known], target)
     
-    execution_time = time.time() - start_time
+    current = {link: r for link, r in previous.items() if link in still_ranked}
+    current.update((link, snapshot_fields(r)) for link, r in fresh.items())
+    await snapshot_store.save(target, target_type, rankings, list(current.values()))
+    if config.enable_entity_index:
+        await entity_index.record(target, target_type, list(current.values()))
     
     return {
         'metadata': {
             'target': target,
             'target_type': target_type,
+            'mode': 'delta',
+            'baseline': False,
+            'previous_run': datetime.fromtimestamp(snapshot['taken']).isoformat(),
             'timestamp': datetime.now().isoformat(),
-            'execution_time': round(execution_time, 2),
-            'total_results': len(all_results),
-            'dorks_executed': len(dorks),
+            'execution_time': round(time.time() - start_time, 2),
+            'dorks_executed': len(dork_summary),
+            'pages_fetched': sum(summary['pages_fetched'] for summary in dork_summary.values()),
+            'added_count': len(added),
+            'removed_count': len(removed),
             'quota_used': quota_manager.used,
-            'quota_remaining': quota_manager.get_remaining()
+            'quota_remaining': quota_manager.get_remaining(),
+            'cache': cache.stats(),
+            'browse': browse_stats_dict()
         },
-        'dork_summary': processed_results,
-        'aggregated_entities': aggregated_entities,
-        'top_results': all_results[:50],  # Return top 50 results
-        'all_results': all_results  # Full results list
+        'added': added,
+        'removed': removed,
+        'entities': entity_delta(list(previous.values()), list(current.values())),
+        'dork_summary': dork_summary
     }
 
 # ==================== Export Functions ====================
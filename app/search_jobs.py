@@ -0,0 +1,319 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
+
+from app.deep_search import config, deep_search_stream
+from utils.response_shaping import dumps, loads
+from utils.storage import connect_sqlite, data_path
+
+if TYPE_CHECKING:
+    import aiohttp
+
+logger = logging.getLogger(__name__)
+
+STATUSES = ('queued', 'running', 'completed', 'failed', 'cancelled')
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+@dataclass
+class SearchJob:
+    job_id: str
+    params: Dict[str, Any]
+    priority: int = 0
+    status: str = 'queued'  # queued, running, completed, failed, cancelled
+    progress: Dict[str, int] = field(default_factory=lambda: {'completed': 0, 'total': 0})
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ('completed', 'failed', 'cancelled')
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'priority': self.priority,
+            'target': self.params.get('target'),
+            'progress': self.progress,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+
+class JobStore:
+    """
+    Jobs, their progress and results in the shared data directory, so any
+    API worker can answer for a job and any worker's pool can run it.
+    """
+
+    COLUMNS = 'job_id, params, priority, status, progress, error, created_at, started_at, finished_at'
+
+    def __init__(self, path: str = ''):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            conn = connect_sqlite(self.path or data_path('search_jobs.sqlite3'))
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, params TEXT NOT NULL, priority INTEGER NOT NULL, status TEXT NOT NULL, "
+                "progress TEXT NOT NULL, result BLOB, error TEXT, created_at REAL NOT NULL, "
+                "started_at REAL, finished_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority DESC, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at)")
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _job(row, result: Optional[bytes] = None) -> SearchJob:
+        job_id, params, priority, status, progress, error, created_at, started_at, finished_at = row
+        return SearchJob(
+            job_id=job_id, params=json.loads(params), priority=priority, status=status,
+            progress=json.loads(progress), result=loads(result) if result else None, error=error,
+            created_at=created_at, started_at=started_at, finished_at=finished_at
+        )
+
+    def insert(self, job: SearchJob, max_queued: int):
+        """Queue job; JobQueueFull when max_queued jobs are already waiting."""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                queued = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+                if queued >= max_queued:
+                    raise JobQueueFull(f"{queued} jobs already queued")
+                conn.execute(
+                    "INSERT INTO jobs (job_id, params, priority, status, progress, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (job.job_id, json.dumps(job.params), job.priority, job.status,
+                     json.dumps(job.progress), job.created_at)
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def get(self, job_id: str, with_result: bool = False) -> Optional[SearchJob]:
+        with self._lock:
+            row = self._connection().execute(
+                f"SELECT {self.COLUMNS}, {'result' if with_result else 'NULL'} FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return self._job(row[:-1], row[-1]) if row else None
+
+    def claim_next(self, now: float) -> Optional[SearchJob]:
+        """Mark the highest priority queued job (FIFO within a priority) running and return it."""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    f"SELECT {self.COLUMNS} FROM jobs WHERE status = 'queued' "
+                    "ORDER BY priority DESC, created_at LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'running', started_at = ? WHERE job_id = ?", (now, row[0])
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        job = self._job(row)
+        job.status, job.started_at = 'running', now
+        return job
+
+    def progress(self, job_id: str, progress: Dict[str, int]) -> Optional[str]:
+        """Save a running job's progress; returns its status, which another worker may have set to cancelled."""
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "UPDATE jobs SET progress = ? WHERE job_id = ? AND status = 'running'", (json.dumps(progress), job_id)
+            )
+            row = conn.execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def finish(self, job_id: str, status: str, result: Optional[Dict[str, Any]], error: Optional[str],
+               finished: float):
+        """Record how a running job ended; a job cancelled meanwhile stays cancelled."""
+        with self._lock:
+            self._connection().execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? "
+                "WHERE job_id = ? AND status = 'running'",
+                (status, dumps(result) if result is not None else None, error, finished, job_id)
+            )
+
+    def requeue(self, job_id: str):
+        """Hand a running job back to the queue, e.g. when its worker shuts down."""
+        with self._lock:
+            self._connection().execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL, progress = ? "
+                "WHERE job_id = ? AND status = 'running'", (json.dumps({'completed': 0, 'total': 0}), job_id)
+            )
+
+    def cancel(self, job_id: str, now: float) -> Optional[SearchJob]:
+        with self._lock:
+            self._connection().execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE job_id = ? "
+                "AND status IN ('queued', 'running')", (now, job_id)
+            )
+        return self.get(job_id)
+
+    def expire(self, cutoff: float) -> int:
+        with self._lock:
+            return self._connection().execute(
+                "DELETE FROM jobs WHERE finished_at < ? AND status IN ('completed', 'failed', 'cancelled')", (cutoff,)
+            ).rowcount
+
+    def stats(self) -> Dict[str, int]:
+        counts = {status: 0 for status in STATUSES}
+        with self._lock:
+            rows = self._connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts.update(rows)
+        return counts
+
+
+class SearchJobManager:
+    """
+    Runs submitted searches on a bounded pool of async workers.
+
+    Jobs live in a JobStore shared by every API worker process: any of them
+    can submit, report on or cancel a job, and each process's workers claim
+    queued jobs from it. Jobs are taken highest priority first (FIFO within
+    a priority), report per-dork progress while running, and are forgotten
+    result_ttl seconds after they finish. A job submitted to this process
+    starts at once; jobs from other processes are picked up within
+    poll_interval seconds. Jobs still running when a process stops are put
+    back in the queue for the remaining workers.
+    """
+
+    def __init__(self, workers: int, max_queued: int, result_ttl: int, store: Optional[JobStore] = None,
+                 poll_interval: float = 1.0):
+        self.worker_count = workers
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.store = store or JobStore()
+        self.poll_interval = poll_interval
+        self.session: Optional['aiohttp.ClientSession'] = None
+        self.running: Dict[str, asyncio.Task] = {}  # Jobs this process is running
+        self._wake: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self, session: Optional['aiohttp.ClientSession'] = None):
+        self.session = session
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+        self._tasks.append(asyncio.create_task(self._expire_loop()))
+
+    async def stop(self):
+        # Workers first: cancelling one also cancels the job it is awaiting
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        jobs = [task for task in self.running.values() if not task.done()]
+        for task in jobs:
+            task.cancel()
+        await asyncio.gather(*jobs, return_exceptions=True)
+
+    async def submit(self, params: Dict[str, Any], priority: int = 0) -> SearchJob:
+        if self._wake is None:
+            raise RuntimeError("SearchJobManager.start() has not been called")
+        job = SearchJob(job_id=uuid.uuid4().hex, params=params, priority=priority)
+        await asyncio.to_thread(self.store.insert, job, self.max_queued)
+        self._wake.set()
+        logger.info(f"Queued search job {job.job_id} for '{params.get('target')}' (priority {priority})")
+        return job
+
+    async def get(self, job_id: str, with_result: bool = False) -> Optional[SearchJob]:
+        return await asyncio.to_thread(self.store.get, job_id, with_result)
+
+    async def cancel(self, job_id: str) -> Optional[SearchJob]:
+        job = await asyncio.to_thread(self.store.cancel, job_id, time.time())
+        task = self.running.get(job_id)
+        if task is not None:
+            task.cancel()  # Running elsewhere: that worker sees the status at its next progress update
+        return job
+
+    async def _next_job(self) -> SearchJob:
+        while True:
+            job = await asyncio.to_thread(self.store.claim_next, time.time())
+            if job is not None:
+                return job
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _worker(self):
+        while True:
+            job = await self._next_job()
+            task = asyncio.create_task(self._execute(job))
+            self.running[job.job_id] = task
+            status, result, error = None, None, None
+            try:
+                result = await task
+                status = 'completed'
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling() or not task.cancelled():
+                    raise  # The worker itself is shutting down; the job goes back to the queue
+                status = 'cancelled'
+            except Exception as e:
+                logger.error(f"Search job {job.job_id} failed: {e}")
+                status, error = 'failed', str(e)
+            finally:
+                del self.running[job.job_id]
+                # Written inline: an await here could be interrupted by shutdown and leave the job running
+                if status is None:
+                    self.store.requeue(job.job_id)
+                else:
+                    self.store.finish(job.job_id, status, result, error, time.time())
+
+    async def _execute(self, job: SearchJob) -> Optional[Dict[str, Any]]:
+        result = None
+        async for event in deep_search_stream(**job.params, session=self.session, include_all_results=True):
+            if event['event'] == 'start':
+                progress = {'completed': 0, 'total': event['total']}
+            elif event['event'] in ('dork', 'dork_error'):
+                progress = event['progress']
+            elif event['event'] == 'complete':
+                result = {k: v for k, v in event.items() if k != 'event'}
+                continue
+            else:
+                continue
+            if await asyncio.to_thread(self.store.progress, job.job_id, progress) == 'cancelled':
+                raise asyncio.CancelledError()  # Cancelled through another worker
+        return result
+
+    def expire(self) -> int:
+        return self.store.expire(time.time() - self.result_ttl)
+
+    async def _expire_loop(self):
+        while True:
+            await asyncio.sleep(min(60, self.result_ttl))
+            await asyncio.to_thread(self.expire)
+
+    def stats(self) -> Dict[str, int]:
+        return self.store.stats()
+
+
+job_manager = SearchJobManager(config.job_workers, config.job_queue_limit, config.job_result_ttl)
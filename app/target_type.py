@@ -1,16 +1,144 @@
 #!/usr/bin/env python3
 
-from utils.gemini_llm import call_gemini
-import asyncio
+import logging
+import re
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
 from lib.prompts import TARGET_TYPE_PROMPT
 from lib.variables import TARGET_TYPES
+from utils.llm_client import LLMError, llm_client
+
+logger = logging.getLogger(__name__)
+
+INTERNATIONAL_NUMBER = re.compile(r'^\+[\d\s().\-/]+$')
+
+
+@lru_cache(maxsize=4096)
+def classify_locally(target: str) -> Optional[str]:
+    """
+    Settle targets that can be validated without the LLM; None means ask it.
+
+    Only emails email_validator accepts and '+' numbers phonenumbers says are
+    valid are settled here. Names, bare digit strings (national numbers, IDs)
+    and everything else are left to the LLM.
+    """
+    text = target.strip()
+    if not text:
+        return 'other'
+
+    if '@' in text and not any(c.isspace() for c in text) and not text.startswith('@'):
+        from email_validator import validate_email, EmailNotValidError
+
+        try:
+            validate_email(text, check_deliverability=False)
+            return 'email'
+        except EmailNotValidError:
+            return None
+
+    if INTERNATIONAL_NUMBER.match(text):
+        import phonenumbers
+
+        try:
+            number = phonenumbers.parse(text, None)
+        except phonenumbers.NumberParseException:
+            return None
+        return 'phone' if phonenumbers.is_valid_number(number) else None
+    return None
+
+
+async def _ask_llm(target: str) -> str:
+    try:
+        # Same prompt as classify_many's items, so single and batched answers share cache entries
+        answer = await llm_client.generate_item(TARGET_TYPE_PROMPT, target, max_output_tokens=10)
+    except LLMError as exc:
+        return f"error:{exc}"
+    return answer.lower()
+
+
+class TargetClassifier:
+    """
+    Target type detection: local rules first, Gemini only for what they
+    cannot settle. LLM answers are memoized here and cached persistently by
+    the LLM client; errors are not.
+    """
+
+    def __init__(self, memo_size: int = 4096):
+        self.memo_size = memo_size
+        self.memo: "OrderedDict[str, str]" = OrderedDict()
+        self.local = 0
+        self.memo_hits = 0
+        self.llm_calls = 0
+        self.llm_errors = 0
+
+    async def classify(self, target: str) -> Tuple[str, str]:
+        """(target type, how it was decided: local, memo or llm)."""
+        target_type = classify_locally(target)
+        if target_type is not None:
+            self.local += 1
+            return target_type, 'local'
+
+        key = target.strip().lower()
+        if key in self.memo:
+            self.memo.move_to_end(key)
+            self.memo_hits += 1
+            return self.memo[key], 'memo'
+
+        self.llm_calls += 1
+        return self._remember(target, key, await _ask_llm(target)), 'llm'
+
+    def _remember(self, target: str, key: str, answer: str) -> str:
+        if answer.startswith('error:'):
+            self.llm_errors += 1
+            logger.error(f"Target type LLM call failed for '{target}': {answer}")
+            return 'other'
+        target_type = answer if answer in TARGET_TYPES else 'other'
+        self.memo[key] = target_type
+        if len(self.memo) > self.memo_size:
+            self.memo.popitem(last=False)
+        return target_type
+
+    async def classify_many(self, targets: List[str]) -> List[Tuple[str, str]]:
+        """classify() for many targets; those left for the LLM share batched prompts."""
+        verdicts: List[Optional[Tuple[str, str]]] = [None] * len(targets)
+        ask = []
+        for i, target in enumerate(targets):
+            target_type = classify_locally(target)
+            key = target.strip().lower()
+            if target_type is not None:
+                self.local += 1
+                verdicts[i] = (target_type, 'local')
+            elif key in self.memo:
+                self.memo_hits += 1
+                verdicts[i] = (self.memo[key], 'memo')
+            else:
+                ask.append(i)
+
+        if ask:
+            self.llm_calls += len(ask)
+            answers = await llm_client.generate_many(TARGET_TYPE_PROMPT, [targets[i] for i in ask])
+            for i, answer in zip(ask, answers):
+                target = targets[i]
+                verdicts[i] = (self._remember(target, target.strip().lower(), answer.strip().lower()), 'llm')
+        return verdicts
 
-async def analyse_target(target: str) -> None:
-    FULL_PROMPT = f"{TARGET_TYPE_PROMPT}\n\nTARGET:\n{target}"
-    target_type = await asyncio.to_thread(call_gemini, FULL_PROMPT)
-    print(f"Target: {target}  =>  Type: {target_type}")
-    return target_type if target_type in TARGET_TYPES else "other"
+    def stats(self) -> Dict[str, float]:
+        total = self.local + self.memo_hits + self.llm_calls
+        return {
+            'classified': total,
+            'local': self.local,
+            'memo_hits': self.memo_hits,
+            'llm_calls': self.llm_calls,
+            'llm_errors': self.llm_errors,
+            'llm_avoided_ratio': round((total - self.llm_calls) / total, 3) if total else 0.0
+        }
 
 
+target_classifier = TargetClassifier()
 
 
+async def analyse_target(target: str) -> str:
+    target_type, source = await target_classifier.classify(target)
+    logger.info(f"Target: {target}  =>  Type: {target_type} ({source})")
+    return target_type
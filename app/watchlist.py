@@ -0,0 +1,239 @@
+import asyncio
+import json
+import logging
+import math
+import threading
+import time
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
+
+from app.deep_search import config, deep_search_delta, plan_dorks, quota_manager, snapshot_store
+from lib.dork_generator import DorkGenerator
+from utils.storage import connect_sqlite, data_path
+
+if TYPE_CHECKING:
+    import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+class WatchlistStore:
+    """
+    Watched targets, when each is due, and the delta of its last refresh.
+
+    Every API worker runs a scheduler over the same file, so a due entry is
+    claimed (its next_run pushed past a lease) before it is refreshed; only
+    the worker whose claim succeeds runs it.
+    """
+
+    def __init__(self, path: str = ''):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            conn = connect_sqlite(self.path or data_path('watchlist.sqlite3'))
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS watchlist ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, target TEXT NOT NULL, target_type TEXT NOT NULL, "
+                "params TEXT NOT NULL, interval REAL NOT NULL, next_run REAL NOT NULL, "
+                "last_run REAL, last_delta TEXT, failures INTEGER NOT NULL DEFAULT 0, UNIQUE (target_type, target))"
+            )
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _entry(row, include_delta: bool = False) -> Dict[str, Any]:
+        entry_id, target, target_type, params, interval, next_run, last_run, last_delta, failures = row
+        entry = {
+            'id': entry_id,
+            'target': target,
+            'target_type': target_type,
+            'params': json.loads(params),
+            'interval': interval,
+            'next_run': next_run,
+            'last_run': last_run,
+            'failures': failures
+        }
+        if include_delta:
+            entry['last_delta'] = json.loads(last_delta) if last_delta else None
+        return entry
+
+    def add(self, target: str, target_type: str, params: Dict[str, Any], interval: float) -> Dict[str, Any]:
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT INTO watchlist (target, target_type, params, interval, next_run) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(target_type, target) DO UPDATE SET params = excluded.params, interval = excluded.interval",
+                (target, target_type, json.dumps(params), interval, time.time())
+            )
+            row = conn.execute(
+                "SELECT * FROM watchlist WHERE target_type = ? AND target = ?", (target_type, target)
+            ).fetchone()
+        return self._entry(row)
+
+    def remove(self, entry_id: int) -> bool:
+        with self._lock:
+            return self._connection().execute("DELETE FROM watchlist WHERE id = ?", (entry_id,)).rowcount > 0
+
+    def get(self, entry_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connection().execute("SELECT * FROM watchlist WHERE id = ?", (entry_id,)).fetchone()
+        return self._entry(row, include_delta=True) if row else None
+
+    def entries(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._connection().execute("SELECT * FROM watchlist ORDER BY next_run").fetchall()
+        return [self._entry(row) for row in rows]
+
+    def due(self, now: float) -> List[Dict[str, Any]]:
+        """Due entries, most overdue first."""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT * FROM watchlist WHERE next_run <= ? ORDER BY next_run", (now,)
+            ).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def claim(self, entry_id: int, now: float, lease_until: float) -> bool:
+        """Take a due entry for this worker; False when another worker already has it."""
+        with self._lock:
+            return self._connection().execute(
+                "UPDATE watchlist SET next_run = ? WHERE id = ? AND next_run <= ?", (lease_until, entry_id, now)
+            ).rowcount > 0
+
+    def finish(self, entry_id: int, delta: Dict[str, Any], finished: float):
+        with self._lock:
+            self._connection().execute(
+                "UPDATE watchlist SET last_run = ?, last_delta = ?, next_run = ? + interval, failures = 0 WHERE id = ?",
+                (finished, json.dumps(delta, ensure_ascii=False), finished, entry_id)
+            )
+
+    def fail(self, entry_id: int, delta: Dict[str, Any], finished: float, retry_at: float):
+        with self._lock:
+            self._connection().execute(
+                "UPDATE watchlist SET last_run = ?, last_delta = ?, next_run = ?, failures = failures + 1 WHERE id = ?",
+                (finished, json.dumps(delta, ensure_ascii=False), retry_at, entry_id)
+            )
+
+
+class WatchlistScheduler:
+    """
+    Periodically refreshes due targets with delta searches.
+
+    Each scan may spend quota_share of the remaining daily quota. Targets are
+    taken most overdue first and charged up front: their dork count (one page
+    per dork, the cost of an unchanged target) when they have a snapshot,
+    the planned pages of a full baseline search when they don't. Targets
+    that no longer fit wait for a later scan. A failed refresh is retried
+    after retry_delay, doubling per consecutive failure up to the interval.
+    """
+
+    def __init__(self, store: WatchlistStore, check_interval: int, quota_share: float, concurrency: int,
+                 retry_delay: float = 300, lease: float = 3600):
+        self.store = store
+        self.check_interval = check_interval
+        self.quota_share = quota_share
+        self.concurrency = concurrency
+        self.retry_delay = retry_delay
+        self.lease = lease
+        self.session: Optional['aiohttp.ClientSession'] = None
+        self._task: Optional[asyncio.Task] = None
+        self.refreshed = 0
+        self.deferred = 0
+        self.failed = 0
+
+    async def start(self, session: Optional['aiohttp.ClientSession'] = None):
+        self.session = session
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.refresh_due()
+            except Exception as e:
+                logger.error(f"Watchlist scan failed: {e}")
+            await asyncio.sleep(self.check_interval)
+
+    @staticmethod
+    async def estimated_cost(entry: Dict[str, Any]) -> int:
+        params = entry['params']
+        options = {
+            'deep_search': params.get('deep_search_enabled', False),
+            'dark_web': params.get('dark_web_enabled', False),
+            'social_media': params.get('social_media_enabled', True)
+        }
+        dorks = DorkGenerator.generate_dorks(entry['target'], entry['target_type'], options)
+        if await snapshot_store.exists(entry['target'], entry['target_type']):
+            return len(dorks)
+        # No snapshot yet: the refresh runs a full baseline deep_search
+        budgets, _ = await plan_dorks(dorks, entry['target_type'], params.get('max_results_per_dork', 50))
+        return sum(math.ceil(max_results / 10) for max_results in budgets.values())
+
+    async def refresh_due(self) -> Dict[str, int]:
+        now = time.time()
+        due = await asyncio.to_thread(self.store.due, now)
+        budget = int(quota_manager.get_remaining() * self.quota_share)
+        selected = []
+        claimed_elsewhere = 0
+        for entry in due:
+            cost = await self.estimated_cost(entry)
+            if cost > budget:
+                break  # Keep overdue order; later scans get the rest
+            if not await asyncio.to_thread(self.store.claim, entry['id'], now, now + self.lease):
+                claimed_elsewhere += 1
+                continue
+            budget -= cost
+            selected.append(entry)
+        deferred = len(due) - len(selected) - claimed_elsewhere
+        self.deferred += deferred
+        if due:
+            logger.info(f"Watchlist: refreshing {len(selected)} of {len(due)} due targets")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def refresh(entry: Dict[str, Any]):
+            async with semaphore:
+                await self.refresh(entry)
+
+        await asyncio.gather(*(refresh(entry) for entry in selected))
+        return {'due': len(due), 'refreshed': len(selected), 'deferred': deferred, 'claimed_elsewhere': claimed_elsewhere}
+
+    async def refresh(self, entry: Dict[str, Any]):
+        try:
+            delta = await deep_search_delta(
+                entry['target'], entry['target_type'], **entry['params'], session=self.session
+            )
+        except Exception as e:
+            self.failed += 1
+            finished = time.time()
+            retry_in = min(entry['interval'], self.retry_delay * 2 ** entry['failures'])
+            logger.error(f"Watchlist refresh of '{entry['target']}' failed, retrying in {retry_in:.0f}s: {e}")
+            await asyncio.to_thread(self.store.fail, entry['id'], {'error': str(e)}, finished, finished + retry_in)
+            return
+
+        self.refreshed += 1
+        meta = delta['metadata']
+        logger.info(
+            f"Watchlist: '{entry['target']}' +{len(delta['added'])} -{len(delta['removed'])} "
+            f"in {meta.get('pages_fetched', meta.get('dorks_executed'))} calls"
+        )
+        await asyncio.to_thread(self.store.finish, entry['id'], delta, time.time())
+
+    def stats(self) -> Dict[str, int]:
+        return {'refreshed': self.refreshed, 'deferred': self.deferred, 'failed': self.failed}
+
+
+watchlist = WatchlistScheduler(
+    WatchlistStore(),
+    config.watchlist_check_interval,
+    config.watchlist_quota_share,
+    config.watchlist_concurrency,
+    config.watchlist_retry_delay,
+    config.watchlist_lease
+)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Deduplication benchmark: per-result cost of the near-duplicate index as it grows.
+
+    python -m benchmarks.bench_dedup
+    python -m benchmarks.bench_dedup --sizes 10000 100000 --threshold 0.7
+
+Synthetic results are drawn from a small vocabulary so unrelated snippets
+still share words, and every tenth one is a lightly edited copy of an
+earlier one: half behind a tracking-parameter variant of its URL, half
+under an unrelated URL so only the snippet index can catch them.
+"""
+import argparse
+import random
+import time
+
+from utils.remove_result_dedup import ResultDeduplicator
+
+VOCABULARY = [f'w{i}' for i in range(5000)] + ['hosni', 'raissi', 'engineer', 'security', 'tunis', 'github']
+
+
+def synthetic_results(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    results = []
+    for i in range(count):
+        if i % 10 == 9 and results:
+            original = rng.choice(results)
+            words = original['snippet'].split()
+            words[rng.randrange(len(words))] = rng.choice(VOCABULARY)
+            link = original['link'].replace('https://', 'http://www.') + '?utm_source=x' if i % 20 == 19 else f'https://mirror.net/{i}'
+            results.append({'link': link, 'snippet': ' '.join(words)})
+        else:
+            words = ['hosni', 'raissi'] + [rng.choice(VOCABULARY) for _ in range(rng.randint(12, 30))]
+            results.append({'link': f'https://example{i % 97}.com/page/{i}', 'snippet': ' '.join(words)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--threshold', type=float, default=0.7)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        results = synthetic_results(size)
+        deduplicator = ResultDeduplicator(args.threshold)
+        latencies = []
+        started = time.perf_counter()
+        for result in results:
+            before = time.perf_counter()
+            deduplicator.is_duplicate(result)
+            latencies.append(time.perf_counter() - before)
+        total = time.perf_counter() - started
+
+        tail = sorted(latencies[-1000:])  # lookups against an almost full index
+        stats = deduplicator.stats()
+        print(
+            f"{size:>8,} results  {total:6.2f}s  {size / total:>9,.0f}/s  "
+            f"last 1k median {tail[len(tail) // 2] * 1e6:6.1f}us  "
+            f"candidates/lookup {stats['lsh_candidates_checked'] / size:.2f}  "
+            f"url dups {stats['url_duplicates']}  near dups {stats['near_duplicates']}"
+        )
+    print(f"\nLSH bands x rows: {deduplicator.index.bands} x {deduplicator.index.rows}")
+
+
+if __name__ == '__main__':
+    main()
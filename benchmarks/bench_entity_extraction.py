@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Entity extraction micro-benchmark: multi-pass regexes vs the gated scanner.
+
+    python -m benchmarks.bench_entity_extraction
+    python -m benchmarks.bench_entity_extraction --corpus deep_search_20240101_120000.json --repeat 14
+
+The corpus is either a text file with one snippet per line or a JSON export
+written by app.deep_search.export_to_json. --repeat replays the corpus as if
+the same snippets came back under several dorks.
+"""
+import argparse
+import json
+import os
+import time
+from typing import Any, Dict
+
+from utils.entity_extractor import EntityExtractor, EntityScanner
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), 'data', 'snippets.txt')
+
+
+def load_corpus(path: str):
+    if path.endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            export = json.load(f)
+        return [r.get('snippet', '') for r in export.get('all_results', []) if r.get('snippet')]
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def extract_all_multipass(text: str) -> Dict[str, Any]:
+    """Baseline: every per-kind extractor over the whole text, as extract_all did before the scanner."""
+    return {
+        'emails': list(EntityExtractor.extract_emails(text)),
+        'phones': list(EntityExtractor.extract_phone_numbers(text)),
+        'urls': list(EntityExtractor.extract_urls(text)),
+        'social_handles': {k: list(v) for k, v in EntityExtractor.extract_social_handles(text).items()},
+        'dates': list(EntityExtractor.extract_dates(text))
+    }
+
+
+def as_sets(entities):
+    return (
+        frozenset(entities['emails']),
+        frozenset(entities['phones']),
+        frozenset(entities['urls']),
+        frozenset((k, h) for k, handles in entities['social_handles'].items() for h in handles),
+        frozenset(entities['dates'])
+    )
+
+
+def timed(label, fn, texts, rounds):
+    best = float('inf')
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<28} {len(texts) / best:>12,.0f} texts/s  ({best * 1000:.1f} ms)")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS)
+    parser.add_argument('--repeat', type=int, default=14, help='times each snippet recurs (dorks per search)')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    snippets = load_corpus(args.corpus)
+    texts = snippets * args.repeat
+    print(f"corpus: {len(snippets)} unique snippets, {len(texts)} texts\n")
+
+    mismatches = [
+        text for text in snippets
+        if as_sets(extract_all_multipass(text)) != as_sets(EntityScanner(0).extract(text))
+    ]
+    print(f"result mismatches vs multi-pass: {len(mismatches)}")
+    for text in mismatches[:5]:
+        print(f"  {text[:100]}")
+    print()
+
+    baseline = timed('multi-pass (per kind)', extract_all_multipass, texts, args.rounds)
+    uncached = timed('gated scanner, no memo', lambda t: EntityScanner(0).extract(t), texts, args.rounds)
+
+    memoized = float('inf')
+    for _ in range(args.rounds):
+        scanner = EntityScanner()
+        started = time.perf_counter()
+        for text in texts:
+            scanner.extract(text)
+        memoized = min(memoized, time.perf_counter() - started)
+    print(f"{'gated scanner + memo':<28} {len(texts) / memoized:>12,.0f} texts/s  ({memoized * 1000:.1f} ms)")
+
+    print(f"\nspeedup: {baseline / uncached:.1f}x without memo, {baseline / memoized:.1f}x with memo")
+
+
+if __name__ == '__main__':
+    main()
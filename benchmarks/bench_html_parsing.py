@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+HTML parsing benchmark: full BeautifulSoup tree vs the targeted extractors.
+
+    python -m benchmarks.bench_html_parsing saved_pages/*.html
+    python -m benchmarks.bench_html_parsing            # synthetic pages
+
+Pass pages saved from browsed results (browser "Save page as", curl -o ...).
+Without arguments a set of synthetic pages of increasing size is generated.
+"""
+import argparse
+import random
+import time
+
+import utils.html_parser as html_parser
+
+
+def synthetic_page(paragraphs: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    words = ['osint', 'profile', 'engineer', 'security', 'contact', 'research', 'python', 'tunis', 'github', 'report']
+    body = []
+    for i in range(paragraphs):
+        text = ' '.join(rng.choice(words) for _ in range(40))
+        body.append(f'<div class="row"><p>{text} <a href="/p/{i}">link {i}</a></p></div>')
+    return (
+        '<html><head><title>Hosni Raissi - Profile</title>'
+        '<meta name="description" content="Profile page"><meta property="og:title" content="Hosni Raissi">'
+        '<script>var tracking = {"a": 1};</script><style>body { color: red; }</style></head><body>'
+        '<nav><a href="/">Home</a><a href="/about">About</a></nav>'
+        f'<div id="main-content"><article><h1>Hosni Raissi</h1>{"".join(body)}</article></div>'
+        '<footer>Contact: hosni@example.com</footer></body></html>'
+    )
+
+
+def load_pages(paths):
+    if not paths:
+        return [(f'synthetic-{n}p', synthetic_page(n, n)) for n in (20, 200, 2000)]
+    pages = []
+    for path in paths:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            pages.append((path, f.read()))
+    return pages
+
+
+def best_time(fn, html, rounds):
+    best = float('inf')
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn(html, 'https://example.com')
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pages', nargs='*')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    parsers = [
+        ('bs4 tree', html_parser.parse_page_soup),
+        ('targeted', lambda html, url: html_parser._parse_page_targeted(html, url, 2000, 50)),
+    ]
+    if html_parser.FastHTMLParser is not None:
+        parsers.append(('selectolax', lambda html, url: html_parser._parse_page_fast(html, url, 2000, 50)))
+    else:
+        print('selectolax not installed, skipping fast backend\n')
+
+    print(f"{'page':<32}{'size':>10}" + ''.join(f'{name:>14}' for name, _ in parsers) + '   content match')
+    for name, html in load_pages(args.pages):
+        reference = html_parser.parse_page_soup(html, 'https://example.com')
+        timings = [best_time(fn, html, args.rounds) for _, fn in parsers]
+        matches = [
+            fn(html, 'https://example.com')['content'] == reference['content']
+            for _, fn in parsers[1:]
+        ]
+        print(
+            f"{name[-32:]:<32}{len(html) // 1024:>8}KB"
+            + ''.join(f'{t * 1000:>12.2f}ms' for t in timings)
+            + '   ' + ' '.join('yes' if m else 'no' for m in matches)
+        )
+
+
+if __name__ == '__main__':
+    main()
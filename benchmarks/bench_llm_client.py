@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+LLM client benchmark against the offline stub backend.
+
+    python -m benchmarks.bench_llm_client
+    python -m benchmarks.bench_llm_client --prompts 200 --repeat 0.4 --latency 0.3
+
+Compares blocking one-at-a-time calls (the old call_gemini in a thread),
+the async client without and with its response cache, and batched
+classification. Nothing leaves the machine.
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+
+from utils.llm_client import LLMClient, StubBackend
+from utils.search_cache import create_cache
+
+INSTRUCTION = 'Classify the target as one of: person, email, phone, other.'
+
+
+def workload(count: int, repeat: float, seed: int = 0):
+    rng = random.Random(seed)
+    prompts = []
+    for i in range(count):
+        prompts.append(rng.choice(prompts) if prompts and rng.random() < repeat else f'target-{i}')
+    return prompts
+
+
+async def run(args):
+    prompts = workload(args.prompts, args.repeat)
+    print(f"{len(prompts)} prompts, {len(set(prompts))} distinct, {args.latency * 1000:.0f} ms stub latency\n")
+
+    backend = StubBackend(latency=args.latency)
+    started = time.perf_counter()
+    for prompt in prompts:
+        await asyncio.to_thread(lambda: None)  # the thread hop the old call paid
+        await backend.generate(f"{INSTRUCTION}\n\n{prompt}", {})
+    sequential = time.perf_counter() - started
+    print(f"{'sequential, uncached':<28}{sequential:8.2f}s  {backend.calls:>5} model calls")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for label, cached in (('client, coalescing only', False), ('client, cache + coalescing', True)):
+            backend = StubBackend(latency=args.latency)
+            cache = create_cache('sqlite', 3600, path=f'{directory}/{label}.sqlite3') if cached else None
+            client = LLMClient(backend, cache, max_concurrency=args.concurrency)
+            started = time.perf_counter()
+            await asyncio.gather(*(client.generate_item(INSTRUCTION, prompt) for prompt in prompts))
+            print(f"{label:<28}{time.perf_counter() - started:8.2f}s  {backend.calls:>5} model calls")
+        # Same prompts again, as on the next request: answered from the persistent cache
+        started = time.perf_counter()
+        await asyncio.gather(*(client.generate_item(INSTRUCTION, prompt) for prompt in prompts))
+        print(f"{'  second pass, cached':<28}{time.perf_counter() - started:8.2f}s  {backend.calls:>5} model calls")
+
+        backend = StubBackend(latency=args.latency)
+        client = LLMClient(backend, create_cache('sqlite', 3600, path=f'{directory}/batch.sqlite3'),
+                           max_concurrency=args.concurrency, max_batch=args.batch)
+        started = time.perf_counter()
+        await client.generate_many(INSTRUCTION, prompts)
+        print(f"{'batched (' + str(args.batch) + ' per prompt)':<28}{time.perf_counter() - started:8.2f}s  {backend.calls:>5} model calls")
+        print(f"\nbatched client stats: {client.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--prompts', type=int, default=200)
+    parser.add_argument('--repeat', type=float, default=0.4, help='share of prompts that repeat an earlier one')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds per stub model call')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--batch', type=int, default=20)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Offline load test: concurrent searches against a local CSE/Ahmia stand-in
+(benchmarks/fake_upstream.py, started as a subprocess), through deep_search
+directly and through POST /api/search on an in-process uvicorn server.
+
+Reports searches/sec, p50/p99 latency, upstream calls per search and peak
+memory. Every search uses a new target (and the two modes different ones),
+so runs are cold-cache unless --distinct-targets is smaller than --searches.
+
+    python -m benchmarks.bench_load
+    python -m benchmarks.bench_load --mode api --searches 100 --concurrency 20 --latency-ms 120 --throttle-rate 0.05
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from benchmarks.fake_upstream import add_profile_arguments
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_upstream(args, port: int) -> subprocess.Popen:
+    profile = [
+        '--latency-ms', str(args.latency_ms), '--jitter-ms', str(args.jitter_ms),
+        '--throttle-rate', str(args.throttle_rate), '--max-total', str(args.max_total),
+        '--snippet-words', str(args.snippet_words), '--pagemap-bytes', str(args.pagemap_bytes),
+        '--page-bytes', str(args.page_bytes)
+    ]
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.fake_upstream', '--port', str(port)] + profile,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    for _ in range(100):
+        try:
+            upstream_stats(port)
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("Upstream stand-in did not start")
+
+
+def upstream_stats(port: int, reset: bool = False) -> dict:
+    path = '/stats/reset' if reset else '/stats'
+    request = urllib.request.Request(f"http://127.0.0.1:{port}{path}", method='POST' if reset else 'GET')
+    with urllib.request.urlopen(request, timeout=5) as resp:
+        return json.loads(resp.read())
+
+
+class ErrorCount(logging.Handler):
+    """Counts logged errors: failed dorks and upstream calls are logged, not raised."""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.count = 0
+
+    def emit(self, record: logging.LogRecord):
+        self.count += 1
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+async def drive(search_one, searches: int, concurrency: int, distinct: int, prefix: str):
+    """Run searches with at most concurrency in flight; returns (latencies, failures, wall seconds)."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, failures = [], []
+
+    async def one(i: int):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await search_one(f"Jane {prefix} Doe {i % distinct}")
+            except Exception as e:
+                failures.append(str(e))
+                return
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(searches)))
+    return latencies, failures, time.perf_counter() - started
+
+
+def report(mode: str, latencies, failures, wall: float, calls: dict, searches: int, rss_before: float,
+           errors: int):
+    ok = len(latencies)
+    p50 = statistics.median(latencies) * 1000 if latencies else 0.0
+    p99 = statistics.quantiles(latencies, n=100)[98] * 1000 if len(latencies) > 1 else p50
+    print(f"{mode}")
+    print(f"  searches        {ok}/{searches} ok" + (f"   first failure: {failures[0]}" if failures else ''))
+    print(f"  logged errors   {errors / searches:8.2f} per search")
+    print(f"  throughput      {ok / wall:8.2f} searches/s   ({wall:.1f} s)")
+    print(f"  latency         p50 {p50:8.0f} ms   p99 {p99:8.0f} ms")
+    per_search = {kind: round(count / searches, 1) for kind, count in sorted(calls.items())}
+    print(f"  upstream calls  {per_search} per search")
+    print(f"  peak RSS        {peak_rss_mb():8.1f} MiB   (+{peak_rss_mb() - rss_before:.1f} MiB during the run)\n")
+
+
+async def run_deep_search(args, port: int, errors: ErrorCount):
+    from app.deep_search import create_session, deep_search
+
+    async with create_session() as session:
+        async def search_one(target: str):
+            await deep_search(target, 'person', args.max_results, session=session,
+                              deep_search_enabled=args.deep, dark_web_enabled=args.dark_web)
+
+        rss_before, errors_before = peak_rss_mb(), errors.count
+        upstream_stats(port, reset=True)
+        latencies, failures, wall = await drive(search_one, args.searches, args.concurrency, args.distinct_targets, 'Direct')
+        report('deep_search', latencies, failures, wall, upstream_stats(port), args.searches, rss_before,
+               errors.count - errors_before)
+
+
+async def run_api(args, port: int, errors: ErrorCount):
+    import aiohttp
+    import uvicorn
+
+    import api
+
+    api_port = free_port()
+    server = uvicorn.Server(uvicorn.Config(api.app, host='127.0.0.1', port=api_port, log_level='warning'))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    url = f"http://127.0.0.1:{api_port}/api/search"
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(connector=connector) as client:
+        async def search_one(target: str):
+            payload = {
+                'target': target, 'target_type': 'person', 'max_results': args.max_results,
+                'deep_search': args.deep, 'dark_web': args.dark_web, 'compact': True
+            }
+            async with client.post(url, json=payload, timeout=aiohttp.ClientTimeout(total=300)) as resp:
+                await resp.read()
+                if resp.status != 200:
+                    raise RuntimeError(f"HTTP {resp.status}")
+
+        rss_before, errors_before = peak_rss_mb(), errors.count
+        upstream_stats(port, reset=True)
+        latencies, failures, wall = await drive(search_one, args.searches, args.concurrency, args.distinct_targets, 'Api')
+        report('POST /api/search', latencies, failures, wall, upstream_stats(port), args.searches, rss_before,
+               errors.count - errors_before)
+
+    server.should_exit = True
+    await serving
+
+
+async def run(args, port: int, errors: ErrorCount):
+    # One event loop for both modes: the rate limiter's and caches' locks bind to the loop they first run on
+    from app.deep_search import rate_limiter
+
+    if args.mode in ('deep_search', 'both'):
+        await run_deep_search(args, port, errors)
+        rate_limiter.clear()  # Start the next mode without the AIMD backoff of this one
+    if args.mode in ('api', 'both'):
+        await run_api(args, port, errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=['deep_search', 'api', 'both'], default='both')
+    parser.add_argument('--searches', type=int, default=40)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--distinct-targets', type=int, default=0, help='targets to cycle through, 0 = one per search')
+    parser.add_argument('--max-results', type=int, default=20, help='results per dork')
+    parser.add_argument('--deep', action='store_true', help='enable deep search dorks')
+    parser.add_argument('--dark-web', action='store_true', help='enable dark web dorks and Ahmia')
+    parser.add_argument('--verbose', action='store_true', help='keep search logging')
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    args.distinct_targets = args.distinct_targets or args.searches
+
+    port = free_port()
+    upstream = start_upstream(args, port)
+    # Set before the search modules are imported: their config and stores read these
+    os.environ.update({
+        'ECHOFORGE_CSE_URL': f"http://127.0.0.1:{port}/customsearch/v1",
+        'ECHOFORGE_AHMIA_URL': f"http://127.0.0.1:{port}/ahmia/search/",
+        'ECHOFORGE_DATA_DIR': tempfile.mkdtemp(prefix='echoforge-load-'),
+        'ECHOFORGE_LLM_BACKEND': 'stub',
+        'GOOGLE_API_KEY': os.environ.get('GOOGLE_API_KEY') or 'offline',
+        'GOOGLE_CX_ID': os.environ.get('GOOGLE_CX_ID') or 'offline'
+    })
+    errors = ErrorCount()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR)
+    if not args.verbose:
+        logging.getLogger().handlers[0].setLevel(logging.CRITICAL)
+    logging.getLogger().addHandler(errors)
+
+    from app.deep_search import config, quota_manager
+
+    # The stand-in is not what is being measured: no client-side throttling or daily quota
+    config.rate_limit_hosts['127.0.0.1'] = {'rate': 100_000, 'burst': 100_000}
+    quota_manager.limit = 10 ** 9
+    config.retry_delay = 0.05
+
+    print(f"{args.searches} searches, concurrency {args.concurrency}, upstream latency "
+          f"{args.latency_ms:.0f}±{args.jitter_ms:.0f} ms, 429 rate {args.throttle_rate:.0%}\n")
+    try:
+        asyncio.run(run(args, port, errors))
+    finally:
+        upstream.terminate()
+        upstream.wait()
+
+
+if __name__ == '__main__':
+    main()
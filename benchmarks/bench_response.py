@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Search response payload benchmark: the default FastAPI encoding of a full
+deep_search response vs compact mode, field projection and a first page,
+rendered with orjson (when installed) and gzipped.
+
+    python -m benchmarks.bench_response
+    python -m benchmarks.bench_response --sizes 500 5000 --page-size 50
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import random
+import tempfile
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+import utils.response_shaping as response_shaping
+from utils.response_shaping import ResultPages, dumps, shape_response, shape_results
+
+HOSTS = ['www.linkedin.com', 'github.com', 'medium.com', 'twitter.com', 'example.org', 'en.wikipedia.org']
+WORDS = ['hosni', 'raissi', 'security', 'engineer', 'osint', 'tunis', 'profile', 'research', 'python', 'conference']
+
+
+def synthetic_response(count: int, seed: int = 0):
+    rng = random.Random(seed)
+
+    def text(low, high):
+        return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+    results = []
+    for i in range(count):
+        host = rng.choice(HOSTS)
+        link = f"https://{host}/{text(1, 3).replace(' ', '-')}/{i}"
+        results.append({
+            'title': text(3, 10),
+            'link': link,
+            'snippet': text(15, 35),
+            'displayLink': host,
+            # Shaped like real CSE pagemaps: metatags, thumbnails and images
+            'pagemap': {
+                'metatags': [{f'og:{key}': text(2, 12) for key in ('title', 'description', 'site_name', 'type')}
+                             | {'og:url': link, 'og:image': f"{link}/image.png", 'twitter:card': 'summary'}],
+                'cse_thumbnail': [{'src': f"https://encrypted-tbn0.gstatic.com/images?q=tbn:{i}", 'width': '225', 'height': '225'}],
+                'cse_image': [{'src': f"{link}/image.png"}]
+            },
+            'entities': {
+                'emails': ['hosni@example.org'] if rng.random() < 0.2 else [],
+                'phones': [], 'urls': [link] if rng.random() < 0.5 else [],
+                'social_handles': {}, 'dates': []
+            },
+            'relevance_score': round(rng.random() * 8, 2)
+        })
+    return {
+        'metadata': {'target': 'Hosni Raissi', 'target_type': 'person', 'total_results': count},
+        'dork_summary': {f'dork_{n}': {'query': text(3, 6), 'total_results': 100, 'pages_fetched': 2} for n in range(30)},
+        'aggregated_entities': {'emails': ['hosni@example.org'], 'phones': [], 'urls': [], 'social_handles': {}, 'dates': []},
+        'top_results': results[:50],
+        'all_results': results
+    }
+
+
+def default_encoding(response):
+    # What FastAPI does for a returned dict: jsonable_encoder, then JSONResponse.render
+    return json.dumps(jsonable_encoder(response), ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode()
+
+
+def measure(label, render, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        body = render()
+    elapsed = (time.perf_counter() - started) / repeat
+    compressed = len(gzip.compress(body, compresslevel=6))
+    print(f"  {label:<34} {len(body) / 1024:9.1f} KiB   gzip {compressed / 1024:8.1f} KiB   {elapsed * 1000:8.2f} ms")
+    return len(body), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 5000])
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"orjson: {'yes' if response_shaping.orjson is not None else 'no (json fallback)'}\n")
+    fields = ['title', 'link', 'snippet', 'relevance_score']
+    pages = ResultPages(os.path.join(tempfile.mkdtemp(prefix='echoforge-pages-'), 'result_pages.sqlite3'))
+    for size in args.sizes:
+        response = synthetic_response(size)
+        print(f"{size:,} results")
+        base_size, base_time = measure('default (jsonable_encoder + json)', lambda: default_encoding(response), args.repeat)
+        measure('full, fast encoder', lambda: dumps(response), args.repeat)
+        compact_size, compact_time = measure(
+            'compact', lambda: dumps(shape_response(response, compact=True)), args.repeat
+        )
+        measure('compact + 4 fields', lambda: dumps(shape_response(response, True, fields)), args.repeat)
+
+        def first_page():
+            paged = asyncio.run(pages.first_page(response, args.page_size))
+            paged['results'] = shape_results(paged['results'], True)
+            return dumps(paged)
+
+        page_size, page_time = measure(f'compact, first page of {args.page_size}', first_page, args.repeat)
+        print(f"  compact: {base_size / compact_size:.1f}x smaller, {base_time / compact_time:.1f}x faster; "
+              f"first page: {base_size / page_size:.0f}x smaller, {base_time / page_time:.0f}x faster\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Result scoring benchmark: per-result scoring and full sort vs batch scoring
+with top-k selection, plus incremental ranking as dork batches arrive.
+
+    python -m benchmarks.bench_scoring
+    python -m benchmarks.bench_scoring --sizes 10000 100000 --top 50 --batch 100
+"""
+import argparse
+import bisect
+import random
+import time
+
+import utils.result_scorer as result_scorer
+from utils.result_scorer import AUTHORITATIVE_DOMAINS, BatchScorer, IncrementalRanker, top_k_indices
+
+TARGET = 'Hosni Raissi'
+HOSTS = ['www.linkedin.com', 'github.com', 'medium.com', 'twitter.com', 'example.org', 'en.wikipedia.org', 'blog.example.net']
+WORDS = ['hosni', 'raissi', 'Hosni Raissi', 'security', 'engineer', 'osint', 'tunis', 'profile', 'research', 'python']
+
+
+def synthetic_results(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [
+        {
+            'title': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 8))),
+            'snippet': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 30))),
+            'displayLink': rng.choice(HOSTS),
+            'entities': {'emails': ['a@b.io'] if rng.random() < 0.3 else [], 'phones': []}
+        }
+        for _ in range(count)
+    ]
+
+
+def timed(fn):
+    started = time.perf_counter()
+    value = fn()
+    return time.perf_counter() - started, value
+
+
+def baseline_score(result, target, min_snippet_length=50):
+    """The per-result scorer BatchScorer replaced, kept as the reference."""
+    target_lower = target.lower()
+    score = 3.0 if target_lower in result.get('title', '').lower() else 0.0
+    snippet = result.get('snippet', '').lower()
+    score += min(snippet.count(target_lower) * 0.5, 2.0)
+    domain = result.get('displayLink', '').lower()
+    if any(auth_domain in domain for auth_domain in AUTHORITATIVE_DOMAINS):
+        score += 2.0
+    if len(snippet) >= min_snippet_length:
+        score += 1.0
+    if result.get('entities') and any(result['entities'].values()):
+        score += 1.5
+    return score
+
+
+def baseline_rank(results):
+    for result in results:
+        result['relevance_score'] = baseline_score(result, TARGET)
+    return sorted(results, key=lambda x: x.get('relevance_score', 0), reverse=True)
+
+
+def baseline_incremental(results, batch, top):
+    ranking = []
+    for start in range(0, len(results), batch):
+        for i in range(start, min(start + batch, len(results))):
+            score = baseline_score(results[i], TARGET)
+            bisect.insort(ranking, (-score, i))
+        [results[i] for _, i in ranking[:top]]
+    return [i for _, i in ranking]
+
+
+def incremental(results, batch, top):
+    ranker = IncrementalRanker(BatchScorer(TARGET))
+    for start in range(0, len(results), batch):
+        ranker.add_batch(results[start:start + batch])
+        ranker.top(top)  # the streaming endpoint reads the top after every dork
+    return ranker
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--top', type=int, default=50)
+    parser.add_argument('--batch', type=int, default=100, help='results per dork batch for incremental ranking')
+    args = parser.parse_args()
+
+    print(f"numpy: {'yes' if result_scorer.load_numpy() is not None else 'no (pure Python fallback)'}\n")
+    for size in args.sizes:
+        results = synthetic_results(size)
+        base_time, reference = timed(lambda: baseline_rank(results))
+        scorer = BatchScorer(TARGET)
+        score_time, scores = timed(lambda: scorer.score_batch(results))
+        select_time, top = timed(lambda: top_k_indices(scores, args.top))
+        full_time, _ = timed(lambda: top_k_indices(scores, len(scores)))
+        same = [results[i] for i in top] == reference[:args.top]
+
+        inc_base_time, inc_reference = timed(lambda: baseline_incremental(results, args.batch, args.top))
+        inc_time, ranker = timed(lambda: incremental(results, args.batch, args.top))
+        inc_same = [index for _, index in ranker.ranking()] == inc_reference
+
+        print(f"{size:,} results")
+        print(f"  per-result score + full sort   {base_time * 1000:9.1f} ms")
+        print(f"  batch score                    {score_time * 1000:9.1f} ms")
+        print(f"  + top-{args.top} selection          {select_time * 1000:9.1f} ms   (full ranking {full_time * 1000:.1f} ms)")
+        print(f"  speedup for top-{args.top}           {base_time / (score_time + select_time):9.1f}x   same order: {same}")
+        print(f"  incremental, insort per result {inc_base_time * 1000:9.1f} ms")
+        print(f"  incremental, batch + run merge {inc_time * 1000:9.1f} ms   same order: {inc_same}\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: import time of the entry points and of what a spawned
+extraction worker loads, each in a fresh interpreter, checked against a
+budget. Also fails when a module pulls in a heavy dependency at import time
+that it should only load on first use.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 10 --scale 1.5
+
+Exits with status 1 when a budget is exceeded, so it can gate CI.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imports (comma separated) -> budget in ms of cumulative import time
+BUDGETS = {
+    'main': 100,
+    'app.target_type': 120,
+    'app.deep_search': 200,
+    'main,utils.extraction_pool': 150,  # extraction worker spawned by the CLI
+    'api': 700,  # FastAPI alone is ~400 ms
+}
+# Loaded on first use only; none of them may appear after importing the modules above
+LAZY_DEPENDENCIES = ('aiohttp', 'aiohttp_socks', 'numpy', 'phonenumbers', 'email_validator', 'google.generativeai',
+                     'dotenv', 'uvicorn')
+# Except where the entry point needs them: FastAPI imports email_validator, the API reads .env up front
+EAGER_ALLOWED = {'api': ('email_validator', 'dotenv')}
+IMPORTTIME_LINE = re.compile(r'^import time:\s+\d+ \|\s+(\d+) \| (\S+)$')
+
+
+def measure(modules: str):
+    """(cumulative import ms, heavy dependencies loaded) in a fresh interpreter."""
+    names = modules.split(',')
+    code = (
+        f"import sys, json\nimport {', '.join(names)}\n"
+        f"print(json.dumps([m for m in {LAZY_DEPENDENCIES!r} if m in sys.modules]))"
+    )
+    env = {**os.environ, 'PYTHONPATH': ROOT, 'GOOGLE_API_KEY': 'x', 'GOOGLE_CX_ID': 'x', 'ECHOFORGE_LLM_BACKEND': 'stub'}
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+    total = 0
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        # Only the top-level entries of the requested modules; nested ones are included in them
+        if match and match.group(2) in names:
+            total += int(match.group(1))
+    return total / 1000, json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def cli_wall_time(runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, 'main.py', '--help'], cwd=ROOT, capture_output=True, check=True)
+        times.append(time.perf_counter() - started)
+    return statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--scale', type=float, default=1.0, help='multiply every budget, for slow machines')
+    args = parser.parse_args()
+
+    failed = False
+    for modules, budget in BUDGETS.items():
+        samples, loaded = [], []
+        for _ in range(args.runs):
+            ms, loaded = measure(modules)
+            samples.append(ms)
+        loaded = [name for name in loaded if name not in EAGER_ALLOWED.get(modules, ())]
+        median = statistics.median(samples)
+        limit = budget * args.scale
+        ok = median <= limit and not loaded
+        failed |= not ok
+        extra = f"   eagerly loads: {', '.join(loaded)}" if loaded else ''
+        print(f"  {modules:<28} {median:8.1f} ms   budget {limit:6.0f} ms   {'ok' if ok else 'OVER'}{extra}")
+
+    print(f"\n  python main.py --help        {cli_wall_time(args.runs):8.1f} ms wall (interpreter included)")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tor transport benchmark: parallel .onion page fetches through utils/tor_pool
+against a local SOCKS stand-in (benchmarks/fake_socks.py) in front of the
+upstream stand-in (benchmarks/fake_upstream.py). Compares one circuit with
+a pool of isolated circuits, then runs a health check round.
+
+    python -m benchmarks.bench_tor
+    python -m benchmarks.bench_tor --fetches 200 --circuits 1 4 8 --slow-share 0.25
+"""
+import argparse
+import asyncio
+import hashlib
+import statistics
+import time
+
+from benchmarks.bench_load import free_port, start_upstream
+from benchmarks.fake_socks import FakeSocks, add_socks_arguments
+from benchmarks.fake_upstream import add_profile_arguments
+from utils.tor_pool import CircuitPool
+
+
+async def fetch_all(pool: CircuitPool, urls, concurrency: int):
+    import aiohttp
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+
+    async def fetch(url: str):
+        nonlocal failures
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                async with pool.get(url, timeout=aiohttp.ClientTimeout(total=60)) as resp:
+                    await resp.read()
+                    if resp.status != 200:
+                        raise RuntimeError(f"HTTP {resp.status}")
+            except Exception:
+                failures += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(fetch(url) for url in urls))
+    return latencies, failures, time.perf_counter() - started
+
+
+async def run(args, upstream_port: int):
+    socks = FakeSocks(('127.0.0.1', upstream_port), args.circuit_latency_ms, args.slow_share, args.slow_factor,
+                      args.streams_per_circuit)
+    socks_port = free_port()
+    await socks.start('127.0.0.1', socks_port)
+    urls = [f"http://{hashlib.sha1(str(i).encode()).hexdigest()[:16]}.onion/page/{i}" for i in range(args.fetches)]
+
+    for size in args.circuits:
+        socks.connections.clear()
+        pool = CircuitPool(f"socks5://127.0.0.1:{socks_port}", size=size, slow_seconds=args.slow_seconds,
+                           health_url=f"http://health{size}.onion/stats")
+        latencies, failures, wall = await fetch_all(pool, urls, args.concurrency)
+        p50 = statistics.median(latencies) * 1000 if latencies else 0.0
+        p99 = statistics.quantiles(latencies, n=100)[98] * 1000 if len(latencies) > 1 else p50
+        print(f"  {size:>2} circuit(s)   {len(latencies) / wall:7.1f} fetches/s   p50 {p50:7.0f} ms   "
+              f"p99 {p99:7.0f} ms   failed {failures}   circuits used {len(socks.connections)}   "
+              f"rotated {pool.rotations}")
+
+        health = await pool.check()
+        unhealthy = sum(isinstance(result, str) for result in health.values())
+        print(f"      health check: {len(health) - unhealthy}/{len(health)} healthy, "
+              f"{pool.rotations} rotations in total")
+        await pool.close()
+
+    await socks.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fetches', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--circuits', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--slow-seconds', type=float, default=2.0, help='rotate circuits slower than this')
+    add_socks_arguments(parser)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    upstream_port = free_port()
+    upstream = start_upstream(args, upstream_port)
+    print(f"{args.fetches} fetches, concurrency {args.concurrency}, circuit latency {args.circuit_latency_ms:.0f} ms, "
+          f"{args.slow_share:.0%} slow circuits (x{args.slow_factor:g})\n")
+    try:
+        asyncio.run(run(args, upstream_port))
+    finally:
+        upstream.terminate()
+        upstream.wait()
+
+
+if __name__ == '__main__':
+    main()
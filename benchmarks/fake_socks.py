@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Local SOCKS5 stand-in for the Tor client, for testing utils/tor_pool offline.
+
+Each username/password pair plays one circuit, the way Tor's IsolateSOCKSAuth
+treats them: it gets its own latency, drawn once per credential pair (a
+share of circuits is slow), and builds at most --streams-per-circuit
+streams at a time, the rest queue behind them. .onion hosts are connected
+to --onion-target, everything else directly.
+
+    python -m benchmarks.fake_upstream --port 8765 &
+    python -m benchmarks.fake_socks --port 9050 --onion-target 127.0.0.1:8765 --slow-share 0.25
+    ECHOFORGE_TOR_PROXY=socks5://127.0.0.1:9050 uvicorn api:app
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+import socket
+import struct
+from collections import Counter
+from typing import Dict, Optional, Set, Tuple
+
+
+class FakeSocks:
+    def __init__(self, onion_target: Tuple[str, int], latency_ms: float = 300.0, slow_share: float = 0.0,
+                 slow_factor: float = 10.0, streams_per_circuit: int = 2):
+        self.onion_target = onion_target
+        self.latency_ms = latency_ms
+        self.slow_share = slow_share
+        self.slow_factor = slow_factor
+        self.streams_per_circuit = streams_per_circuit
+        self.streams: Dict[str, asyncio.Semaphore] = {}
+        self.connections: Counter = Counter()  # circuit -> streams opened
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.handlers: Set[asyncio.Task] = set()
+
+    def circuit_latency(self, circuit: str) -> float:
+        rng = random.Random(hashlib.blake2b(circuit.encode(), digest_size=8).digest())
+        latency = self.latency_ms * rng.uniform(0.7, 1.3)
+        if rng.random() < self.slow_share:
+            latency *= self.slow_factor
+        return latency / 1000
+
+    async def handshake(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> Tuple[str, str, int]:
+        """Greeting, optional RFC 1929 auth and CONNECT; returns (circuit, host, port)."""
+        version, count = await reader.readexactly(2)
+        methods = await reader.readexactly(count)
+        if version != 5:
+            raise ConnectionError(f"SOCKS version {version}")
+        circuit = 'anonymous'
+        if 2 in methods:
+            writer.write(b'\x05\x02')
+            await reader.readexactly(1)
+            username = await reader.readexactly((await reader.readexactly(1))[0])
+            password = await reader.readexactly((await reader.readexactly(1))[0])
+            circuit = f"{username.decode()}:{password.decode()}"
+            writer.write(b'\x01\x00')
+        else:
+            writer.write(b'\x05\x00')
+
+        _, command, _, address_type = await reader.readexactly(4)
+        if address_type == 1:
+            host = socket.inet_ntoa(await reader.readexactly(4))
+        elif address_type == 3:
+            host = (await reader.readexactly((await reader.readexactly(1))[0])).decode()
+        elif address_type == 4:
+            host = socket.inet_ntop(socket.AF_INET6, await reader.readexactly(16))
+        else:
+            raise ConnectionError(f"Address type {address_type}")
+        port = struct.unpack('!H', await reader.readexactly(2))[0]
+        if command != 1:
+            writer.write(b'\x05\x07\x00\x01' + bytes(6))  # Command not supported
+            raise ConnectionError(f"SOCKS command {command}")
+        return circuit, host, port
+
+    @staticmethod
+    async def pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, delay: float = 0.0):
+        try:
+            while data := await reader.read(65536):
+                if delay:
+                    await asyncio.sleep(delay)
+                writer.write(data)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self.handlers.add(task)
+        try:
+            circuit, host, port = await self.handshake(reader, writer)
+            self.connections[circuit] += 1
+            semaphore = self.streams.setdefault(circuit, asyncio.Semaphore(self.streams_per_circuit))
+            # The circuit is busy while it builds the stream; idle keep-alive streams don't hold it
+            latency = self.circuit_latency(circuit)
+            async with semaphore:
+                await asyncio.sleep(latency)
+            if host.endswith('.onion'):
+                host, port = self.onion_target
+            upstream_reader, upstream_writer = await asyncio.open_connection(host, port)
+            writer.write(b'\x05\x00\x00\x01' + bytes(6))
+            # Responses on a kept-alive stream still cross the circuit
+            await asyncio.gather(self.pipe(reader, upstream_writer), self.pipe(upstream_reader, writer, latency / 2))
+        except (ConnectionError, asyncio.IncompleteReadError, OSError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+            self.handlers.discard(task)
+
+    async def start(self, host: str = '127.0.0.1', port: int = 9050):
+        self.server = await asyncio.start_server(self.handle, host, port)
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            # Streams kept alive by clients would otherwise keep wait_closed() waiting
+            for task in list(self.handlers):
+                task.cancel()
+            await asyncio.gather(*self.handlers, return_exceptions=True)
+            await self.server.wait_closed()
+
+
+def add_socks_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--circuit-latency-ms', type=float, default=300.0, help='added to every stream a circuit opens')
+    parser.add_argument('--slow-share', type=float, default=0.0, help='share of circuits that are slow')
+    parser.add_argument('--slow-factor', type=float, default=10.0, help='latency multiplier of slow circuits')
+    parser.add_argument('--streams-per-circuit', type=int, default=2, help='streams a circuit builds at once')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9050)
+    parser.add_argument('--onion-target', default='127.0.0.1:8765', help='host:port every .onion address reaches')
+    add_socks_arguments(parser)
+    args = parser.parse_args()
+
+    onion_host, onion_port = args.onion_target.rsplit(':', 1)
+    socks = FakeSocks((onion_host, int(onion_port)), args.circuit_latency_ms, args.slow_share, args.slow_factor,
+                      args.streams_per_circuit)
+
+    async def serve():
+        await socks.start(args.host, args.port)
+        print(f"SOCKS5 stand-in on {args.host}:{args.port}, .onion -> {args.onion_target}", flush=True)
+        await socks.server.serve_forever()
+
+    asyncio.run(serve())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the upstreams a search talks to, for offline load tests:
+
+    GET /customsearch/v1   Google Custom Search JSON API (q, start, num)
+    GET /ahmia/search/     Ahmia's HTML result list (q)
+    GET /page/{id}         an arbitrary result page, for fallback browsing
+    GET /stats             calls served so far, by endpoint and status
+    POST /stats/reset
+
+Responses are deterministic per query, so dorks of one search overlap the
+way real results do (shared profiles, mirrors) and dedup has work to do.
+
+    python -m benchmarks.fake_upstream --port 8765 --latency-ms 80 --throttle-rate 0.02
+    ECHOFORGE_CSE_URL=http://127.0.0.1:8765/customsearch/v1 \\
+    ECHOFORGE_AHMIA_URL=http://127.0.0.1:8765/ahmia/search/ uvicorn api:app
+"""
+import argparse
+import asyncio
+import hashlib
+import html
+import random
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List
+
+from aiohttp import web
+
+HOSTS = ['www.linkedin.com', 'github.com', 'twitter.com', 'medium.com', 'www.facebook.com', 'example.org',
+         'en.wikipedia.org', 'news.example.com', 'blog.example.net', 'www.youtube.com']
+WORDS = ['security', 'engineer', 'osint', 'research', 'profile', 'conference', 'python', 'tunis', 'talk',
+         'team', 'project', 'open', 'source', 'contact', 'about', 'community', 'data', 'cloud', 'paper']
+
+
+@dataclass
+class UpstreamProfile:
+    latency_ms: float = 50.0
+    jitter_ms: float = 20.0
+    throttle_rate: float = 0.0  # Share of CSE calls answered with 429
+    max_total: int = 60  # totalResults per query is drawn from 0..max_total
+    snippet_words: int = 25
+    pagemap_bytes: int = 1500  # Rough size of each item's pagemap
+    page_bytes: int = 50_000  # Size of /page/{id} bodies
+    shared_pool: int = 40  # Results drawn from a pool shared by every query of a target
+    shared_share: float = 0.3  # Share of results taken from that pool
+
+
+def seeded(*parts) -> random.Random:
+    return random.Random(hashlib.blake2b('|'.join(map(str, parts)).encode(), digest_size=8).digest())
+
+
+class FakeUpstream:
+    def __init__(self, profile: UpstreamProfile):
+        self.profile = profile
+        self.calls: Counter = Counter()
+        self.base_url = ''
+
+    async def delay(self, rng: random.Random):
+        wait = self.profile.latency_ms + rng.uniform(-1, 1) * self.profile.jitter_ms
+        if wait > 0:
+            await asyncio.sleep(wait / 1000)
+
+    @staticmethod
+    def target_of(query: str) -> str:
+        # Dorks quote the target: '"Jane Doe" site:linkedin.com'
+        return query.split('"')[1] if query.count('"') >= 2 else query
+
+    def text(self, rng: random.Random, words: int, target: str) -> str:
+        chosen = [rng.choice(WORDS) for _ in range(words)]
+        chosen.insert(rng.randrange(len(chosen) + 1), target)
+        if rng.random() < 0.3:
+            chosen.append(f"{target.split()[0].lower()}.{rng.randrange(20)}@example.org")
+        if rng.random() < 0.1:
+            chosen.append(f"+1 415 555 {rng.randrange(1000, 9999)}")
+        return ' '.join(chosen)
+
+    def item(self, target: str, key: str) -> Dict:
+        rng = seeded(target, key)
+        host = rng.choice(HOSTS)
+        link = f"{self.base_url}/page/{hashlib.md5(f'{target}|{key}'.encode()).hexdigest()[:16]}?host={host}"
+        filler = 'x' * max(0, self.profile.pagemap_bytes - 200)
+        return {
+            'title': f"{target} - {' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 6)))}",
+            'link': link,
+            'displayLink': host,
+            'snippet': self.text(rng, self.profile.snippet_words, target),
+            'pagemap': {
+                'metatags': [{'og:title': target, 'og:url': link, 'og:description': filler}],
+                'cse_thumbnail': [{'src': f"{link}&thumb=1", 'width': '225', 'height': '225'}]
+            }
+        }
+
+    async def cse(self, request: web.Request) -> web.Response:
+        query = request.query.get('q', '')
+        start = int(request.query.get('start', 1))
+        num = min(10, int(request.query.get('num', 10)))
+        rng = seeded(query, start, self.calls['cse'])
+        self.calls['cse'] += 1
+        await self.delay(rng)
+        if rng.random() < self.profile.throttle_rate:
+            self.calls['cse_429'] += 1
+            return web.json_response({'error': {'code': 429, 'message': 'Rate Limit Exceeded'}}, status=429)
+
+        target = self.target_of(query)
+        total = seeded(query).randint(0, self.profile.max_total)
+        items = []
+        for rank in range(start, min(start + num, total + 1)):
+            pick = seeded(query, rank)
+            if pick.random() < self.profile.shared_share:
+                key = f"shared:{pick.randrange(self.profile.shared_pool)}"
+            else:
+                key = f"{query}:{rank}"
+            items.append(self.item(target, key))
+        body = {'searchInformation': {'totalResults': str(total), 'searchTime': 0.1}}
+        if items:
+            body['items'] = items
+        return web.json_response(body)
+
+    async def ahmia(self, request: web.Request) -> web.Response:
+        query = request.query.get('q', '')
+        rng = seeded('ahmia', query)
+        self.calls['ahmia'] += 1
+        await self.delay(rng)
+        rows = []
+        for n in range(rng.randint(0, 15)):
+            onion = hashlib.sha1(f'{query}{n}'.encode()).hexdigest()[:16]
+            rows.append(
+                f'<li class="result"><h4><a href="http://{onion}.onion/">{html.escape(query)} {n}</a></h4>'
+                f'<p>{html.escape(self.text(rng, 12, query))}</p><cite>{onion}.onion</cite></li>'
+            )
+        page = f"<html><body><ol class=\"searchResults\">{''.join(rows)}</ol></body></html>"
+        return web.Response(text=page, content_type='text/html')
+
+    async def page(self, request: web.Request) -> web.Response:
+        page_id = request.match_info['page_id']
+        rng = seeded('page', page_id)
+        self.calls['page'] += 1
+        await self.delay(rng)
+        paragraphs: List[str] = []
+        size = 0
+        while size < self.profile.page_bytes:
+            paragraph = f"<p>{self.text(rng, 40, 'Jane Doe')}</p>"
+            paragraphs.append(paragraph)
+            size += len(paragraph)
+        body = (
+            f"<html><head><title>Page {page_id}</title><meta name=\"description\" content=\"profile page\"></head>"
+            f"<body><main>{''.join(paragraphs)}</main></body></html>"
+        )
+        return web.Response(text=body, content_type='text/html')
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response(dict(self.calls))
+
+    async def reset(self, request: web.Request) -> web.Response:
+        self.calls.clear()
+        return web.json_response({})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/customsearch/v1', self.cse)
+        app.router.add_get('/ahmia/search/', self.ahmia)
+        app.router.add_get('/page/{page_id}', self.page)
+        app.router.add_get('/stats', self.stats)
+        app.router.add_post('/stats/reset', self.reset)
+        return app
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser):
+    defaults = UpstreamProfile()
+    parser.add_argument('--latency-ms', type=float, default=defaults.latency_ms)
+    parser.add_argument('--jitter-ms', type=float, default=defaults.jitter_ms)
+    parser.add_argument('--throttle-rate', type=float, default=defaults.throttle_rate, help='share of CSE calls answered 429')
+    parser.add_argument('--max-total', type=int, default=defaults.max_total, help='upper bound of totalResults per query')
+    parser.add_argument('--snippet-words', type=int, default=defaults.snippet_words)
+    parser.add_argument('--pagemap-bytes', type=int, default=defaults.pagemap_bytes)
+    parser.add_argument('--page-bytes', type=int, default=defaults.page_bytes)
+
+
+def profile_from_args(args) -> UpstreamProfile:
+    return UpstreamProfile(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, throttle_rate=args.throttle_rate,
+        max_total=args.max_total, snippet_words=args.snippet_words, pagemap_bytes=args.pagemap_bytes,
+        page_bytes=args.page_bytes
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    upstream = FakeUpstream(profile_from_args(args))
+    upstream.base_url = f"http://{args.host}:{args.port}"
+    web.run_app(upstream.app(), host=args.host, port=args.port, print=lambda message: print(message, flush=True))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,34 @@
 
 
-from typing import Dict
+import re
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+# "target" site:a.com  or  "target" (site:a.com OR site:b.com ...)
+SITE_ONLY_DORK = re.compile(r'^(?P<target>"[^"]+") (?:site:(?P<site>\S+)|\((?P<sites>site:\S+(?: OR site:\S+)*)\))$')
+
+# Google CSE rejects queries longer than 2048 characters and ignores words past 32
+MAX_QUERY_LENGTH = 2048
+
+
+def site_filters(query: str) -> Optional[Tuple[str, List[str]]]:
+    """Split a dork that only filters by site into its quoted target and sites."""
+    match = SITE_ONLY_DORK.match(query)
+    if not match:
+        return None
+    if match.group('site'):
+        return match.group('target'), [match.group('site')]
+    return match.group('target'), [site[len('site:'):] for site in match.group('sites').split(' OR ')]
+
+
+def matches_site(url: str, site: str) -> bool:
+    """Whether url falls under a site: filter such as github.com or linkedin.com/in."""
+    parsed = urlparse(url if '//' in url else f'//{url}')
+    host = (parsed.hostname or '').lower()
+    domain, _, path = site.lower().partition('/')
+    if host != domain and not host.endswith('.' + domain):
+        return False
+    return not path or parsed.path.lower().lstrip('/').startswith(path)
 
 
 class DorkGenerator:
@@ -81,3 +109,38 @@ class DorkGenerator:
         
         # Filter out empty queries
         return {k: v for k, v in dorks.items() if v}
+
+    @staticmethod
+    def merge_site_dorks(dorks: Dict[str, str], max_sites: int = 10,
+                         max_query_length: int = MAX_QUERY_LENGTH) -> Dict[str, Dict[str, List[str]]]:
+        """
+        Group dorks that differ only in their site: filters into merged OR queries.
+
+        Returns {merged query: {dork name: sites}}; dorks that cannot be merged
+        are left out. A group never splits a dork and stays under max_sites
+        filters and the CSE query length limit.
+        """
+        groups: Dict[str, List[Tuple[str, List[str]]]] = {}
+        for dork_name, query in dorks.items():
+            parsed = site_filters(query)
+            if parsed:
+                groups.setdefault(parsed[0], []).append((dork_name, parsed[1]))
+
+        merged = {}
+        for target, members in groups.items():
+            batches: List[List[Tuple[str, List[str]]]] = [[]]
+            for dork_name, sites in members:
+                candidate = batches[-1] + [(dork_name, sites)]
+                site_count = sum(len(s) for _, s in candidate)
+                if batches[-1] and (site_count > max_sites or len(_or_query(target, candidate)) > max_query_length):
+                    batches.append([(dork_name, sites)])
+                else:
+                    batches[-1] = candidate
+            for batch in batches:
+                if len(batch) > 1:
+                    merged[_or_query(target, batch)] = dict(batch)
+        return merged
+
+
+def _or_query(target: str, members: List[Tuple[str, List[str]]]) -> str:
+    return f"{target} ({' OR '.join(f'site:{site}' for _, sites in members for site in sites)})"
@@ -0,0 +1,141 @@
+import asyncio
+import heapq
+import math
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.storage import connect_sqlite, data_path
+
+
+class DorkYieldStore:
+    """
+    Persistent per-dork history of CSE calls and the new unique results they
+    produced. Each recorded run first scales the dork's history by decay, so
+    recent runs outweigh old ones.
+    """
+
+    def __init__(self, path: str = '', decay: float = 0.8):
+        self.path = path
+        self.decay = decay
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            conn = connect_sqlite(self.path or data_path('dork_yield.sqlite3'))
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS dork_yield ("
+                "target_type TEXT NOT NULL, dork_name TEXT NOT NULL, calls REAL NOT NULL, "
+                "new_results REAL NOT NULL, runs INTEGER NOT NULL, updated REAL NOT NULL, "
+                "PRIMARY KEY (target_type, dork_name))"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _load(self, target_type: str) -> Dict[str, Tuple[float, float, int]]:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT dork_name, calls, new_results, runs FROM dork_yield WHERE target_type = ?",
+                (target_type,)
+            ).fetchall()
+        return {name: (calls, new_results, runs) for name, calls, new_results, runs in rows}
+
+    def _record(self, target_type: str, observations: Dict[str, Tuple[float, float]]):
+        now = time.time()
+        with self._lock:
+            self._connection().executemany(
+                "INSERT INTO dork_yield (target_type, dork_name, calls, new_results, runs, updated) "
+                "VALUES (?, ?, ?, ?, 1, ?) ON CONFLICT(target_type, dork_name) DO UPDATE SET "
+                "calls = calls * ? + excluded.calls, new_results = new_results * ? + excluded.new_results, "
+                "runs = runs + 1, updated = excluded.updated",
+                [(target_type, name, calls, new_results, now, self.decay, self.decay)
+                 for name, (calls, new_results) in observations.items()]
+            )
+
+    async def load(self, target_type: str) -> Dict[str, Tuple[float, float, int]]:
+        return await asyncio.to_thread(self._load, target_type)
+
+    async def record(self, target_type: str, observations: Dict[str, Tuple[float, float]]):
+        if observations:
+            await asyncio.to_thread(self._record, target_type, observations)
+
+
+class DorkPlanner:
+    """
+    Orders dorks by historical yield (new unique results per CSE call) and
+    splits a share of the remaining quota into per-dork page budgets.
+
+    Yields are smoothed towards prior_yield so new dorks still get tried.
+    Each extra page of a dork is worth page_decay times the previous one;
+    pages are handed out greedily by that marginal value. Dorks observed at
+    least min_observations times with a yield under min_yield are skipped,
+    except that each gets a one-page exploration run with probability
+    explore_rate, so a dork whose results improved can climb back.
+    """
+
+    def __init__(self, store: DorkYieldStore, quota_share: float = 0.5, prior_yield: float = 3.0,
+                 prior_calls: float = 2.0, min_yield: float = 0.25, min_observations: int = 3,
+                 page_decay: float = 0.6, explore_rate: float = 0.1, rng: Optional[random.Random] = None):
+        self.store = store
+        self.quota_share = quota_share
+        self.prior_yield = prior_yield
+        self.prior_calls = prior_calls
+        self.min_yield = min_yield
+        self.min_observations = min_observations
+        self.page_decay = page_decay
+        self.explore_rate = explore_rate
+        self.rng = rng or random.Random()
+
+    def expected_yield(self, history: Tuple[float, float, int]) -> float:
+        calls, new_results, _ = history
+        return (new_results + self.prior_yield * self.prior_calls) / (calls + self.prior_calls)
+
+    def build_plan(self, dorks: Dict[str, str], history: Dict[str, Tuple[float, float, int]],
+                   max_results_per_dork: int, remaining_quota: int) -> List[Dict[str, Any]]:
+        max_pages = max(1, math.ceil(min(max_results_per_dork, 100) / 10))
+        budget = int(remaining_quota * self.quota_share)
+        # Never plan fewer pages than one per dork while quota allows it
+        budget = min(remaining_quota, max(budget, len(dorks)))
+
+        entries = {}
+        for dork_name, query in dorks.items():
+            observed = history.get(dork_name, (0.0, 0.0, 0))
+            entries[dork_name] = {
+                'dork_name': dork_name,
+                'query': query,
+                'expected_yield': round(self.expected_yield(observed), 3),
+                'observed_calls': observed[0],
+                'pages': 0,
+                'reason': 'quota'
+            }
+            if observed[2] >= self.min_observations and entries[dork_name]['expected_yield'] < self.min_yield:
+                entries[dork_name]['reason'] = 'low_yield'
+
+        for entry in entries.values():
+            if entry['reason'] == 'low_yield' and budget > 0 and self.rng.random() < self.explore_rate:
+                entry['pages'] = 1
+                entry['reason'] = 'explore'
+                budget -= 1
+
+        heap = [(-e['expected_yield'], name) for name, e in entries.items() if e['reason'] == 'quota']
+        heapq.heapify(heap)
+        while heap and budget > 0:
+            negative_value, dork_name = heapq.heappop(heap)
+            entry = entries[dork_name]
+            entry['pages'] += 1
+            entry['reason'] = 'planned'
+            budget -= 1
+            if entry['pages'] < max_pages:
+                heapq.heappush(heap, (negative_value * self.page_decay, dork_name))
+
+        return sorted(entries.values(), key=lambda e: e['expected_yield'], reverse=True)
+
+    async def plan(self, dorks: Dict[str, str], target_type: str, max_results_per_dork: int,
+                   remaining_quota: int) -> List[Dict[str, Any]]:
+        history = await self.store.load(target_type)
+        return self.build_plan(dorks, history, max_results_per_dork, remaining_quota)
+
+    async def record(self, target_type: str, observations: Dict[str, Tuple[float, float]]):
+        await self.store.record(target_type, observations)
@@ -1,17 +1,39 @@
 #!/usr/bin/env python3
 #EchoForge
+import argparse
 import asyncio
 import json
-from unittest import result
-from app.target_type import analyse_target
-from utils.tor_manager import run_tor_manager
-from app.deep_search import deep_search
-async def main():
-    #await analyse_target(test_target)
-    #run_tor_manager()
-    # Usage
-    result = await deep_search("hosni raissi", "person", max_results=100)
+import sys
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="EchoForge deep search from the command line")
+    parser.add_argument('target', nargs='?', default="hosni raissi")
+    parser.add_argument('--type', dest='target_type', default='person', choices=['person', 'email', 'phone'])
+    parser.add_argument('--max-results', type=int, default=20, help="results per dork")
+    return parser.parse_args()
+
+
+async def main(args) -> int:
+    # The search stack is imported here, not at module level: --help stays instant and
+    # extraction workers that re-import this script don't load it
+    from utils.environment import configure_logging, load_environment
+
+    load_environment()
+    configure_logging()
+
+    from app.deep_search import deep_search, tor_pool
+
+    try:
+        result = await deep_search(args.target, args.target_type, max_results_per_dork=args.max_results)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    finally:
+        await tor_pool.close()
     print(json.dumps(result, indent=2))
+    return 0
+
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    sys.exit(asyncio.run(main(parse_args())))
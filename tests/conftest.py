@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# Stores and clients resolve their files under the data dir; keep test runs out of the checkout
+os.environ.setdefault('ECHOFORGE_DATA_DIR', tempfile.mkdtemp(prefix='echoforge-tests-'))
+os.environ.setdefault('ECHOFORGE_LLM_BACKEND', 'stub')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
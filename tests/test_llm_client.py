@@ -0,0 +1,79 @@
+import asyncio
+
+from utils.llm_client import BATCH_INSTRUCTION, LLMClient, StubBackend, item_prompt
+from utils.search_cache import MemoryCache
+
+INSTRUCTION = "Classify the target."
+
+
+def test_generate_many_batches_uncached_items():
+    backend = StubBackend()
+    client = LLMClient(backend, max_batch=3)
+    items = [f"item {n}" for n in range(7)]
+
+    answers = asyncio.run(client.generate_many(INSTRUCTION, items))
+
+    assert answers == ['other'] * 7
+    assert backend.calls == 3  # 3 + 3 + 1
+    assert all(BATCH_INSTRUCTION in prompt for prompt in backend.prompts)
+    assert client.stats()['batched_items'] == 7
+
+
+def test_repeated_items_are_asked_once():
+    backend = StubBackend()
+    client = LLMClient(backend)
+
+    answers = asyncio.run(client.generate_many(INSTRUCTION, ['a', 'b', 'a']))
+
+    assert answers == ['other'] * 3
+    assert backend.calls == 1
+    assert backend.prompts[0].count(': a') == 1
+
+
+def test_items_missing_from_batch_reply_fall_back_to_single_prompts():
+    def responder(prompt: str) -> str:
+        if BATCH_INSTRUCTION in prompt:
+            return "1: person\n3: email"  # Item 2 skipped
+        return 'phone'
+
+    backend = StubBackend(responder)
+    client = LLMClient(backend)
+
+    answers = asyncio.run(client.generate_many(INSTRUCTION, ['alice', '+1 555 0100', 'a@b.c']))
+
+    assert answers == ['person', 'phone', 'email']
+    assert backend.calls == 2
+    assert backend.prompts[1] == item_prompt(INSTRUCTION, '+1 555 0100')
+
+
+def test_failed_batch_falls_back_to_single_prompts():
+    def responder(prompt: str) -> str:
+        if BATCH_INSTRUCTION in prompt:
+            raise RuntimeError('batch too long')
+        return 'person'
+
+    backend = StubBackend(responder)
+    client = LLMClient(backend, retry_attempts=1)
+
+    answers = asyncio.run(client.generate_many(INSTRUCTION, ['alice', 'bob']))
+
+    assert answers == ['person', 'person']
+    assert backend.calls == 3
+
+
+def test_batched_answers_are_cached_per_item():
+    backend = StubBackend()
+    client = LLMClient(backend, cache=MemoryCache(60))
+
+    async def run():
+        await client.generate_many(INSTRUCTION, ['alice', 'bob'])
+        single = await client.generate_item(INSTRUCTION, 'bob')
+        again = await client.generate_many(INSTRUCTION, ['alice', 'bob'])
+        return single, again
+
+    single, again = asyncio.run(run())
+
+    assert single == 'other'
+    assert again == ['other', 'other']
+    assert backend.calls == 1
+    assert client.stats()['cache_hits'] == 3
@@ -0,0 +1,57 @@
+import asyncio
+import sqlite3
+
+from utils.search_cache import SQLiteCache
+
+
+def recount(path: str):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM search_cache").fetchone()
+
+
+def test_usage_follows_writes_overwrites_and_expiry(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    cache = SQLiteCache(path, ttl=3600, max_entries=1000, memory_entries=1)
+
+    async def run():
+        for n in range(20):
+            await cache.set(f"k{n}", {'n': n})
+        await cache.set('k0', {'n': 'a much longer value than before'})
+        await asyncio.to_thread(cache._connection().execute, "UPDATE search_cache SET created = 0 WHERE key = 'k1'")
+        assert await cache.get('k1') is None  # Expired row deleted on read
+        return await cache.usage()
+
+    usage = asyncio.run(run())
+    assert (usage['entries'], usage['bytes']) == recount(path)
+    assert usage['entries'] == 19
+
+
+def test_lru_eviction_keeps_limits(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    cache = SQLiteCache(path, ttl=3600, max_entries=10, memory_entries=1)
+
+    async def run():
+        for n in range(25):
+            await cache.set(f"k{n}", n)
+        return await cache.usage()
+
+    usage = asyncio.run(run())
+    assert usage['entries'] <= 10
+    assert (usage['entries'], usage['bytes']) == recount(path)
+    assert cache.evictions >= 15
+
+
+def test_existing_cache_is_counted_once(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE search_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, "
+            "accessed REAL NOT NULL, size INTEGER NOT NULL)"
+        )
+        conn.executemany(
+            "INSERT INTO search_cache VALUES (?, '1', 1e12, 1e12, 1)", [(f"old{n}",) for n in range(5)]
+        )
+
+    cache = SQLiteCache(path, ttl=3600)
+    usage = asyncio.run(cache.usage())
+    assert usage == {'entries': 5, 'bytes': 5}
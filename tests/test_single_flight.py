@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from utils.single_flight import SingleFlight
+
+
+class Boom(Exception):
+    pass
+
+
+def test_waiters_share_one_call():
+    async def run():
+        flight = SingleFlight()
+        calls = 0
+
+        async def fn():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return calls
+
+        results = await asyncio.gather(*(flight.do('key', fn) for _ in range(5)))
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(run())
+    assert calls == 1
+    assert results == [1] * 5
+    assert flight.stats() == {'executed': 1, 'coalesced': 4, 'in_flight': 0}
+
+
+def test_every_waiter_gets_the_same_exception():
+    async def run():
+        flight = SingleFlight()
+        error = Boom('upstream down')
+
+        async def fn():
+            await asyncio.sleep(0.01)
+            raise error
+
+        results = await asyncio.gather(*(flight.do('key', fn) for _ in range(3)), return_exceptions=True)
+        return error, results
+
+    error, results = asyncio.run(run())
+    assert all(result is error for result in results)
+
+
+def test_exception_is_not_cached():
+    async def run():
+        flight = SingleFlight()
+        attempts = 0
+
+        async def fn():
+            nonlocal attempts
+            attempts += 1
+            if attempts == 1:
+                raise Boom('first call fails')
+            return 'ok'
+
+        with pytest.raises(Boom):
+            await flight.do('key', fn)
+        assert flight.calls == {}
+        return flight, await flight.do('key', fn)
+
+    flight, result = asyncio.run(run())
+    assert result == 'ok'
+    assert flight.executed == 2
+
+
+def test_cancelled_waiter_leaves_call_running_for_others():
+    async def run():
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def fn():
+            await release.wait()
+            return 'done'
+
+        first = asyncio.create_task(flight.do('key', fn))
+        second = asyncio.create_task(flight.do('key', fn))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return await second, first.cancelled()
+
+    result, first_cancelled = asyncio.run(run())
+    assert result == 'done'
+    assert first_cancelled
+
+
+def test_call_cancelled_with_its_last_waiter():
+    async def run():
+        flight = SingleFlight()
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def fn():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        waiter = asyncio.create_task(flight.do('key', fn))
+        await started.wait()
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        await asyncio.wait_for(cancelled.wait(), 1)
+        await asyncio.sleep(0)
+        return flight
+
+    flight = asyncio.run(run())
+    assert flight.calls == {}
@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip('aiohttp_socks')
+from aiohttp import web
+
+from benchmarks.fake_socks import FakeSocks
+from utils.tor_pool import CircuitPool
+
+
+async def start_upstream():
+    """Local HTTP server every .onion host reaches through the fake proxy."""
+    async def ok(request):
+        return web.Response(text='ok')
+
+    async def fail(request):
+        return web.Response(status=503)
+
+    app = web.Application()
+    app.router.add_get('/ok', ok)
+    app.router.add_get('/fail', fail)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    return runner, runner.addresses[0][1]
+
+
+def run_with_proxy(scenario, latency_ms: float = 0.0, **pool_options):
+    async def run():
+        runner, upstream_port = await start_upstream()
+        socks = FakeSocks(('127.0.0.1', upstream_port), latency_ms=latency_ms)
+        await socks.start('127.0.0.1', 0)
+        proxy_port = socks.server.sockets[0].getsockname()[1]
+        pool = CircuitPool(f"socks5://127.0.0.1:{proxy_port}", **pool_options)
+        try:
+            return await scenario(pool, socks)
+        finally:
+            await pool.close()
+            await socks.stop()
+            await runner.cleanup()
+
+    return asyncio.run(run())
+
+
+async def fetch(pool: CircuitPool, path: str) -> int:
+    async with pool.get(f"http://example.onion{path}") as resp:
+        await resp.read()
+        return resp.status
+
+
+def test_circuit_rotates_after_max_failures():
+    async def scenario(pool, socks):
+        statuses = [await fetch(pool, '/fail') for _ in range(3)]
+        circuit = pool.circuits[0]
+        assert await fetch(pool, '/ok') == 200
+        return statuses, circuit, socks.connections
+
+    statuses, circuit, connections = run_with_proxy(scenario, size=1, max_failures=3)
+
+    assert statuses == [503] * 3
+    assert circuit.generation == 1
+    # The replacement circuit presented new credentials to the proxy
+    assert {credentials.rsplit(':', 1)[1] for credentials in connections} == {'0', '1'}
+
+
+def test_success_resets_failure_count():
+    async def scenario(pool, socks):
+        for path in ('/fail', '/fail', '/ok', '/fail', '/fail'):
+            await fetch(pool, path)
+        return pool.rotations, pool.circuits[0].failures
+
+    rotations, failures = run_with_proxy(scenario, size=1, max_failures=3)
+
+    assert rotations == 0
+    assert failures == 2
+
+
+def test_caller_errors_do_not_count_against_circuit():
+    async def scenario(pool, socks):
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                async with pool.get('http://example.onion/ok'):
+                    raise ValueError('parse error in caller')
+        return pool.rotations, pool.circuits[0].failures
+
+    rotations, failures = run_with_proxy(scenario, size=1, max_failures=3)
+
+    assert rotations == 0
+    assert failures == 0
+
+
+def test_slow_circuit_rotates_after_min_samples():
+    async def scenario(pool, socks):
+        for _ in range(2):
+            await fetch(pool, '/ok')
+        return pool.rotations, pool.circuits[0].generation
+
+    rotations, generation = run_with_proxy(
+        scenario, latency_ms=50, size=1, slow_seconds=0.01, min_samples=2, max_failures=3
+    )
+
+    assert rotations == 1
+    assert generation == 1
+
+
+def test_parallel_requests_spread_over_circuits():
+    async def scenario(pool, socks):
+        await asyncio.gather(*(fetch(pool, '/ok') for _ in range(4)))
+        return [circuit.requests for circuit in pool.circuits]
+
+    requests = run_with_proxy(scenario, latency_ms=20, size=4, slow_seconds=10)
+
+    assert requests == [1, 1, 1, 1]
@@ -0,0 +1,215 @@
+import hashlib
+import re
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Optional, Set, Tuple
+
+
+class EntityExtractor:
+    @staticmethod
+    def extract_emails(text: str) -> Set[str]:
+        from email_validator import validate_email, EmailNotValidError
+
+        pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+        emails = set(re.findall(pattern, text))
+        valid_emails = set()
+        for email in emails:
+            try:
+                valid = validate_email(email, check_deliverability=False)
+                valid_emails.add(valid.email)
+            except EmailNotValidError:
+                pass
+        return valid_emails
+    
+    @staticmethod
+    def extract_phone_numbers(text: str) -> Set[str]:
+        import phonenumbers
+
+        phones = set()
+        for match in phonenumbers.PhoneNumberMatcher(text, None):
+            phones.add(phonenumbers.format_number(match.number, phonenumbers.PhoneNumberFormat.E164))
+        return phones
+    
+    @staticmethod
+    def extract_urls(text: str) -> Set[str]:
+        pattern = r'https?://(?:www\.)?[-a-zA-Z0-9@:%._\+~#=]{1,256}\.[a-zA-Z0-9()]{1,6}\b(?:[-a-zA-Z0-9()@:%_\+.~#?&/=]*)'
+        return set(re.findall(pattern, text))
+    
+    @staticmethod
+    def extract_social_handles(text: str) -> Dict[str, Set[str]]:
+        handles = {
+            'twitter': set(re.findall(r'@([A-Za-z0-9_]{1,15})', text)),
+            'linkedin': set(re.findall(r'linkedin\.com/in/([A-Za-z0-9-]+)', text)),
+            'github': set(re.findall(r'github\.com/([A-Za-z0-9-]+)', text)),
+            'instagram': set(re.findall(r'instagram\.com/([A-Za-z0-9_.]+)', text))
+        }
+        return {k: v for k, v in handles.items() if v}
+    
+    @staticmethod
+    def extract_dates(text: str) -> Set[str]:
+        patterns = [
+            r'\b\d{4}-\d{2}-\d{2}\b',  # YYYY-MM-DD
+            r'\b\d{2}/\d{2}/\d{4}\b',  # MM/DD/YYYY
+            r'\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]* \d{1,2},? \d{4}\b'
+        ]
+        dates = set()
+        for pattern in patterns:
+            dates.update(re.findall(pattern, text, re.IGNORECASE))
+        return dates
+    
+    @staticmethod
+    def extract_all(text: str) -> Dict[str, Any]:
+        return entity_scanner.extract(text)
+
+
+# ==================== Gated Scanner ====================
+EMAIL_PATTERN = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+URL_PATTERN = r'https?://(?:www\.)?[-a-zA-Z0-9@:%._\+~#=]{1,256}\.[a-zA-Z0-9()]{1,6}\b(?:[-a-zA-Z0-9()@:%_\+.~#?&/=]*)'
+MONTHS = r'(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)'
+
+# (kind, pattern, group, literal every match contains). Kinds are scanned
+# independently, as the per-kind extractors do, so overlapping entities (an
+# email inside a URL, a date inside a LinkedIn slug) are all found; the
+# literal lets most texts skip most passes.
+KIND_PATTERNS = [
+    ('email', re.compile(EMAIL_PATTERN), 0, '@'),
+    ('url', re.compile(URL_PATTERN), 0, '://'),
+    ('twitter', re.compile(r'@([A-Za-z0-9_]{1,15})'), 1, '@'),
+    ('linkedin', re.compile(r'linkedin\.com/in/([A-Za-z0-9-]+)'), 1, 'linkedin.com/in/'),
+    ('github', re.compile(r'github\.com/([A-Za-z0-9-]+)'), 1, 'github.com/'),
+    ('instagram', re.compile(r'instagram\.com/([A-Za-z0-9_.]+)'), 1, 'instagram.com/'),
+]
+DATE_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE) for pattern in (
+        r'\b\d{4}-\d{2}-\d{2}\b',
+        r'\b\d{2}/\d{2}/\d{4}\b',
+        r'\b' + MONTHS + r'[a-z]* \d{1,2},? \d{4}\b'
+    )
+]
+DIGITS = re.compile(r'\d{2}')  # Every date pattern needs two digits in a row
+SOCIAL_KINDS = ('twitter', 'linkedin', 'github', 'instagram')
+
+
+@lru_cache(maxsize=8192)
+def _normalize_email(email: str) -> Optional[str]:
+    from email_validator import validate_email, EmailNotValidError
+
+    try:
+        return validate_email(email, check_deliverability=False).email
+    except EmailNotValidError:
+        return None
+
+
+class EntityScanner:
+    """
+    Still one pass per entity kind, but with precompiled patterns, and a
+    kind's pass only runs on texts containing a literal its matches need.
+    Results are memoized by text hash in an LRU.
+
+    Phone numbers still go through phonenumbers, but only when the text
+    contains a '+': without a default region PhoneNumberMatcher cannot match
+    anything else.
+    """
+
+    def __init__(self, memo_size: int = 4096):
+        self.memo_size = memo_size
+        self.memo: "OrderedDict[bytes, Tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+    def _extract(self, text: str) -> Tuple:
+        found = {kind: {} for kind in ('url', 'email', 'date') + SOCIAL_KINDS}
+        for kind, pattern, group, literal in KIND_PATTERNS:
+            if literal in text:
+                for match in pattern.finditer(text):
+                    found[kind][match.group(group)] = None
+        if DIGITS.search(text):
+            for pattern in DATE_PATTERNS:
+                for match in pattern.finditer(text):
+                    found['date'][match.group()] = None
+
+        emails = {}
+        for email in found['email']:
+            normalized = _normalize_email(email)
+            if normalized:
+                emails[normalized] = None
+
+        phones = {}
+        if '+' in text or '\uff0b' in text:
+            import phonenumbers
+
+            for match in phonenumbers.PhoneNumberMatcher(text, None):
+                phones[phonenumbers.format_number(match.number, phonenumbers.PhoneNumberFormat.E164)] = None
+
+        return (
+            tuple(emails),
+            tuple(phones),
+            tuple(found['url']),
+            tuple((kind, tuple(found[kind])) for kind in SOCIAL_KINDS if found[kind]),
+            tuple(found['date'])
+        )
+
+    def lookup(self, text: str) -> Optional[Dict[str, Any]]:
+        """Return the memoized entities for text, or None."""
+        key = self._key(text)
+        entry = self.memo.get(key)
+        if entry is None:
+            return None
+        self.memo.move_to_end(key)
+        self.hits += 1
+        return self._as_dict(entry)
+
+    def store(self, text: str, entities: Dict[str, Any]):
+        """Memoize entities computed elsewhere (e.g. in a pool worker)."""
+        self._remember(self._key(text), (
+            tuple(entities['emails']),
+            tuple(entities['phones']),
+            tuple(entities['urls']),
+            tuple((kind, tuple(handles)) for kind, handles in entities['social_handles'].items()),
+            tuple(entities['dates'])
+        ))
+
+    def _remember(self, key: bytes, entry: Tuple):
+        self.memo[key] = entry
+        self.memo.move_to_end(key)
+        while len(self.memo) > self.memo_size:
+            self.memo.popitem(last=False)
+
+    @staticmethod
+    def _as_dict(entry: Tuple) -> Dict[str, Any]:
+        emails, phones, urls, social_handles, dates = entry
+        return {
+            'emails': list(emails),
+            'phones': list(phones),
+            'urls': list(urls),
+            'social_handles': {kind: list(handles) for kind, handles in social_handles},
+            'dates': list(dates)
+        }
+
+    def extract(self, text: str) -> Dict[str, Any]:
+        key = self._key(text)
+        entry = self.memo.get(key)
+        if entry is not None:
+            self.memo.move_to_end(key)
+            self.hits += 1
+        else:
+            self.misses += 1
+            entry = self._extract(text)
+            self._remember(key, entry)
+        return self._as_dict(entry)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'memo_entries': len(self.memo),
+            'memo_hits': self.hits,
+            'memo_misses': self.misses,
+            'memo_hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+
+entity_scanner = EntityScanner()
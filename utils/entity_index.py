@@ -0,0 +1,189 @@
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils.storage import connect_sqlite, data_path
+
+# Aggregated kinds worth pivoting on; social handles are indexed as handle:<platform>
+INDEXED_KINDS = {'emails': 'email', 'phones': 'phone', 'urls': 'url'}
+
+
+def entity_postings(results: Iterable[Dict[str, Any]]) -> List[Tuple[str, str, str]]:
+    """(value, kind, result url) for every entity found in the results."""
+    postings = set()
+    for result in results:
+        url = result.get('link') or ''
+        entities = result.get('entities') or {}
+        for field, kind in INDEXED_KINDS.items():
+            for value in entities.get(field, ()):
+                postings.add((value.strip().lower(), kind, url))
+        for platform, handles in (entities.get('social_handles') or {}).items():
+            for handle in handles:
+                postings.add((handle.strip().lower(), f'handle:{platform}', url))
+    return sorted(postings)
+
+
+def prefix_upper_bound(prefix: str) -> str:
+    """Smallest string greater than every string starting with prefix."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class EntityIndex:
+    """
+    Persistent inverted index from extracted entities to the targets,
+    searches and result URLs they were seen in.
+
+    Every search gets a row of its own. A posting is kept once per (entity,
+    target, URL) and records the first and last search that saw it and how
+    many did, so repeated searches of a target update its postings instead
+    of copying them. Postings are clustered on (value, kind, target), so a
+    point lookup is a single B-tree descent and a prefix lookup is one range
+    scan.
+    """
+
+    def __init__(self, path: str = ''):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            conn = connect_sqlite(self.path or data_path('entity_index.sqlite3'))
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS targets ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, target TEXT NOT NULL, target_type TEXT NOT NULL, "
+                "UNIQUE (target, target_type))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS searches ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, target_id INTEGER NOT NULL, searched REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS searches_target ON searches (target_id)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entity_postings ("
+                "value TEXT NOT NULL, kind TEXT NOT NULL, target_id INTEGER NOT NULL, url TEXT NOT NULL, "
+                "first_search INTEGER NOT NULL, last_search INTEGER NOT NULL, seen INTEGER NOT NULL, "
+                "PRIMARY KEY (value, kind, target_id, url)) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entity_postings_target ON entity_postings (target_id)")
+            self._conn = conn
+        return self._conn
+
+    def _record(self, target: str, target_type: str, postings: List[Tuple[str, str, str]]) -> int:
+        target = target.strip().lower()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT INTO targets (target, target_type) VALUES (?, ?) ON CONFLICT(target, target_type) DO NOTHING",
+                    (target, target_type)
+                )
+                target_id = conn.execute(
+                    "SELECT id FROM targets WHERE target = ? AND target_type = ?", (target, target_type)
+                ).fetchone()[0]
+                search_id = conn.execute(
+                    "INSERT INTO searches (target_id, searched) VALUES (?, ?)", (target_id, time.time())
+                ).lastrowid
+                conn.executemany(
+                    "INSERT INTO entity_postings (value, kind, target_id, url, first_search, last_search, seen) "
+                    "VALUES (?, ?, ?, ?, ?, ?, 1) ON CONFLICT(value, kind, target_id, url) DO UPDATE SET "
+                    "last_search = excluded.last_search, seen = seen + 1",
+                    [(value, kind, target_id, url, search_id, search_id) for value, kind, url in postings]
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return search_id
+
+    async def record(self, target: str, target_type: str, results: List[Dict[str, Any]]) -> int:
+        """Index the entities of one finished search; returns its search id."""
+        return await asyncio.to_thread(self._record, target, target_type, entity_postings(results))
+
+    def lookup(self, value: str, kind: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Targets an entity was seen for, most recently seen first: the first and
+        last search that saw it, how many searches did, and the URLs it was on.
+        """
+        query = (
+            "SELECT p.kind, t.target, t.target_type, MIN(p.first_search), MIN(f.searched), "
+            "MAX(p.last_search), MAX(l.searched), MAX(p.seen), group_concat(NULLIF(p.url, ''), char(10)) "
+            "FROM entity_postings p JOIN targets t ON t.id = p.target_id "
+            "JOIN searches f ON f.id = p.first_search JOIN searches l ON l.id = p.last_search "
+            "WHERE p.value = ?"
+        )
+        params: List[Any] = [value.strip().lower()]
+        if kind:
+            query += " AND p.kind = ?"
+            params.append(kind)
+        query += " GROUP BY p.kind, p.target_id ORDER BY MAX(l.searched) DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._connection().execute(query, params).fetchall()
+        return [
+            {
+                'kind': row_kind, 'target': target, 'target_type': target_type,
+                'first_search': first_search, 'first_seen': first_seen,
+                'last_search': last_search, 'last_seen': last_seen,
+                'searches': seen, 'urls': urls.split('\n') if urls else []
+            }
+            for row_kind, target, target_type, first_search, first_seen, last_search, last_seen, seen, urls in rows
+        ]
+
+    def prefix(self, prefix: str, kind: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Indexed values starting with prefix, with how many targets each was seen for."""
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        query = (
+            "SELECT value, kind, COUNT(DISTINCT target_id) FROM entity_postings "
+            "WHERE value >= ? AND value < ?"
+        )
+        params: List[Any] = [prefix, prefix_upper_bound(prefix)]
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        query += " GROUP BY value, kind ORDER BY value LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._connection().execute(query, params).fetchall()
+        return [{'value': value, 'kind': row_kind, 'targets': count} for value, row_kind, count in rows]
+
+    def related(self, target: str, target_type: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Other targets that share at least one entity with target, most shared first."""
+        query = (
+            "SELECT DISTINCT o.target, o.target_type, p2.kind, p2.value FROM targets t "
+            "JOIN entity_postings p1 ON p1.target_id = t.id "
+            "JOIN entity_postings p2 ON p2.value = p1.value AND p2.kind = p1.kind "
+            "JOIN targets o ON o.id = p2.target_id "
+            "WHERE t.target = ? AND o.target != t.target"
+        )
+        params: List[Any] = [target.strip().lower()]
+        if target_type:
+            query += " AND t.target_type = ?"
+            params.append(target_type)
+        with self._lock:
+            rows = self._connection().execute(query, params).fetchall()
+
+        shared: Dict[Tuple[str, str], set] = {}
+        for other, other_type, kind, value in rows:
+            shared.setdefault((other, other_type), set()).add((kind, value))
+        ranked = sorted(shared.items(), key=lambda item: len(item[1]), reverse=True)[:limit]
+        return [
+            {
+                'target': other,
+                'target_type': other_type,
+                'shared': [{'kind': kind, 'value': value} for kind, value in sorted(entities)]
+            }
+            for (other, other_type), entities in ranked
+        ]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            conn = self._connection()
+            targets = conn.execute("SELECT COUNT(*) FROM targets").fetchone()[0]
+            searches = conn.execute("SELECT COUNT(*) FROM searches").fetchone()[0]
+            postings = conn.execute("SELECT COUNT(*) FROM entity_postings").fetchone()[0]
+        return {'targets': targets, 'searches': searches, 'postings': postings}
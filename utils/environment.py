@@ -0,0 +1,17 @@
+import logging
+from functools import lru_cache
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - [%(name)s] - %(message)s'
+
+
+@lru_cache(maxsize=None)
+def load_environment() -> None:
+    """Read .env into os.environ once, when credentials are first needed rather than at import."""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+
+def configure_logging(level: int = logging.INFO):
+    """Root logging setup; called by entry points (API, CLI), never by library modules."""
+    logging.basicConfig(level=level, format=LOG_FORMAT)
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.entity_extractor import EntityExtractor, entity_scanner
+from utils.workers import get_thread_count
+
+logger = logging.getLogger(__name__)
+
+
+def extract_batch(texts: List[str]) -> List[Dict[str, Any]]:
+    """Run EntityExtractor over a batch of texts (executed in pool workers)."""
+    return [EntityExtractor.extract_all(text) for text in texts]
+
+
+class ExtractionPool:
+    """
+    Batches entity extraction onto a process pool so regex and phonenumbers
+    work never stalls the event loop.
+
+    Batches smaller than inline_threshold run inline, where the IPC round-trip
+    would cost more than the extraction itself.
+    """
+
+    def __init__(self, max_workers: int = 0, inline_threshold: int = 4, batch_size: int = 16):
+        self.max_workers = max_workers or get_thread_count()
+        self.inline_threshold = inline_threshold
+        self.batch_size = batch_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.inline_texts = 0
+        self.pooled_texts = 0
+        self.batches = 0
+        self.inline_seconds = 0.0
+        self.pool_seconds = 0.0
+        self.offloaded_calls = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: forking a process that already runs loop and sqlite threads is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor
+
+    def _extract_inline(self, texts: List[str]) -> List[Dict[str, Any]]:
+        started = time.perf_counter()
+        results = extract_batch(texts)
+        self.inline_seconds += time.perf_counter() - started
+        self.inline_texts += len(texts)
+        return results
+
+    async def extract_many(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Extract entities from every text, preserving order."""
+        # Snippets repeated across dorks are answered from the scanner memo
+        results: List[Optional[Dict[str, Any]]] = [entity_scanner.lookup(text) for text in texts]
+        missing = [i for i, entities in enumerate(results) if entities is None]
+        pending = [texts[i] for i in missing]
+        if len(pending) < self.inline_threshold:
+            extracted = self._extract_inline(pending)
+        else:
+            extracted = await self._extract_pooled(pending)
+            for text, entities in zip(pending, extracted):
+                entity_scanner.store(text, entities)
+
+        for i, entities in zip(missing, extracted):
+            results[i] = entities
+        return results
+
+    async def _extract_pooled(self, texts: List[str]) -> List[Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        chunks = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        started = time.perf_counter()
+        try:
+            executor = self._get_executor()
+            batches = await asyncio.gather(*[
+                loop.run_in_executor(executor, extract_batch, chunk) for chunk in chunks
+            ])
+        except BrokenProcessPool as e:
+            logger.warning(f"Extraction pool broken, falling back to inline extraction: {e}")
+            self._executor = None
+            return self._extract_inline(texts)
+
+        self.pool_seconds += time.perf_counter() - started
+        self.pooled_texts += len(texts)
+        self.batches += len(chunks)
+        return [entities for batch in batches for entities in batch]
+
+    async def extract(self, text: str) -> Dict[str, Any]:
+        return (await self.extract_many([text]))[0]
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Run a picklable CPU-bound function (e.g. HTML parsing) on the pool."""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            result = await loop.run_in_executor(self._get_executor(), fn, *args)
+        except BrokenProcessPool as e:
+            logger.warning(f"Extraction pool broken, running {fn.__name__} inline: {e}")
+            self._executor = None
+            return fn(*args)
+        self.pool_seconds += time.perf_counter() - started
+        self.offloaded_calls += 1
+        return result
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        total_seconds = self.inline_seconds + self.pool_seconds
+        total_texts = self.inline_texts + self.pooled_texts
+        return {
+            'workers': self.max_workers,
+            'inline_texts': self.inline_texts,
+            'pooled_texts': self.pooled_texts,
+            'batches': self.batches,
+            'offloaded_calls': self.offloaded_calls,
+            'inline_seconds': round(self.inline_seconds, 4),
+            'pool_seconds': round(self.pool_seconds, 4),
+            'texts_per_second': round(total_texts / total_seconds, 1) if total_seconds else 0.0,
+            **entity_scanner.stats()
+        }
+
+
+class LoopLagMonitor:
+    """Measures event-loop lag by timing how late a periodic sleep wakes up."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.samples = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            self.samples += 1
+            self.total_lag += lag
+            self.max_lag = max(self.max_lag, lag)
+
+    def ensure_running(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'samples': self.samples,
+            'mean_ms': round(self.total_lag / self.samples * 1000, 2) if self.samples else 0.0,
+            'max_ms': round(self.max_lag * 1000, 2)
+        }
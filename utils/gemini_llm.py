@@ -1,27 +1,31 @@
 import os, logging
-import google.generativeai as genai
-from dotenv import load_dotenv  
+from functools import lru_cache
+
+from utils.environment import load_environment
 
 
 # silence the ALTS noise
 logging.getLogger("absl").setLevel(logging.ERROR)
-# 0.  Config -----------------------------------------------------------------
-load_dotenv()
-# 1.  Key ------------------------------------------------------------------
-GEMINI_KEY = os.getenv("GEMINI_API_KEY", "").strip()
-if not GEMINI_KEY:
-    raise RuntimeError("GEMINI_API_KEY env-var is empty")
 
-genai.configure(api_key=GEMINI_KEY)
-# 3.  Model ----------------------------------------------------------------
-MODEL = genai.GenerativeModel("gemini-2.0-flash")   # or gemini-2.0-flash-exp
+# 1.  Model ----------------------------------------------------------------
+@lru_cache(maxsize=None)
+def get_model():
+    """Configure Gemini on first use, so importing this module needs neither the SDK nor a key."""
+    import google.generativeai as genai
+
+    load_environment()
+    gemini_key = os.getenv("GEMINI_API_KEY", "").strip()
+    if not gemini_key:
+        raise RuntimeError("GEMINI_API_KEY env-var is empty")
+    genai.configure(api_key=gemini_key)
+    return genai.GenerativeModel("gemini-2.0-flash")   # or gemini-2.0-flash-exp
 
-# 4.  Helper ---------------------------------------------------------------
+# 2.  Helper ---------------------------------------------------------------
 def call_gemini(prompt: str) -> str:
     """Call Gemini LLM with a prompt and return the response text."""
 
     try:
-        response = MODEL.generate_content(
+        response = get_model().generate_content(
             prompt,
             generation_config={"temperature": 0.0, "max_output_tokens": 10}
         )
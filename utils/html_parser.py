@@ -0,0 +1,313 @@
+import re
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as FastHTMLParser
+except ImportError:  # optional speed-up: pip install selectolax
+    FastHTMLParser = None
+
+CONTENT_PATTERN = re.compile(r'content|main|article|post', re.I)
+SKIPPED_TEXT_TAGS = {'script', 'style', 'template'}
+
+
+class _StopParsing(Exception):
+    pass
+
+
+class _Capture:
+    """Collects the text of one element while the parser is inside it."""
+
+    def __init__(self, tag: str):
+        self.tag = tag
+        self.depth = 1
+        self.parts: List[str] = []
+        self.length = 0
+
+
+class _PageExtractor(HTMLParser):
+    """
+    Targeted single pass over a page: keeps meta tags, the title, the first
+    hrefs and the text of the main-content candidates without building a tree.
+    """
+
+    def __init__(self, max_content: int, max_links: int):
+        super().__init__(convert_charrefs=True)
+        self.max_content = max_content
+        self.max_links = max_links
+        self.meta: Dict[str, str] = {}
+        self.links: List[str] = []
+        self.title: Optional[List[str]] = None
+        self.in_title = False
+        self.skip_depth = 0
+        self.full_text: List[str] = []
+        self.full_length = 0
+        # Same precedence as the article / div.class / div#id selectors
+        self.candidates: Dict[str, Optional[_Capture]] = {'article': None, 'class': None, 'id': None}
+        self.active: List[_Capture] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TEXT_TAGS:
+            self.skip_depth += 1
+            return
+        attributes = dict(attrs)
+        if tag == 'meta':
+            name = attributes.get('name') or attributes.get('property')
+            content = attributes.get('content')
+            if name and content:
+                self.meta[name] = content
+        elif tag == 'a' and 'href' in attributes and len(self.links) < self.max_links:
+            self.links.append(attributes['href'])
+        elif tag == 'title' and self.title is None:
+            self.title = []
+            self.in_title = True
+
+        for capture in self.active:
+            if capture.tag == tag:
+                capture.depth += 1
+
+        if tag == 'article' and self.candidates['article'] is None:
+            self._start_capture('article', tag)
+        elif tag == 'div':
+            if self.candidates['class'] is None and CONTENT_PATTERN.search(attributes.get('class') or ''):
+                self._start_capture('class', tag)
+            if self.candidates['id'] is None and CONTENT_PATTERN.search(attributes.get('id') or ''):
+                self._start_capture('id', tag)
+
+    def handle_startendtag(self, tag, attrs):
+        # <div/> and friends never contain text
+        if tag in ('meta', 'a'):
+            self.handle_starttag(tag, attrs)
+
+    def _start_capture(self, slot: str, tag: str):
+        capture = _Capture(tag)
+        self.candidates[slot] = capture
+        self.active.append(capture)
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TEXT_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+            return
+        if tag == 'title':
+            self.in_title = False
+        for capture in list(self.active):
+            if capture.tag == tag:
+                capture.depth -= 1
+                if capture.depth == 0:
+                    self.active.remove(capture)
+
+    def handle_data(self, data):
+        if self.skip_depth:
+            return
+        if self.in_title:
+            self.title.append(data)
+        text = data.strip()
+        if not text:
+            return
+        if self.full_length <= self.max_content:
+            self.full_text.append(text)
+            self.full_length += len(text) + 1
+        for capture in self.active:
+            if capture.length <= self.max_content:
+                capture.parts.append(text)
+                capture.length += len(text) + 1
+
+    def main_content(self) -> str:
+        # The first selector that matches wins, even when its text is empty
+        for slot in ('article', 'class', 'id'):
+            capture = self.candidates[slot]
+            if capture is not None:
+                content = ' '.join(capture.parts)
+                if content:
+                    return content
+                break
+        return ' '.join(self.full_text)
+
+
+def _parse_page_targeted(html: str, url: str, max_content: int, max_links: int) -> Dict[str, Any]:
+    extractor = _PageExtractor(max_content, max_links)
+    extractor.feed(html)
+    extractor.close()
+    return {
+        'url': url,
+        'title': ''.join(extractor.title) if extractor.title else '',
+        'meta': extractor.meta,
+        'content': extractor.main_content()[:max_content],
+        'links': extractor.links
+    }
+
+
+def _parse_page_fast(html: str, url: str, max_content: int, max_links: int) -> Dict[str, Any]:
+    tree = FastHTMLParser(html)
+    tree.strip_tags(list(SKIPPED_TEXT_TAGS))
+
+    meta_data = {}
+    for meta in tree.css('meta'):
+        name = meta.attributes.get('name') or meta.attributes.get('property')
+        content = meta.attributes.get('content')
+        if name and content:
+            meta_data[name] = content
+
+    element = tree.css_first('article')
+    if element is None:
+        element = next((div for div in tree.css('div[class]') if CONTENT_PATTERN.search(div.attributes.get('class') or '')), None)
+    if element is None:
+        element = next((div for div in tree.css('div[id]') if CONTENT_PATTERN.search(div.attributes.get('id') or '')), None)
+    main_content = element.text(separator=' ', strip=True) if element is not None else ''
+    if not main_content:
+        root = tree.root
+        main_content = root.text(separator=' ', strip=True) if root is not None else ''
+
+    title = tree.css_first('title')
+    links = []
+    for a in tree.css('a[href]'):
+        if len(links) >= max_links:
+            break
+        links.append(a.attributes.get('href'))
+    return {
+        'url': url,
+        'title': title.text() if title is not None else '',
+        'meta': meta_data,
+        'content': main_content[:max_content],
+        'links': links
+    }
+
+
+def parse_page(html: str, url: str, max_content: int = 2000, max_links: int = 50) -> Dict[str, Any]:
+    """
+    Pull meta tags, title, main content and links out of a page.
+
+    Uses selectolax when it is installed, otherwise a targeted streaming pass
+    over the stdlib HTMLParser.
+    """
+    if FastHTMLParser is not None:
+        return _parse_page_fast(html, url, max_content, max_links)
+    return _parse_page_targeted(html, url, max_content, max_links)
+
+
+def parse_page_soup(html: str, url: str, max_content: int = 2000, max_links: int = 50) -> Dict[str, Any]:
+    """Reference implementation that builds a full BeautifulSoup tree."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Extract meta information
+    meta_data = {}
+    for meta in soup.find_all('meta'):
+        name = meta.get('name') or meta.get('property')
+        content = meta.get('content')
+        if name and content:
+            meta_data[name] = content
+
+    # Extract main content
+    content_selectors = [
+        ('article', {}),
+        ('div', {'class': CONTENT_PATTERN}),
+        ('div', {'id': CONTENT_PATTERN}),
+    ]
+
+    main_content = ''
+    for tag, attrs in content_selectors:
+        element = soup.find(tag, attrs)
+        if element:
+            main_content = element.get_text(separator=' ', strip=True)
+            break
+
+    if not main_content:
+        main_content = soup.get_text(separator=' ', strip=True)
+
+    return {
+        'url': url,
+        'title': soup.title.string if soup.title else '',
+        'meta': meta_data,
+        'content': main_content[:max_content],  # Limit content size
+        'links': [a.get('href') for a in soup.find_all('a', href=True)][:max_links]
+    }
+
+
+class _AhmiaExtractor(HTMLParser):
+    """Streams <li class="result"> entries and stops once max_results are read."""
+
+    def __init__(self, max_results: int):
+        super().__init__(convert_charrefs=True)
+        self.max_results = max_results
+        self.results: List[Dict[str, Any]] = []
+        self.current: Optional[Dict[str, Any]] = None
+        self.li_depth = 0
+        self.reading: Optional[str] = None  # 'a' or 'p' while inside the first one
+        self.reading_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if self.current is None:
+            if tag == 'li' and 'result' in (dict(attrs).get('class') or '').split():
+                self.current = {'link': None, 'title': [], 'snippet': [], 'seen': set()}
+                self.li_depth = 1
+            return
+        if tag == 'li':
+            self.li_depth += 1
+        if self.reading == tag:
+            self.reading_depth += 1
+        elif self.reading is None and tag in ('a', 'p') and tag not in self.current['seen']:
+            self.current['seen'].add(tag)
+            self.reading = tag
+            self.reading_depth = 1
+            if tag == 'a':
+                self.current['link'] = dict(attrs).get('href')
+
+    def handle_endtag(self, tag):
+        if self.current is None:
+            return
+        if self.reading == tag:
+            self.reading_depth -= 1
+            if self.reading_depth == 0:
+                self.reading = None
+        if tag == 'li':
+            self.li_depth -= 1
+            if self.li_depth == 0:
+                self._finish()
+
+    def handle_data(self, data):
+        if self.current is not None and self.reading is not None:
+            text = data.strip()
+            if text:
+                self.current['title' if self.reading == 'a' else 'snippet'].append(text)
+
+    def _finish(self):
+        current, self.current = self.current, None
+        self.reading = None
+        if 'a' not in current['seen']:
+            return
+        self.results.append({
+            'title': ''.join(current['title']),
+            'link': current['link'],
+            'snippet': ''.join(current['snippet'])
+        })
+        if len(self.results) >= self.max_results:
+            raise _StopParsing()
+
+
+def parse_ahmia_results(html: str, max_results: int = 10) -> List[Dict[str, Any]]:
+    """Extract title, link and snippet from Ahmia's result list."""
+    if FastHTMLParser is not None:
+        results = []
+        for result in FastHTMLParser(html).css('li.result'):
+            if len(results) >= max_results:
+                break
+            link_tag = result.css_first('a')
+            if link_tag is None:
+                continue
+            snippet_tag = result.css_first('p')
+            results.append({
+                'title': link_tag.text(separator='', strip=True),
+                'link': link_tag.attributes.get('href'),
+                'snippet': snippet_tag.text(separator='', strip=True) if snippet_tag is not None else ''
+            })
+        return results
+
+    extractor = _AhmiaExtractor(max_results)
+    try:
+        extractor.feed(html)
+        extractor.close()
+    except _StopParsing:
+        pass
+    return extractor.results
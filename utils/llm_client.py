@@ -0,0 +1,274 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.search_cache import CacheBackend, create_cache
+from utils.environment import load_environment
+from utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+BATCH_INSTRUCTION = (
+    "Answer each numbered item below independently. Reply with one line per item, "
+    "formatted exactly as \"<number>: <answer>\", and nothing else."
+)
+BATCH_LINE = re.compile(r'^\s*(\d+)\s*[:.)]\s*(.*?)\s*$')
+
+
+class LLMError(Exception):
+    pass
+
+
+class LLMConfigError(LLMError):
+    """The backend cannot be used as configured (missing key or package); retrying won't help."""
+
+
+def item_prompt(instruction: str, item: str) -> str:
+    """The prompt for one item of an instruction, shared by single and batched calls so they share cache entries."""
+    return f"{instruction}\n\n{item}"
+
+
+class LLMBackend(ABC):
+    """A model that turns a prompt and generation config into text."""
+
+    model = 'unknown'
+
+    @abstractmethod
+    async def generate(self, prompt: str, generation_config: Dict[str, Any]) -> str:
+        ...
+
+
+class GeminiBackend(LLMBackend):
+    """google.generativeai, configured on first use so importing needs no API key."""
+
+    def __init__(self, model: str = 'gemini-2.0-flash', api_key: str = ''):
+        self.model = model
+        self.api_key = api_key
+        self._model = None
+
+    def _client(self):
+        if self._model is None:
+            try:
+                import google.generativeai as genai
+            except ImportError:
+                raise LLMConfigError("The gemini backend needs google-generativeai: pip install google-generativeai")
+
+            load_environment()
+            api_key = self.api_key or os.getenv('GEMINI_API_KEY', '').strip()
+            if not api_key:
+                raise LLMConfigError("GEMINI_API_KEY env-var is empty")
+            genai.configure(api_key=api_key)
+            self._model = genai.GenerativeModel(self.model)
+        return self._model
+
+    async def generate(self, prompt: str, generation_config: Dict[str, Any]) -> str:
+        response = await self._client().generate_content_async(prompt, generation_config=generation_config)
+        return response.text
+
+
+class StubBackend(LLMBackend):
+    """
+    Offline backend for tests and benchmarks: answers with responder(prompt)
+    after an optional fake latency. The default responder answers 'other'
+    to every item of a batch prompt and to single prompts.
+    """
+
+    model = 'stub'
+
+    def __init__(self, responder: Optional[Callable[[str], str]] = None, latency: float = 0.0):
+        self.responder = responder or self.default_responder
+        self.latency = latency
+        self.calls = 0
+        self.prompts: List[str] = []
+
+    @staticmethod
+    def default_responder(prompt: str) -> str:
+        if BATCH_INSTRUCTION in prompt:
+            items = prompt.split(BATCH_INSTRUCTION, 1)[1]
+            return '\n'.join(f"{match.group(1)}: other" for match in map(BATCH_LINE.match, items.splitlines()) if match)
+        return 'other'
+
+    async def generate(self, prompt: str, generation_config: Dict[str, Any]) -> str:
+        self.calls += 1
+        self.prompts.append(prompt)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.responder(prompt)
+
+
+class LLMClient:
+    """
+    Async LLM access shared by every caller.
+
+    Responses are cached persistently under a hash of model, generation
+    config and prompt; identical prompts already in flight share one call;
+    at most max_concurrency calls run at once and failures other than
+    configuration errors are retried with exponential backoff.
+    """
+
+    def __init__(self, backend: LLMBackend, cache: Optional[CacheBackend] = None, max_concurrency: int = 4,
+                 retry_attempts: int = 3, retry_delay: float = 1.0, max_batch: int = 20):
+        self.backend = backend
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.retry_attempts = retry_attempts
+        self.retry_delay = retry_delay
+        self.max_batch = max_batch
+        self.flight = SingleFlight()
+        self.requests = 0
+        self.cache_hits = 0
+        self.backend_calls = 0
+        self.batched_items = 0
+        self.retries = 0
+        self.errors = 0
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # A semaphore binds to the loop that first waits on it; each asyncio.run (clean_deep_search) gets its own
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    def cache_key(self, prompt: str, generation_config: Dict[str, Any]) -> str:
+        payload = json.dumps([self.backend.model, generation_config, prompt], sort_keys=True, ensure_ascii=False)
+        return f"llm_{hashlib.sha256(payload.encode()).hexdigest()}"
+
+    async def _call_backend(self, prompt: str, generation_config: Dict[str, Any]) -> str:
+        for attempt in range(self.retry_attempts):
+            try:
+                async with self.semaphore:
+                    self.backend_calls += 1
+                    return (await self.backend.generate(prompt, generation_config)).strip()
+            except LLMConfigError:
+                self.errors += 1
+                raise
+            except Exception as e:
+                if attempt == self.retry_attempts - 1:
+                    self.errors += 1
+                    raise LLMError(f"{self.backend.model}: {e}") from e
+                self.retries += 1
+                delay = self.retry_delay * (2 ** attempt)
+                logger.warning(f"LLM call failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def generate(self, prompt: str, temperature: float = 0.0, max_output_tokens: int = 1024) -> str:
+        """Text for prompt; raises LLMError once retries are exhausted."""
+        self.requests += 1
+        return await self._generate(prompt, {'temperature': temperature, 'max_output_tokens': max_output_tokens})
+
+    async def generate_item(self, instruction: str, item: str, temperature: float = 0.0,
+                            max_output_tokens: int = 10) -> str:
+        """generate() for one item of an instruction; shares its cache entries with generate_many()."""
+        return await self.generate(item_prompt(instruction, item), temperature, max_output_tokens)
+
+    async def _generate(self, prompt: str, generation_config: Dict[str, Any]) -> str:
+        key = self.cache_key(prompt, generation_config)
+        if self.cache is not None:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                self.cache_hits += 1
+                return cached
+
+        async def call():
+            text = await self._call_backend(prompt, generation_config)
+            if self.cache is not None:
+                await self.cache.set(key, text)
+            return text
+
+        return await self.flight.do(key, call)
+
+    async def generate_many(self, instruction: str, items: List[str], temperature: float = 0.0,
+                            max_output_tokens_per_item: int = 10) -> List[str]:
+        """
+        One short answer per item for an instruction that applies to each item
+        on its own (classification, extraction of one field...).
+
+        Answers are cached per item; uncached items are sent max_batch at a
+        time as one numbered prompt. Items the model skips in its reply are
+        asked again one by one; an item that still fails gets "error:<reason>".
+        """
+        answers: Dict[str, str] = {}
+        single_config = {'temperature': temperature, 'max_output_tokens': max_output_tokens_per_item}
+        pending = []
+        for item in dict.fromkeys(items):  # Repeated items are asked once
+            cached = await self.cache.get(self.cache_key(item_prompt(instruction, item), single_config)) if self.cache else None
+            if cached is not None:
+                answers[item] = cached
+            else:
+                pending.append(item)
+        self.requests += len(items)
+        self.cache_hits += len(items) - len(pending)
+
+        async def run_batch(batch: List[str]):
+            numbered = '\n'.join(f"{n}: {item}" for n, item in enumerate(batch, 1))
+            config = {'temperature': temperature, 'max_output_tokens': max_output_tokens_per_item * len(batch) + 16}
+            try:
+                reply = await self._call_backend(item_prompt(instruction, f"{BATCH_INSTRUCTION}\n\n{numbered}"), config)
+            except LLMConfigError as e:
+                # Single prompts would fail the same way
+                answers.update((item, f"error:{e}") for item in batch)
+                return
+            except LLMError as e:
+                logger.error(f"Batched LLM call failed, falling back to single prompts: {e}")
+                reply = ''
+            parsed = {}
+            for match in map(BATCH_LINE.match, reply.splitlines()):
+                if match and 1 <= int(match.group(1)) <= len(batch):
+                    parsed[int(match.group(1))] = match.group(2)
+            self.batched_items += len(parsed)
+            for n, item in enumerate(batch, 1):
+                prompt = item_prompt(instruction, item)
+                if n in parsed:
+                    answers[item] = parsed[n]
+                    if self.cache is not None:
+                        await self.cache.set(self.cache_key(prompt, single_config), parsed[n])
+                    continue
+                try:
+                    answers[item] = await self._generate(prompt, single_config)
+                except LLMError as e:
+                    answers[item] = f"error:{e}"
+
+        batches = [pending[start:start + self.max_batch] for start in range(0, len(pending), self.max_batch)]
+        await asyncio.gather(*(run_batch(batch) for batch in batches))
+        return [answers[item] for item in items]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'backend': self.backend.model,
+            'requests': self.requests,
+            'cache_hits': self.cache_hits,
+            'backend_calls': self.backend_calls,
+            'batched_items': self.batched_items,
+            'coalesced': self.flight.stats()['coalesced'],
+            'retries': self.retries,
+            'errors': self.errors
+        }
+
+
+def create_llm_client(backend: str = '', **kwargs) -> LLMClient:
+    """
+    Build the client named by backend or ECHOFORGE_LLM_BACKEND: 'gemini'
+    (default) or 'stub'. Responses are cached in .echoforge/llm_cache.sqlite3
+    for a week.
+    """
+    backend = backend or os.getenv('ECHOFORGE_LLM_BACKEND', 'gemini')
+    if backend == 'gemini':
+        llm_backend = GeminiBackend(os.getenv('ECHOFORGE_LLM_MODEL', 'gemini-2.0-flash'))
+    elif backend == 'stub':
+        llm_backend = StubBackend()
+    else:
+        raise ValueError(f"Unknown LLM backend '{backend}'. Must be one of: ['gemini', 'stub']")
+    cache = create_cache('sqlite', 7 * 24 * 3600, filename='llm_cache.sqlite3')
+    return LLMClient(llm_backend, cache, **kwargs)
+
+
+llm_client = create_llm_client()
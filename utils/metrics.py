@@ -0,0 +1,217 @@
+import bisect
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Prometheus' default latency buckets, stretched to cover whole searches
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric(ABC):
+    kind = 'untyped'
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        """(name suffix, rendered labels, value) for every series."""
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(f'{self.name}{suffix}{labels} {_format_value(value)}' for suffix, labels, value in self.samples())
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self.values.items())
+        for key, value in items:
+            yield '', _labels(self.labelnames, key), value
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self.values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class CallbackMetric(Metric):
+    """Series read from existing stats at scrape time: callback() -> {label values: value}."""
+
+    def __init__(self, name: str, help_text: str, callback: Callable[[], Dict[LabelValues, float]],
+                 labelnames: Sequence[str] = (), kind: str = 'gauge'):
+        super().__init__(name, help_text, labelnames)
+        self.callback = callback
+        self.kind = kind
+
+    def samples(self):
+        for key, value in sorted(self.callback().items()):
+            yield '', _labels(self.labelnames, key), value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.series: Dict[LabelValues, List[float]] = {}  # bucket counts..., +Inf count, sum
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self.series.items())
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (math.inf,), series[:-1]):
+                cumulative += count
+                yield '_bucket', _labels(self.labelnames, key, f'le="{_format_value(bound)}"'), cumulative
+            yield '_count', _labels(self.labelnames, key), cumulative
+            yield '_sum', _labels(self.labelnames, key), series[-1]
+
+
+class MetricsRegistry:
+    """The process' metrics, rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric '{metric.name}' is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def callback(self, name: str, help_text: str, callback: Callable[[], Dict[LabelValues, float]],
+                 labelnames: Sequence[str] = (), kind: str = 'gauge') -> CallbackMetric:
+        return self.register(CallbackMetric(name, help_text, callback, labelnames, kind))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+stage_seconds = registry.histogram(
+    'echoforge_stage_duration_seconds', 'Time spent in each search pipeline stage.', ['stage']
+)
+
+
+class SearchTimings:
+    """
+    Per-stage time of one search. Stages of concurrent dorks overlap, so
+    their totals can add up to more than the search's wall time.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, List[float]] = {}  # stage -> [count, total, max]
+
+    def record(self, stage: str, seconds: float):
+        entry = self.stages.get(stage)
+        if entry is None:
+            self.stages[stage] = [1, seconds, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'wall_ms': round((time.perf_counter() - self.started) * 1000, 1),
+            'stages': {
+                stage: {'count': int(count), 'total_ms': round(total * 1000, 1), 'max_ms': round(longest * 1000, 1)}
+                for stage, (count, total, longest) in self.stages.items()
+            }
+        }
+
+
+# Timings of the search running in the current task, when the caller asked for them
+search_timings: ContextVar[Optional[SearchTimings]] = ContextVar('search_timings', default=None)
+
+
+def record_stage(stage: str, seconds: float):
+    stage_seconds.observe(seconds, stage=stage)
+    timings = search_timings.get()
+    if timings is not None:
+        timings.record(stage, seconds)
+
+
+@contextmanager
+def timed(stage: str):
+    """Time the enclosed block (awaits included) as one run of stage."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Token bucket whose refill rate adapts with AIMD.
+
+    Successful calls grow the rate additively back towards max_rate; a 429
+    multiplies it by decrease_factor and drains the burst allowance.
+    """
+
+    def __init__(self, rate: float, burst: int, min_rate: float = 0.1,
+                 increase: float = 0.1, decrease_factor: float = 0.5):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.min_rate = min(min_rate, rate)
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+        self.acquired = 0
+        self.throttled = 0
+        self.waited = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> float:
+        """Wait for a token and return the time spent waiting."""
+        waited = 0.0
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    break
+                delay = (1 - self.tokens) / self.rate
+                waited += delay
+                await asyncio.sleep(delay)
+        self.acquired += 1
+        self.waited += waited
+        return waited
+
+    def on_success(self):
+        self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self):
+        self._refill()
+        self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+        self.tokens = min(self.tokens, 0.0)
+        self.throttled += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'rate': round(self.rate, 3),
+            'max_rate': self.max_rate,
+            'burst': self.burst,
+            'acquired': self.acquired,
+            'throttled': self.throttled,
+            'wait_seconds': round(self.waited, 3)
+        }
+
+
+class HostRateLimiter:
+    """
+    Keeps one TokenBucket per upstream host.
+
+    Configured hosts keep their bucket for the life of the process. Every
+    other host (pages the scraper browses) gets a default-limit bucket that
+    is dropped once idle for idle_ttl seconds, or least recently used first
+    beyond max_hosts, so a long-running API does not grow without bound.
+    """
+
+    def __init__(self, host_limits: Dict[str, Dict[str, float]], default_limit: Dict[str, float],
+                 min_rate: float = 0.1, increase: float = 0.1, decrease_factor: float = 0.5,
+                 idle_ttl: float = 300.0, max_hosts: int = 1024):
+        self.host_limits = host_limits
+        self.default_limit = default_limit
+        self.min_rate = min_rate
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.idle_ttl = idle_ttl
+        self.max_hosts = max_hosts
+        self.buckets: Dict[str, TokenBucket] = {}  # Configured hosts
+        self.other_buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()  # Least recently used first
+        self.evicted = 0
+        self.evicted_throttled = 0  # 429s counted by buckets since dropped, so totals never go down
+
+    @staticmethod
+    def host_of(url_or_host: str) -> str:
+        if '://' in url_or_host:
+            return (urlparse(url_or_host).hostname or '').lower()
+        return url_or_host.lower()
+
+    def _new_bucket(self, limit: Dict[str, float]) -> TokenBucket:
+        return TokenBucket(
+            limit['rate'], int(limit['burst']),
+            min_rate=self.min_rate, increase=self.increase, decrease_factor=self.decrease_factor
+        )
+
+    def bucket(self, url_or_host: str) -> TokenBucket:
+        host = self.host_of(url_or_host)
+        if host in self.host_limits:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = self.buckets[host] = self._new_bucket(self.host_limits[host])
+            return bucket
+
+        bucket = self.other_buckets.get(host)
+        if bucket is None:
+            bucket = self.other_buckets[host] = self._new_bucket(self.default_limit)
+        self.other_buckets.move_to_end(host)
+        self._evict(host)
+        return bucket
+
+    def _evict(self, current: str):
+        """Drop idle buckets from the least recently used end; never one a caller is waiting on."""
+        now = time.monotonic()
+        while len(self.other_buckets) > 1:
+            host, bucket = next(iter(self.other_buckets.items()))
+            if host == current or bucket.lock.locked():
+                break
+            if len(self.other_buckets) <= self.max_hosts and now - bucket.updated < self.idle_ttl:
+                break
+            del self.other_buckets[host]
+            self.evicted += 1
+            self.evicted_throttled += bucket.throttled
+
+    def clear(self):
+        self.buckets.clear()
+        self.other_buckets.clear()
+
+    async def acquire(self, url_or_host: str) -> float:
+        return await self.bucket(url_or_host).acquire()
+
+    def on_success(self, url_or_host: str):
+        self.bucket(url_or_host).on_success()
+
+    def on_throttle(self, url_or_host: str):
+        bucket = self.bucket(url_or_host)
+        bucket.on_throttle()
+        logger.warning(f"Throttled by {self.host_of(url_or_host)}, rate lowered to {bucket.rate:.2f} req/s")
+
+    def observe(self, url_or_host: str, status: Optional[int]):
+        """Feed an upstream response status into the AIMD controller."""
+        if status == 429:
+            self.on_throttle(url_or_host)
+        elif status is not None and status < 400:
+            self.on_success(url_or_host)
+
+    def is_configured(self, url_or_host: str) -> bool:
+        return self.host_of(url_or_host) in self.host_limits
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {host: bucket.stats() for host, bucket in {**self.buckets, **self.other_buckets}.items()}
@@ -2,38 +2,191 @@
 
 import hashlib
 import logging
-from typing import List, Dict, Any, Set
+import re
+import struct
+from collections import defaultdict
+from functools import lru_cache
+from typing import List, Dict, Any, Set, FrozenSet, Optional, Tuple
+from urllib.parse import urlsplit, parse_qsl, urlencode
 
-# Configure logger
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Host prefixes that serve the same page as the bare domain
+MIRROR_HOST_PREFIXES = ('www.', 'm.', 'mobile.', 'amp.')
+
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid', '_hsenc', '_hsmi',
+    'ref', 'ref_src', 'ref_url', 'si', 'spm', 'trk', 'trackingid', 'originalsubdomain', 'feature'
+}
+
+WORD_PATTERN = re.compile(r'\w+')
+
+
+@lru_cache(maxsize=65536)
+def token_hashes(token: str, count: int) -> Tuple[int, ...]:
+    """count independent 32-bit hashes of one token, cut from a single SHAKE digest."""
+    return struct.unpack(f'<{count}I', hashlib.shake_128(token.encode()).digest(4 * count))
+
+
+def canonicalize_url(url: Optional[str]) -> str:
+    """
+    Reduce a URL to a key shared by its trivial variants: scheme, www./m.
+    hosts, default ports, tracking parameters, parameter order, fragments
+    and trailing slashes are ignored. A missing URL gives ''.
+    """
+    if not url:
+        return ''
+    try:
+        parts = urlsplit(url.strip() if '//' in url else f'//{url.strip()}')
+        host = (parts.hostname or '').lower().rstrip('.')
+        port = parts.port
+    except ValueError:
+        return url.strip().lower()
+    for prefix in MIRROR_HOST_PREFIXES:
+        if host.startswith(prefix) and host.count('.') > 1:
+            host = host[len(prefix):]
+            break
+    if port and port not in (80, 443):
+        host = f'{host}:{port}'
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS
+    )
+    path = parts.path.rstrip('/')
+    return f"{host}{path}?{urlencode(query)}" if query else f"{host}{path}"
+
+
+class MinHashLSH:
+    """
+    Incremental near-duplicate index over word sets.
+
+    Each set gets num_perm min-hashes, split into bands of rows; sets sharing
+    any whole band become candidates and are confirmed by exact Jaccard
+    similarity. Bands and rows are picked so pairs above threshold almost
+    always share a band while dissimilar pairs rarely do, which keeps
+    lookups close to constant time as the index grows. Missed duplicates
+    cost more than extra candidates (those are verified anyway), so false
+    negatives are weighted higher when picking them.
+    """
+
+    def __init__(self, threshold: float = 0.7, num_perm: int = 64, false_negative_weight: float = 0.7):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = self.optimal_bands(threshold, num_perm, false_negative_weight)
+        self.buckets: List[Dict[Tuple[int, ...], List[int]]] = [defaultdict(list) for _ in range(self.bands)]
+        self.sets: List[FrozenSet[str]] = []
+        self.candidates_checked = 0
+
+    @staticmethod
+    def optimal_bands(threshold: float, num_perm: int, false_negative_weight: float = 0.5) -> Tuple[int, int]:
+        """(bands, rows) minimising the weighted false positive and false negative areas of the S-curve."""
+        def probability(similarity, bands, rows):
+            return 1 - (1 - similarity ** rows) ** bands
+
+        def area(fn, low, high, steps=100):
+            width = (high - low) / steps
+            return sum(fn(low + (i + 0.5) * width) for i in range(steps)) * width
+
+        best, best_error = (1, num_perm), float('inf')
+        for bands in range(1, num_perm + 1):
+            rows = num_perm // bands
+            false_positive = area(lambda s: probability(s, bands, rows), 0.0, threshold)
+            false_negative = area(lambda s: 1 - probability(s, bands, rows), threshold, 1.0)
+            error = (1 - false_negative_weight) * false_positive + false_negative_weight * false_negative
+            if error < best_error:
+                best, best_error = (bands, rows), error
+        return best
+
+    def signature(self, tokens: FrozenSet[str]) -> List[int]:
+        # Column-wise minimum over the tokens' hash rows; zip and map keep the loop in C
+        return list(map(min, zip(*(token_hashes(token, self.num_perm) for token in tokens))))
+
+    def _band_keys(self, signature: List[int]):
+        for band in range(self.bands):
+            yield band, tuple(signature[band * self.rows:(band + 1) * self.rows])
+
+    def query(self, tokens: FrozenSet[str], signature: Optional[List[int]] = None) -> Optional[int]:
+        """Index of an indexed set at least threshold-similar to tokens, if any."""
+        signature = signature or self.signature(tokens)
+        seen = set()
+        for band, key in self._band_keys(signature):
+            for index in self.buckets[band].get(key, ()):
+                if index in seen:
+                    continue
+                seen.add(index)
+                self.candidates_checked += 1
+                other = self.sets[index]
+                if len(tokens & other) / len(tokens | other) >= self.threshold:
+                    return index
+        return None
+
+    def add(self, tokens: FrozenSet[str], signature: Optional[List[int]] = None) -> int:
+        signature = signature or self.signature(tokens)
+        index = len(self.sets)
+        self.sets.append(tokens)
+        for band, key in self._band_keys(signature):
+            self.buckets[band][key].append(index)
+        return index
+
+    def __len__(self):
+        return len(self.sets)
+
+
 class ResultDeduplicator:
-    def __init__(self):
+    """
+    Drops results whose canonical URL, exact snippet or near-identical
+    snippet was already seen. Works incrementally, one result at a time.
+
+    similarity_threshold is the word-set Jaccard similarity above which two
+    snippets count as the same; 0 disables near-duplicate detection. Snippets
+    with fewer than min_words distinct words are only compared exactly.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.7, min_words: int = 6):
         self.seen_hashes: Set[str] = set()
         self.seen_urls: Set[str] = set()
-    
+        self.min_words = min_words
+        self.index = MinHashLSH(similarity_threshold) if similarity_threshold > 0 else None
+        self.url_duplicates = 0
+        self.exact_duplicates = 0
+        self.near_duplicates = 0
+
     def _hash_content(self, content: str) -> str:
         return hashlib.md5(content.lower().strip().encode()).hexdigest()
-    
+
     def is_duplicate(self, result: Dict[str, Any]) -> bool:
-        url = result.get('link', '')
-        snippet = result.get('snippet', '')
-        
-        # Check URL
-        if url in self.seen_urls:
+        url = canonicalize_url(result.get('link') or '')
+        snippet = result.get('snippet') or ''
+
+        # Check URL; results without one (some Ahmia rows) are compared by content only
+        if url and url in self.seen_urls:
+            self.url_duplicates += 1
             return True
-        
+
         # Check content hash
         content_hash = self._hash_content(snippet)
         if content_hash in self.seen_hashes:
+            self.exact_duplicates += 1
             return True
-        
+
+        # Check near-duplicate snippets
+        words = frozenset(WORD_PATTERN.findall(snippet.lower()))
+        near_duplicate = self.index is not None and len(words) >= self.min_words
+        if near_duplicate:
+            signature = self.index.signature(words)
+            if self.index.query(words, signature) is not None:
+                self.near_duplicates += 1
+                return True
+
         # Add to seen
-        self.seen_urls.add(url)
+        if url:
+            self.seen_urls.add(url)
         self.seen_hashes.add(content_hash)
+        if near_duplicate:
+            self.index.add(words, signature)
         return False
-    
+
     def deduplicate(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         unique_results = []
         for result in results:
@@ -42,3 +195,11 @@ class ResultDeduplicator:
         logger.info(f"Deduplicated: {len(results)} -> {len(unique_results)}")
         return unique_results
 
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'url_duplicates': self.url_duplicates,
+            'exact_duplicates': self.exact_duplicates,
+            'near_duplicates': self.near_duplicates,
+            'indexed_snippets': len(self.index) if self.index is not None else 0,
+            'lsh_candidates_checked': self.index.candidates_checked if self.index is not None else 0
+        }
@@ -0,0 +1,187 @@
+import asyncio
+import base64
+import binascii
+import json
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from utils.storage import connect_sqlite, data_path
+
+try:
+    import orjson
+except ImportError:  # optional faster encoder: pip install orjson
+    orjson = None
+
+
+def dumps(data: Any) -> bytes:
+    """UTF-8 JSON, through orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def loads(data: bytes) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def slim_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """A result without its CSE pagemap and with only the entity kinds that were found."""
+    slim = {key: value for key, value in result.items() if key != 'pagemap'}
+    entities = result.get('entities')
+    if entities is not None:
+        slim['entities'] = {kind: values for kind, values in entities.items() if values}
+    return slim
+
+
+def shape_results(results: List[Dict[str, Any]], compact: bool = False,
+                  fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    """Apply slim mode, then keep only the requested fields (unknown fields are ignored)."""
+    if compact:
+        results = [slim_result(result) for result in results]
+    if fields:
+        results = [{field: result[field] for field in fields if field in result} for result in results]
+    return results
+
+
+def shape_response(response: Dict[str, Any], compact: bool = False,
+                   fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    deep_search response with its result lists shaped. Compact mode also
+    drops top_results, which repeats the head of all_results.
+    """
+    if not compact and not fields:
+        return response
+    shaped = dict(response)
+    if compact:
+        shaped.pop('top_results', None)
+    elif 'top_results' in shaped:
+        shaped['top_results'] = shape_results(shaped['top_results'], compact, fields)
+    if 'all_results' in shaped:
+        shaped['all_results'] = shape_results(shaped['all_results'], compact, fields)
+    return shaped
+
+
+def encode_cursor(search_id: str, offset: int) -> str:
+    return base64.urlsafe_b64encode(f"{search_id}:{offset}".encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """(search id, offset); ValueError for anything that is not a cursor we issued."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        search_id, offset = raw.rsplit(':', 1)
+        if int(offset) < 0:
+            raise ValueError(offset)
+        return search_id, int(offset)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError(f"Invalid cursor '{cursor}'")
+
+
+class ResultPages:
+    """
+    Ranked results of recent searches, kept in the shared data directory so
+    clients can page through them with opaque cursors instead of receiving
+    them all at once, whichever worker process serves the follow-up. The
+    oldest searches are evicted beyond max_searches, and any search after
+    ttl seconds.
+    """
+
+    def __init__(self, path: str = '', max_searches: int = 256, ttl: float = 1800):
+        self.path = path
+        self.max_searches = max_searches
+        self.ttl = ttl
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            conn = connect_sqlite(self.path or data_path('result_pages.sqlite3'))
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS searches ("
+                "search_id TEXT PRIMARY KEY, stored REAL NOT NULL, total INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS searches_stored ON searches (stored)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "search_id TEXT NOT NULL, position INTEGER NOT NULL, result BLOB NOT NULL, "
+                "PRIMARY KEY (search_id, position)) WITHOUT ROWID"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _expire(self, conn, now: float):
+        expired = conn.execute(
+            "SELECT search_id FROM searches WHERE stored < ? OR search_id NOT IN "
+            "(SELECT search_id FROM searches ORDER BY stored DESC LIMIT ?)",
+            (now - self.ttl, self.max_searches)
+        ).fetchall()
+        conn.executemany("DELETE FROM results WHERE search_id = ?", expired)
+        conn.executemany("DELETE FROM searches WHERE search_id = ?", expired)
+
+    def _store(self, results: List[Dict[str, Any]]) -> str:
+        search_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("INSERT INTO searches (search_id, stored, total) VALUES (?, ?, ?)",
+                             (search_id, now, len(results)))
+                conn.executemany(
+                    "INSERT INTO results (search_id, position, result) VALUES (?, ?, ?)",
+                    ((search_id, position, dumps(result)) for position, result in enumerate(results))
+                )
+                self._expire(conn, now)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return search_id
+
+    def _page(self, search_id: str, offset: int, limit: int) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT stored, total FROM searches WHERE search_id = ?", (search_id,)).fetchone()
+            if row is None or time.time() - row[0] > self.ttl:
+                return None
+            rows = conn.execute(
+                "SELECT result FROM results WHERE search_id = ? AND position >= ? ORDER BY position LIMIT ?",
+                (search_id, offset, limit)
+            ).fetchall()
+        return [loads(result) for result, in rows], row[1]
+
+    async def store(self, results: List[Dict[str, Any]]) -> str:
+        return await asyncio.to_thread(self._store, results)
+
+    async def page(self, search_id: str, offset: int, limit: int) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+        """(results[offset:offset + limit], total) or None when the search has expired."""
+        return await asyncio.to_thread(self._page, search_id, offset, limit)
+
+    async def first_page(self, response: Dict[str, Any], page_size: int) -> Dict[str, Any]:
+        """Replace the response's result lists with their first page and a cursor to the rest."""
+        results = response.get('all_results', [])
+        paged = {key: value for key, value in response.items() if key not in ('top_results', 'all_results')}
+        paged['results'] = results[:page_size]
+        paged['page'] = page_info(await self.store(results), 0, page_size, len(results))
+        return paged
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            conn = self._connection()
+            searches, results = conn.execute("SELECT COUNT(*), COALESCE(SUM(total), 0) FROM searches").fetchone()
+        return {'searches': searches, 'results': results}
+
+
+def page_info(search_id: str, offset: int, limit: int, total: int) -> Dict[str, Any]:
+    end = offset + limit
+    return {
+        'search_id': search_id,
+        'offset': offset,
+        'total': total,
+        'next_cursor': encode_cursor(search_id, end) if end < total else None
+    }
+
+
+result_pages = ResultPages()
@@ -0,0 +1,142 @@
+import heapq
+import itertools
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+AUTHORITATIVE_DOMAINS = ('linkedin.com', 'github.com', 'wikipedia.org', 'reuters.com', 'nytimes.com')
+
+# Below this many results plain Python beats the NumPy conversion overhead
+NUMPY_MIN_BATCH = 512
+
+
+@lru_cache(maxsize=None)
+def load_numpy():
+    """numpy, imported by the first batch large enough to use it; None when not installed."""
+    try:
+        import numpy
+    except ImportError:  # optional speed-up for large batches: pip install numpy
+        return None
+    return numpy
+
+
+class BatchScorer:
+    """
+    Relevance scoring for many results against one target.
+
+    Weights: target in title +3, target mentions in snippet +0.5 each up to
+    2, authoritative domain +2, substantial snippet +1, extracted entities
+    +1.5. The target, the domain pattern and per-host domain bonuses are
+    computed once.
+    """
+
+    def __init__(self, target: str, min_snippet_length: int = 50,
+                 authoritative_domains: Sequence[str] = AUTHORITATIVE_DOMAINS):
+        self.target = target.lower()
+        self.min_snippet_length = min_snippet_length
+        self.domain_pattern = re.compile('|'.join(re.escape(domain) for domain in authoritative_domains))
+        self.domain_bonus: Dict[str, float] = {}  # displayLink -> bonus, hosts repeat a lot
+
+    def _domain(self, display_link: str) -> float:
+        bonus = self.domain_bonus.get(display_link)
+        if bonus is None:
+            bonus = 2.0 if self.domain_pattern.search(display_link.lower()) else 0.0
+            self.domain_bonus[display_link] = bonus
+        return bonus
+
+    def score_batch(self, results: List[Dict[str, Any]]) -> List[float]:
+        target = self.target
+        titles = [target in result.get('title', '').lower() for result in results]
+        snippets = [result.get('snippet', '').lower() for result in results]
+        mentions = [snippet.count(target) for snippet in snippets]
+        substantial = [len(snippet) >= self.min_snippet_length for snippet in snippets]
+        domains = [self._domain(result.get('displayLink', '')) for result in results]
+        entities = [bool(result.get('entities')) and any(result['entities'].values()) for result in results]
+
+        np = load_numpy() if len(results) >= NUMPY_MIN_BATCH else None
+        if np is not None:
+            scores = (
+                3.0 * np.array(titles, dtype=np.float64)
+                + np.minimum(0.5 * np.array(mentions, dtype=np.float64), 2.0)
+                + np.array(domains, dtype=np.float64)
+                + np.array(substantial, dtype=np.float64)
+                + 1.5 * np.array(entities, dtype=np.float64)
+            )
+            return scores.tolist()
+
+        return [
+            (3.0 if title else 0.0) + min(count * 0.5, 2.0) + domain + (1.0 if long else 0.0) + (1.5 if has else 0.0)
+            for title, count, domain, long, has in zip(titles, mentions, domains, substantial, entities)
+        ]
+
+    def score(self, result: Dict[str, Any]) -> float:
+        return self.score_batch([result])[0]
+
+
+def top_k_indices(scores: Sequence[float], k: int) -> List[int]:
+    """
+    Indices of the k highest scores, best first. Ties keep input order, so
+    the result equals the first k of a stable descending sort.
+    """
+    n = len(scores)
+    k = min(k, n)
+    if k <= 0:
+        return []
+    np = load_numpy() if n >= NUMPY_MIN_BATCH else None
+    if np is None:
+        return heapq.nlargest(k, range(n), key=scores.__getitem__)
+
+    values = np.asarray(scores, dtype=np.float64)
+    threshold = np.partition(values, n - k)[n - k]
+    above = np.flatnonzero(values > threshold)
+    # Fill up with the earliest results tied at the threshold
+    tied = np.flatnonzero(values == threshold)[:k - len(above)]
+    selected = np.concatenate((above, tied))
+    return selected[np.lexsort((selected, -values[selected]))].tolist()
+
+
+class IncrementalRanker:
+    """
+    Ranking over results that arrive in batches.
+
+    Each batch is scored at once and sorted into a run. Runs are kept on a
+    stack where a run is merged into its neighbour once that neighbour is no
+    more than twice its size, so there are O(log n) runs and every result
+    takes part in O(log n) merges. top(k) lazily merges the heads of the
+    runs; only the full ranking collapses them into one.
+    """
+
+    def __init__(self, scorer: BatchScorer):
+        self.scorer = scorer
+        self.results: List[Dict[str, Any]] = []
+        self.runs: List[List[Tuple[float, int]]] = []  # sorted (-score, arrival index) runs
+
+    def add_batch(self, results: List[Dict[str, Any]]):
+        if not results:
+            return
+        offset = len(self.results)
+        for result, score in zip(results, self.scorer.score_batch(results)):
+            result['relevance_score'] = score
+        self.results.extend(results)
+        self.runs.append(sorted((-result['relevance_score'], offset + i) for i, result in enumerate(results)))
+        while len(self.runs) > 1 and len(self.runs[-2]) <= 2 * len(self.runs[-1]):
+            self._merge_last()
+
+    def _merge_last(self):
+        last = self.runs.pop()
+        # Two sorted runs: Timsort finds them and does a single linear merge
+        self.runs[-1].extend(last)
+        self.runs[-1].sort()
+
+    def ranking(self) -> List[Tuple[float, int]]:
+        while len(self.runs) > 1:
+            self._merge_last()
+        return self.runs[0] if self.runs else []
+
+    def top(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        if limit is None or limit >= len(self.results):
+            return [self.results[index] for _, index in self.ranking()]
+        return [self.results[index] for _, index in itertools.islice(heapq.merge(*self.runs), limit)]
+
+    def __len__(self):
+        return len(self.results)
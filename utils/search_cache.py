@@ -0,0 +1,268 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from utils.storage import connect_sqlite, data_path
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend(ABC):
+    """Base class for the search result caches used by fetch_search_results."""
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Any):
+        ...
+
+    @abstractmethod
+    async def clear_expired(self):
+        ...
+
+    def _record(self, key: str, value: Optional[Any]) -> Optional[Any]:
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            logger.info(f"Cache hit: {key[:50]}...")
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+
+class MemoryCache(CacheBackend):
+    """In-process LRU cache with TTL expiry and an entry cap."""
+
+    def __init__(self, ttl: int, max_entries: int = 1024):
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self.cache: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self.lock = asyncio.Lock()
+
+    def _lookup(self, key: str) -> Optional[Any]:
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        data, timestamp = entry
+        if time.time() - timestamp >= self.ttl:
+            del self.cache[key]
+            return None
+        self.cache.move_to_end(key)
+        return data
+
+    def _store(self, key: str, value: Any, timestamp: float):
+        self.cache[key] = (value, timestamp)
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.max_entries:
+            self.cache.popitem(last=False)
+            self.evictions += 1
+
+    async def get(self, key: str) -> Optional[Any]:
+        async with self.lock:
+            return self._record(key, self._lookup(key))
+
+    async def set(self, key: str, value: Any):
+        async with self.lock:
+            self._store(key, value, time.time())
+
+    async def clear_expired(self):
+        async with self.lock:
+            current_time = time.time()
+            expired = [k for k, (_, t) in self.cache.items() if current_time - t >= self.ttl]
+            for k in expired:
+                del self.cache[k]
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats['entries'] = len(self.cache)
+        return stats
+
+
+class SQLiteCache(CacheBackend):
+    """
+    On-disk LRU/TTL cache shared by every process that opens the same file.
+
+    A small in-memory LRU sits in front of the database so hot keys never
+    leave the event loop; misses and writes run in a worker thread.
+
+    Triggers keep the entry count and total size in a one-row meta table, so
+    a write checks the limits without scanning the cache; LRU eviction only
+    runs once they are exceeded, and expired entries are swept every
+    expire_every writes.
+    """
+
+    def __init__(self, path: str, ttl: int, max_entries: int = 10000,
+                 max_bytes: int = 256 * 1024 * 1024, memory_entries: int = 256,
+                 filename: str = 'search_cache.sqlite3', expire_every: int = 100):
+        super().__init__(ttl)
+        self.path = path
+        self.filename = filename  # Inside the data directory when path is empty
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.expire_every = expire_every
+        self.memory = MemoryCache(ttl, memory_entries)
+        self._conn = None
+        self._db_lock = threading.Lock()
+        self._writes = 0
+
+    def _connection(self):
+        if self._conn is None:
+            conn = connect_sqlite(self.path or data_path(self.filename))
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, "
+                "accessed REAL NOT NULL, size INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_search_cache_accessed ON search_cache(accessed)")
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS search_cache_usage ("
+                    "id INTEGER PRIMARY KEY CHECK (id = 0), entries INTEGER NOT NULL, bytes INTEGER NOT NULL)"
+                )
+                # Counted once, in the same transaction that installs the triggers keeping it current
+                conn.execute(
+                    "INSERT OR IGNORE INTO search_cache_usage "
+                    "SELECT 0, COUNT(*), COALESCE(SUM(size), 0) FROM search_cache"
+                )
+                conn.execute(
+                    "CREATE TRIGGER IF NOT EXISTS search_cache_added AFTER INSERT ON search_cache BEGIN "
+                    "UPDATE search_cache_usage SET entries = entries + 1, bytes = bytes + new.size; END"
+                )
+                conn.execute(
+                    "CREATE TRIGGER IF NOT EXISTS search_cache_removed AFTER DELETE ON search_cache BEGIN "
+                    "UPDATE search_cache_usage SET entries = entries - 1, bytes = bytes - old.size; END"
+                )
+                conn.execute(
+                    "CREATE TRIGGER IF NOT EXISTS search_cache_resized AFTER UPDATE OF size ON search_cache BEGIN "
+                    "UPDATE search_cache_usage SET bytes = bytes + new.size - old.size; END"
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self._conn = conn
+        return self._conn
+
+    def _db_get(self, key: str) -> Optional[Tuple[Any, float]]:
+        with self._db_lock:
+            conn = self._connection()
+            row = conn.execute("SELECT value, created FROM search_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            now = time.time()
+            if now - created >= self.ttl:
+                conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE search_cache SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(value), created
+
+    def _db_set(self, key: str, value: Any, created: float) -> int:
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._db_lock:
+            conn = self._connection()
+            # An upsert, not INSERT OR REPLACE: REPLACE's implicit delete would skip the usage trigger
+            conn.execute(
+                "INSERT INTO search_cache (key, value, created, accessed, size) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, created = excluded.created, "
+                "accessed = excluded.accessed, size = excluded.size",
+                (key, payload, created, created, len(payload))
+            )
+            return self._evict(conn)
+
+    def _evict(self, conn) -> int:
+        self._writes += 1
+        evicted = 0
+        count, total = conn.execute("SELECT entries, bytes FROM search_cache_usage").fetchone()
+        over_limit = count > self.max_entries or total > self.max_bytes
+        if over_limit or self._writes % self.expire_every == 0:
+            # Expired entries go before live ones
+            evicted = conn.execute("DELETE FROM search_cache WHERE created <= ?", (time.time() - self.ttl,)).rowcount
+            if evicted:
+                count, total = conn.execute("SELECT entries, bytes FROM search_cache_usage").fetchone()
+        while count > self.max_entries or total > self.max_bytes:
+            batch = max(1, count - self.max_entries, count // 10)
+            rows = conn.execute(
+                "SELECT key, size FROM search_cache ORDER BY accessed LIMIT ?", (batch,)
+            ).fetchall()
+            if not rows:
+                break
+            conn.executemany("DELETE FROM search_cache WHERE key = ?", [(k,) for k, _ in rows])
+            count -= len(rows)
+            total -= sum(size for _, size in rows)
+            evicted += len(rows)
+        return evicted
+
+    def _db_clear_expired(self) -> int:
+        with self._db_lock:
+            conn = self._connection()
+            return conn.execute("DELETE FROM search_cache WHERE created <= ?", (time.time() - self.ttl,)).rowcount
+
+    def _db_usage(self) -> Tuple[int, int]:
+        with self._db_lock:
+            return self._connection().execute("SELECT entries, bytes FROM search_cache_usage").fetchone()
+
+    async def get(self, key: str) -> Optional[Any]:
+        async with self.memory.lock:
+            data = self.memory._lookup(key)
+        if data is None:
+            entry = await asyncio.to_thread(self._db_get, key)
+            if entry is not None:
+                data, created = entry
+                async with self.memory.lock:
+                    self.memory._store(key, data, created)
+        return self._record(key, data)
+
+    async def set(self, key: str, value: Any):
+        created = time.time()
+        async with self.memory.lock:
+            self.memory._store(key, value, created)
+        self.evictions += await asyncio.to_thread(self._db_set, key, value, created)
+
+    async def clear_expired(self):
+        await self.memory.clear_expired()
+        self.evictions += await asyncio.to_thread(self._db_clear_expired)
+
+    async def usage(self) -> Dict[str, int]:
+        entries, size = await asyncio.to_thread(self._db_usage)
+        return {'entries': entries, 'bytes': size}
+
+    def close(self):
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def create_cache(backend: str, ttl: int, path: str = '', max_entries: int = 10000,
+                 max_bytes: int = 256 * 1024 * 1024, memory_entries: int = 256,
+                 filename: str = 'search_cache.sqlite3') -> CacheBackend:
+    """Build the cache backend named in SearchConfig.cache_backend."""
+    if backend == 'memory':
+        return MemoryCache(ttl, max_entries)
+    if backend == 'sqlite':
+        return SQLiteCache(path, ttl, max_entries, max_bytes, memory_entries, filename)
+    raise ValueError(f"Unknown cache backend '{backend}'. Must be one of: ['memory', 'sqlite']")
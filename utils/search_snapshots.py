@@ -0,0 +1,78 @@
+import asyncio
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from utils.storage import connect_sqlite, data_path
+
+# Result fields worth keeping between runs; pagemap and scores are dropped
+SNAPSHOT_FIELDS = ('title', 'link', 'snippet', 'displayLink', 'entities', 'source')
+
+
+def snapshot_fields(result: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: result[key] for key in SNAPSHOT_FIELDS if key in result}
+
+
+class SnapshotStore:
+    """
+    Last run of every (target_type, target): the ranked links each dork
+    returned and the results behind them, kept across restarts.
+    """
+
+    def __init__(self, path: str = ''):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            conn = connect_sqlite(self.path or data_path('search_snapshots.sqlite3'))
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots ("
+                "target_type TEXT NOT NULL, target TEXT NOT NULL, taken REAL NOT NULL, "
+                "dorks TEXT NOT NULL, results TEXT NOT NULL, "
+                "PRIMARY KEY (target_type, target))"
+            )
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _key(target: str, target_type: str):
+        return target_type, target.strip().lower()
+
+    def _load(self, target: str, target_type: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT taken, dorks, results FROM snapshots WHERE target_type = ? AND target = ?",
+                self._key(target, target_type)
+            ).fetchone()
+        if row is None:
+            return None
+        taken, dorks, results = row
+        return {'taken': taken, 'dorks': json.loads(dorks), 'results': json.loads(results)}
+
+    def _save(self, target: str, target_type: str, dorks: Dict[str, List[str]], results: Dict[str, Dict[str, Any]]):
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO snapshots (target_type, target, taken, dorks, results) VALUES (?, ?, ?, ?, ?)",
+                (*self._key(target, target_type), time.time(),
+                 json.dumps(dorks, ensure_ascii=False), json.dumps(results, ensure_ascii=False))
+            )
+
+    def _exists(self, target: str, target_type: str) -> bool:
+        with self._lock:
+            return self._connection().execute(
+                "SELECT 1 FROM snapshots WHERE target_type = ? AND target = ?", self._key(target, target_type)
+            ).fetchone() is not None
+
+    async def exists(self, target: str, target_type: str) -> bool:
+        return await asyncio.to_thread(self._exists, target, target_type)
+
+    async def load(self, target: str, target_type: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._load, target, target_type)
+
+    async def save(self, target: str, target_type: str, dorks: Dict[str, List[str]], results: List[Dict[str, Any]]):
+        """Replace the snapshot; results are keyed by link and stripped to SNAPSHOT_FIELDS."""
+        by_link = {result['link']: snapshot_fields(result) for result in results if result.get('link')}
+        await asyncio.to_thread(self._save, target, target_type, dorks, by_link)
@@ -0,0 +1,56 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class _Call:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one in-flight task.
+
+    Every waiter receives the same result or exception. The shared task is
+    only cancelled once all of its waiters have been cancelled.
+    """
+
+    def __init__(self):
+        self.calls: Dict[str, _Call] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def _forget(self, key: str, call: _Call, task: asyncio.Task):
+        if self.calls.get(key) is call:
+            del self.calls[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every waiter went away
+            task.exception()
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self.calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self.calls[key] = call
+            call.task.add_done_callback(lambda task: self._forget(key, call, task))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'executed': self.executed,
+            'coalesced': self.coalesced,
+            'in_flight': len(self.calls)
+        }
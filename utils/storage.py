@@ -0,0 +1,24 @@
+import os
+import sqlite3
+
+DATA_DIR_ENV = "ECHOFORGE_DATA_DIR"
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".echoforge")
+
+
+def data_path(filename: str) -> str:
+    """
+    Return the path of a file inside the shared EchoForge data directory.
+    The directory itself is created by connect_sqlite when a store first opens.
+    """
+    return os.path.join(os.getenv(DATA_DIR_ENV, DEFAULT_DATA_DIR), filename)
+
+
+def connect_sqlite(path: str) -> sqlite3.Connection:
+    """Open a SQLite connection that can be shared by several processes."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
@@ -0,0 +1,222 @@
+import asyncio
+import logging
+import secrets
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+from urllib.parse import quote, urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class Circuit:
+    """
+    One ClientSession behind the Tor SOCKS port with its own credentials.
+
+    Tor isolates streams by SOCKS username/password (IsolateSOCKSAuth, on by
+    default), so each credential pair gets its own circuit; new credentials
+    mean a new circuit.
+    """
+
+    def __init__(self, index: int, generation: int, session):
+        self.index = index
+        self.generation = generation
+        self.session = session
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0  # Consecutive
+        self.latency: Optional[float] = None  # EWMA of seconds to response headers
+        self.retired = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'generation': self.generation,
+            'in_flight': self.in_flight,
+            'requests': self.requests,
+            'failures': self.failures,
+            'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None
+        }
+
+
+class CircuitPool:
+    """
+    Spreads dark web requests over several isolated Tor circuits.
+
+    Each request goes to the least busy circuit, so parallel fetches don't
+    queue on one circuit. A circuit is rotated (new credentials, so Tor
+    builds a new one) after max_failures consecutive failures, or once its
+    latency stays above slow_seconds. Needs the optional aiohttp-socks package.
+    """
+
+    def __init__(self, proxy_url: str, size: int = 4, slow_seconds: float = 8.0, max_failures: int = 3,
+                 min_samples: int = 3, ewma_alpha: float = 0.3, health_url: str = '',
+                 health_interval: float = 0.0, connections_per_circuit: int = 10):
+        self.proxy_url = proxy_url
+        self.size = max(1, size)
+        self.slow_seconds = slow_seconds
+        self.max_failures = max_failures
+        self.min_samples = min_samples
+        self.ewma_alpha = ewma_alpha
+        self.health_url = health_url
+        self.health_interval = health_interval
+        self.connections_per_circuit = connections_per_circuit
+        self.instance = secrets.token_hex(4)  # Keeps circuits of separate workers apart
+        self.circuits: List[Circuit] = []
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.health_task: Optional[asyncio.Task] = None
+        self.rotations = 0
+        self.health_checks = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.proxy_url)
+
+    def credentials(self, index: int, generation: int):
+        return f"echoforge-{self.instance}-{index}", str(generation)
+
+    def _open(self, index: int, generation: int) -> Circuit:
+        try:
+            from aiohttp_socks import ProxyConnector
+        except ImportError:
+            raise RuntimeError("Routing through Tor needs aiohttp-socks: pip install aiohttp-socks")
+        import aiohttp
+
+        proxy = urlparse(self.proxy_url)
+        username, password = self.credentials(index, generation)
+        # rdns: the proxy resolves hostnames, which .onion addresses require
+        connector = ProxyConnector.from_url(
+            f"{proxy.scheme}://{quote(username)}:{quote(password)}@{proxy.hostname}:{proxy.port or 9050}",
+            rdns=True, limit=self.connections_per_circuit
+        )
+        return Circuit(index, generation, aiohttp.ClientSession(connector=connector))
+
+    def _ensure_circuits(self):
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            # Sessions are bound to the loop that opened them; a new loop (another asyncio.run) starts over
+            self.circuits = [self._open(index, 0) for index in range(self.size)]
+            self.loop = loop
+
+    def pick(self) -> Circuit:
+        """The circuit with the fewest requests in flight, then the fastest."""
+        self._ensure_circuits()
+        return min(self.circuits, key=lambda c: (c.in_flight, c.latency if c.latency is not None else 0.0))
+
+    async def rotate(self, circuit: Circuit, reason: str):
+        if circuit.retired:
+            return
+        circuit.retired = True
+        if circuit in self.circuits:
+            self.circuits[self.circuits.index(circuit)] = self._open(circuit.index, circuit.generation + 1)
+            self.rotations += 1
+        else:
+            # close() or a new loop already replaced the pool; only this session is left to close
+            logger.info(f"Retired Tor circuit {circuit.index} outside the pool ({reason})")
+            if circuit.in_flight == 0:
+                await circuit.session.close()
+            return
+        logger.info(f"Rotated Tor circuit {circuit.index} ({reason})")
+        if circuit.in_flight == 0:
+            await circuit.session.close()
+
+    async def _record(self, circuit: Circuit, seconds: Optional[float]):
+        """Fold one request into the circuit's health; seconds is None for a failure."""
+        circuit.requests += 1
+        if seconds is None:
+            circuit.failures += 1
+        else:
+            circuit.failures = 0
+            circuit.latency = seconds if circuit.latency is None else (
+                self.ewma_alpha * seconds + (1 - self.ewma_alpha) * circuit.latency
+            )
+        if circuit.failures >= self.max_failures:
+            await self.rotate(circuit, f"{circuit.failures} failures in a row")
+        elif circuit.requests >= self.min_samples and circuit.latency is not None and circuit.latency > self.slow_seconds:
+            await self.rotate(circuit, f"latency {circuit.latency:.1f}s")
+
+    @asynccontextmanager
+    async def get(self, url: str, **kwargs) -> AsyncIterator[Any]:
+        """
+        GET url over a pooled circuit; used like session.get(). Only the
+        request's own errors and 5xx responses count against the circuit;
+        exceptions from the caller's block and cancellation do not.
+        """
+        circuit = self.pick()
+        import aiohttp
+        from aiohttp_socks import ProxyError
+
+        circuit.in_flight += 1
+        started = time.perf_counter()
+        elapsed: Optional[float] = None
+        recorded = False
+        try:
+            async with circuit.session.get(url, **kwargs) as resp:
+                elapsed = time.perf_counter() - started if resp.status < 500 else None
+                recorded = True
+                yield resp
+        except (aiohttp.ClientError, asyncio.TimeoutError, ProxyError):
+            elapsed, recorded = None, True
+            raise
+        finally:
+            circuit.in_flight -= 1
+            if recorded:
+                await self._record(circuit, elapsed)
+            if circuit.retired and circuit.in_flight == 0:
+                await circuit.session.close()
+
+    async def check(self) -> Dict[int, Any]:
+        """Fetch health_url over every circuit at once and rotate those that fail or are slow."""
+        self._ensure_circuits()
+        import aiohttp
+
+        timeout = aiohttp.ClientTimeout(total=self.slow_seconds * 2)
+
+        async def probe(circuit: Circuit):
+            started = time.perf_counter()
+            try:
+                async with circuit.session.get(self.health_url, timeout=timeout) as resp:
+                    await resp.read()
+                    if resp.status >= 500:
+                        return f'status {resp.status}'
+            except Exception as e:
+                return f'error: {e or type(e).__name__}'
+            seconds = time.perf_counter() - started
+            return seconds if seconds <= self.slow_seconds else f'slow: {seconds:.1f}s'
+
+        circuits = list(self.circuits)
+        results = await asyncio.gather(*(probe(circuit) for circuit in circuits))
+        self.health_checks += 1
+        for circuit, result in zip(circuits, results):
+            if isinstance(result, str):
+                await self.rotate(circuit, f"health check {result}")
+        return {circuit.index: result for circuit, result in zip(circuits, results)}
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error(f"Tor circuit health check failed: {e}")
+
+    async def start(self):
+        if self.enabled and self.health_url and self.health_interval > 0 and self.health_task is None:
+            self.health_task = asyncio.create_task(self._health_loop())
+
+    async def close(self):
+        if self.health_task is not None:
+            self.health_task.cancel()
+            self.health_task = None
+        if self.loop is asyncio.get_running_loop():
+            for circuit in self.circuits:
+                await circuit.session.close()
+        self.circuits = []
+        self.loop = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'circuits': {circuit.index: circuit.stats() for circuit in self.circuits},
+            'rotations': self.rotations,
+            'health_checks': self.health_checks
+        }